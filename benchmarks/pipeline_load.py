@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.openai_stand_in import DEFAULT_PORT, StandInConfig, serve  # noqa: E402
+
+# One prompt per router case, plus a freeform question
+QUERIES = [
+    "munros near Aviemore",
+    "challenging ridge walk near Tyndrum, no more than 20 km, avoid bogs",
+    "Are there any quiet, scenic day hikes starting from Corrour or Bridge of Orchy? I’d like to avoid busy trails and get a remote feel.",
+    "Easy munros from Glasgow within 2.5 hours by train",
+    "Which munro has the best views of Loch Lomond for a first-time hillwalker?",
+]
+
+SUMMARY_BODY = {
+    "recommendations": [
+        {
+            "station_name": "Bridge of Orchy",
+            "top_munros": [
+                {"name": "Beinn Dòrain", "distance_km": 3.1},
+                {"name": "Beinn an Dothaidh", "distance_km": 4.0},
+            ],
+        }
+    ]
+}
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def report(label: str, timings: list, failures: int):
+    if not timings:
+        print(f"{label}: all {failures} runs failed")
+        return
+    print(
+        f"{label}: {len(timings)} ok, {failures} failed — "
+        f"p50 {percentile(timings, 0.5):.2f}s, p95 {percentile(timings, 0.95):.2f}s, "
+        f"max {max(timings):.2f}s"
+    )
+
+
+def run_cli(query: str, env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "main.py", query],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+        timeout=300,
+    )
+    return time.perf_counter() - started
+
+
+def run_api(api_url: str) -> float:
+    started = time.perf_counter()
+    request = urllib.request.Request(
+        api_url.rstrip("/") + "/api/summary/stream",
+        data=json.dumps(SUMMARY_BODY).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=300) as response:
+        body = response.read().decode("utf-8")
+    if "event: done" not in body:
+        raise RuntimeError("stream did not complete")
+    return time.perf_counter() - started
+
+
+def load(label: str, task, jobs: list, concurrency: int):
+    timings, failures = [], 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(task, job) for job in jobs]:
+            try:
+                timings.append(future.result())
+            except Exception:
+                failures += 1
+    report(label, timings, failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test main.py and the Flask API against the OpenAI stand-in"
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--latency-sigma", type=float, default=0.35)
+    parser.add_argument("--tokens-per-second", type=float, default=80)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--api-url",
+        default=None,
+        help="running Flask API, started with MUNRO_OPENAI_BASE_URL="
+        "http://127.0.0.1:<port>/v1",
+    )
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        seed=0,
+    )
+    started = threading.Event()
+    servers = []
+
+    def ready(server):
+        servers.append(server)
+        started.set()
+
+    threading.Thread(
+        target=serve,
+        kwargs={"port": args.port, "config": config, "ready": ready},
+        daemon=True,
+    ).start()
+    started.wait()
+    base_url = f"http://127.0.0.1:{servers[0].server_port}/v1"
+
+    # Real round trips every time: no response, answer or summary caches
+    env = {
+        **os.environ,
+        "MUNRO_OPENAI_BASE_URL": base_url,
+        "MUNRO_LLM_CACHE": "0",
+        "MUNRO_SEMANTIC_CACHE": "0",
+        "MUNRO_STORED_SUMMARIES": "0",
+    }
+    print(
+        f"[🧪 Stand-in] {base_url}: median {args.latency_ms:.0f} ms to first token, "
+        f"{args.tokens_per_second:.0f} tokens/s, {args.error_rate:.0%} errors"
+    )
+
+    jobs = [QUERIES[i % len(QUERIES)] for i in range(args.runs)]
+    load(
+        f"main.py ×{args.runs} at concurrency {args.concurrency}",
+        lambda query: run_cli(query, env),
+        jobs,
+        args.concurrency,
+    )
+    if args.api_url:
+        load(
+            f"/api/summary/stream ×{args.runs} at concurrency {args.concurrency}",
+            lambda _: run_api(args.api_url),
+            jobs,
+            args.concurrency,
+        )
+    print(f"Stand-in requests: {dict(config.stats)}")
+
+
+if __name__ == "__main__":
+    main()
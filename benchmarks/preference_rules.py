@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.preference_rules import (  # noqa: E402
+    RULES_MIN_CONFIDENCE,
+    extract_preferences,
+)
+from tools.transport import resolve_station  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "preference_queries.json")
+REPEATS = 50
+
+SCALAR_FIELDS = [
+    "origin_city",
+    "max_travel_time_minutes",
+    "max_time_hours",
+    "max_distance_km",
+    "grade",
+    "bog_tolerance",
+]
+LIST_FIELDS = ["station_keywords", "features", "soft_preferences"]
+
+
+def _stations(names):
+    resolved = set()
+    for name in names or []:
+        match = resolve_station(name)
+        resolved.add(match.name if match else name)
+    return resolved
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def compare(rules: dict, expected: dict) -> dict:
+    """
+    Per-field agreement: 1/0 for scalars (distances within 0.5 km), Jaccard
+    overlap for lists. Station names are compared after resolution.
+    """
+    scores = {}
+    for field in SCALAR_FIELDS:
+        a, b = rules.get(field), expected.get(field)
+        if field == "max_distance_km" and a is not None and b is not None:
+            scores[field] = float(abs(a - b) <= 0.5)
+        else:
+            scores[field] = float(a == b)
+    for field in LIST_FIELDS:
+        if field == "station_keywords":
+            a, b = _stations(rules.get(field)), _stations(expected.get(field))
+        else:
+            a = {v.lower() for v in rules.get(field) or []}
+            b = {v.lower() for v in expected.get(field) or []}
+        scores[field] = _jaccard(a, b)
+    return scores
+
+
+def main(live: bool = False):
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    if live:
+        # Compare against what the LLM actually returns today, not the labels
+        from tools.parse_hike_preferences import llm_parse_preferences
+
+        for query in corpus:
+            query["expected"] = llm_parse_preferences(query["prompt"]).dict()
+
+    handled = []
+    timings = []
+    for query in corpus:
+        parse = extract_preferences(query["prompt"])
+        if parse.confidence < RULES_MIN_CONFIDENCE:
+            print(
+                f"[↪️ LLM] {parse.confidence:.2f} '{query['prompt'][:60]}' "
+                f"({', '.join(parse.unexplained[:5])})"
+            )
+            continue
+        scores = compare(parse.fields, query["expected"])
+        handled.append(scores)
+        misses = [field for field, score in scores.items() if score < 1]
+        if misses:
+            print(f"[❌ Disagree] '{query['prompt'][:60]}' on {', '.join(misses)}")
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            extract_preferences(query["prompt"])
+        timings.append((time.perf_counter() - start) / REPEATS * 1e6)
+
+    source = "live LLM" if live else "hand labels"
+    print(f"\n[⚡ Preference rules] {len(corpus)} prompts, compared with {source}")
+    print(
+        f"Handled without LLM: {len(handled)}/{len(corpus)} "
+        f"({len(handled) / len(corpus):.0%})"
+    )
+    if not handled:
+        return
+    exact = sum(all(score == 1 for score in s.values()) for s in handled)
+    print(f"Fully agreeing: {exact}/{len(handled)} ({exact / len(handled):.0%})")
+    for field in SCALAR_FIELDS + LIST_FIELDS:
+        mean = sum(s[field] for s in handled) / len(handled)
+        print(f"  {field}: {mean:.0%}")
+    timings.sort()
+    print(
+        f"Latency: mean {sum(timings) / len(timings):.1f} µs, "
+        f"p95 {timings[int(len(timings) * 0.95)]:.1f} µs"
+    )
+
+
+if __name__ == "__main__":
+    main(live="--live" in sys.argv)
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from munro_rag.vector_store import (  # noqa: E402
+    INDEX_DIR,
+    ScalarQuantizer,
+    VectorStore,
+    unit_rows,
+)
+import munro_rag.vector_store as vector_store  # noqa: E402
+
+RERANK_FACTORS = (1, 2, 4, 8, 16)
+
+
+def synthetic_vectors(n: int, dims: int, rng) -> np.ndarray:
+    """
+    Clustered unit vectors: chunks of one route sit close together, like the
+    real embeddings do.
+    """
+    centres = rng.normal(size=(max(n // 6, 1), dims))
+    vectors = centres[rng.integers(len(centres), size=n)]
+    return unit_rows(vectors + 0.6 * rng.normal(size=(n, dims)))
+
+
+def timed_search(store: VectorStore, queries: np.ndarray, k: int):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([row for row, _ in store.search(query, k)])
+        timings.append((time.perf_counter() - start) * 1e3)
+    timings.sort()
+    return results, timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall@k and memory of the int8 index against the flat index"
+    )
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="benchmark N random clustered vectors instead of the index "
+        "(e.g. a corpus with Corbetts and Grahams added)",
+    )
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=8)
+    parser.add_argument(
+        "--query-noise",
+        type=float,
+        default=0.04,
+        help="per-dimension noise added to chunk vectors to make queries",
+    )
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dims, rng)
+        source = f"{args.synthetic} synthetic vectors"
+    else:
+        vectors = np.asarray(VectorStore.load(args.index_dir, quantized=False).vectors)
+        source = args.index_dir
+    documents = [{"page_content": "", "metadata": {}}] * len(vectors)
+
+    # Queries: perturbed chunk vectors, as a paraphrase of a chunk would be
+    picks = rng.integers(len(vectors), size=args.queries)
+    queries = unit_rows(
+        vectors[picks]
+        + args.query_noise * rng.normal(size=(args.queries, vectors.shape[1]))
+    )
+
+    quantizer = ScalarQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+    flat = VectorStore(vectors, documents)
+    quantized = VectorStore(vectors, documents, codes, quantizer)
+
+    print(f"[🗜️ Quantized index] {source}, {args.queries} queries, k={args.k}")
+    print(
+        f"Scanned memory: float32 {vectors.nbytes / 1e6:.1f} MB, "
+        f"int8 {codes.nbytes / 1e6:.1f} MB "
+        f"({vectors.nbytes / codes.nbytes:.1f}× smaller)"
+    )
+
+    truth, flat_ms = timed_search(flat, queries, args.k)
+    print(f"{'flat':>12}: recall@{args.k} 100.0% — p50 {flat_ms:.2f} ms")
+    for factor in RERANK_FACTORS:
+        vector_store.RERANK_FACTOR = factor
+        results, ms = timed_search(quantized, queries, args.k)
+        recall = np.mean(
+            [len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]
+        )
+        print(
+            f"{f'int8 ×{factor}':>12}: recall@{args.k} {recall:.1%} — p50 {ms:.2f} ms "
+            f"(re-ranking {factor * args.k})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from munro_rag.lexical_index import get_lexical_index  # noqa: E402
+from munro_rag.retriever import retrieve  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "retrieval_queries.json")
+K = 8
+RECALL_AT = (3, 8)
+REPEATS = 20
+
+
+def evaluate(mode: str, corpus: list, title_for_url: dict) -> dict:
+    """
+    Recall@k over distinct relevant route titles (several Munros share one
+    walk), mean reciprocal rank and per-query latency for one mode.
+    """
+    recalls = {k: [] for k in RECALL_AT}
+    reciprocal_ranks, timings, misses = [], [], []
+    # Embeddings are memoized, so only the first call per query is a real one
+    repeats = REPEATS if mode == "lexical" else 1
+
+    for query in corpus:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            documents = retrieve(query["query"], K, mode)
+        timings.append((time.perf_counter() - start) / repeats * 1e3)
+
+        titles = []
+        for doc in documents:
+            title = title_for_url.get(doc["metadata"].get("url"))
+            if title not in titles:
+                titles.append(title)
+        relevant = set(query["relevant_titles"])
+        for k in RECALL_AT:
+            recalls[k].append(len(relevant & set(titles[:k])) / len(relevant))
+        rank = next((i for i, t in enumerate(titles, 1) if t in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        if not rank:
+            misses.append(query["query"])
+
+    timings.sort()
+    return {
+        "recall": {k: sum(v) / len(v) for k, v in recalls.items()},
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95)],
+        "misses": misses,
+    }
+
+
+def main(live: bool = False):
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    start = time.perf_counter()
+    index = get_lexical_index()
+    print(
+        f"[🔎 BM25] {len(index)} routes indexed in "
+        f"{(time.perf_counter() - start) * 1e3:.0f} ms"
+    )
+    title_for_url = {route["url"]: route["title"] for route in index.routes}
+
+    # Vector and hybrid need the vector index and an embeddings endpoint
+    modes = ["lexical", "vector", "hybrid"] if live else ["lexical"]
+    print(f"\n[📚 Retrieval] {len(corpus)} labelled queries, top {K}")
+    for mode in modes:
+        result = evaluate(mode, corpus, title_for_url)
+        recall = ", ".join(f"R@{k} {v:.0%}" for k, v in result["recall"].items())
+        print(
+            f"{mode:>8}: {recall}, MRR {result['mrr']:.2f} — "
+            f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms"
+        )
+        for query in result["misses"]:
+            print(f"          [❌ Missed] '{query}'")
+
+
+if __name__ == "__main__":
+    main(live="--live" in sys.argv)
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Measure real LLM round trips, not cache hits
+os.environ["MUNRO_LLM_CACHE"] = "0"
+# Ranking is local; only the LLM tie-break makes round trips
+os.environ["MUNRO_LLM_TIEBREAK"] = "1"
+
+from router import RERANK_CONCURRENCY, arerank_stations  # noqa: E402
+from tools.parse_hike_preferences import HikePreferences  # noqa: E402
+
+# test_cases.py, test 2: "quiet, scenic day hikes starting from Corrour or Bridge of Orchy"
+PREFERENCES = HikePreferences(
+    origin_city=None,
+    max_travel_time_minutes=None,
+    max_time_hours=None,
+    max_distance_km=None,
+    grade=None,
+    bog_tolerance=None,
+    features=None,
+    station_keywords=["Corrour", "Bridge of Orchy"],
+    soft_preferences=["quiet", "scenic", "remote"],
+)
+REPEATS = 3
+
+
+def timed(concurrency: int) -> float:
+    start = time.perf_counter()
+    asyncio.run(
+        arerank_stations(
+            PREFERENCES, PREFERENCES.station_keywords, concurrency=concurrency
+        )
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    sequential = sorted(timed(1) for _ in range(REPEATS))[REPEATS // 2]
+    concurrent = sorted(timed(RERANK_CONCURRENCY) for _ in range(REPEATS))[REPEATS // 2]
+
+    print(f"\n[🚦 Router reranking] {len(PREFERENCES.station_keywords)} stations")
+    print(f"One at a time: {sequential:.2f}s (median of {REPEATS})")
+    print(f"Concurrent ({RERANK_CONCURRENCY}): {concurrent:.2f}s (median of {REPEATS})")
+    print(f"Saved: {sequential - concurrent:.2f}s ({1 - concurrent / sequential:.0%})")
+
+
+if __name__ == "__main__":
+    main()
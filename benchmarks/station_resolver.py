@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.transport import resolve_station  # noqa: E402
+
+# [query, expected station]; null when the query is an ambiguous prefix
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "misspelt_stations.json")
+REPEATS = 200
+
+
+def main():
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    hits = 0
+    timings = []
+    for query, expected in corpus:
+        match = resolve_station(query)
+        resolved = match.name if match else None
+        if resolved == expected:
+            hits += 1
+        else:
+            print(f"[❌ Miss] '{query}' → {resolved!r} (expected {expected!r})")
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            resolve_station(query)
+        timings.append((time.perf_counter() - start) / REPEATS * 1e6)
+
+    timings.sort()
+    print(f"\n[🚉 Station resolver] {len(corpus)} queries")
+    print(f"Hit rate: {hits}/{len(corpus)} ({hits / len(corpus):.0%})")
+    print(
+        f"Latency: mean {sum(timings) / len(timings):.1f} µs, "
+        f"p50 {timings[len(timings) // 2]:.1f} µs, "
+        f"p95 {timings[int(len(timings) * 0.95)]:.1f} µs"
+    )
+
+
+if __name__ == "__main__":
+    main()
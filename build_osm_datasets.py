@@ -1,10 +1,27 @@
-import overpy
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
 import pandas as pd
-from geopy.distance import geodesic
-from rag_retriever import answer_hiking_query
+import requests
+from tools.datasets import compile_datasets
+from tools.geo_index import PeakIndex
+from tools.registry import build_registry
+
+EDGE_RADIUS_KM = 30  # Filter for practical hiking proximity
+EDGE_CHUNK_SIZE = 256
+MUNRO_MIN_HEIGHT_M = 914.4
 
-# Initialize Overpass API
-api = overpy.Overpass()
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+DATA_DIR = "data"
+SNAPSHOT_DIR = "data/osm_snapshots"
+FIXTURE_SNAPSHOT = "data/fixtures/osm_snapshot"
+BUILD_RECORD = "osm_build.json"
 
 # Munro (peaks over 914.4m / 3000ft)
 munro_query = """
@@ -24,67 +41,482 @@ station_query = """
 out body;
 """
 
-# Run queries
-munro_result = api.query(munro_query)
-station_result = api.query(station_query)
+EDGE_COLUMNS = [
+    "station_name",
+    "station_lat",
+    "station_lon",
+    "munro_name",
+    "munro_lat",
+    "munro_lon",
+    "distance_km",
+]
+
+_worker_index = None
+
+
+def _init_edge_worker(lats, lons):
+    global _worker_index
+    _worker_index = PeakIndex(np.arange(len(lats)), lats, lons)
+
+
+def _edges_for_chunk(args):
+    """
+    Spatial join for one chunk of stations: (station_idx, peak_idx, distance_km) arrays.
+    """
+    offset, station_lats, station_lons, radius_km = args
+    station_idx, peak_idx, distances = [], [], []
+    for i, (lat, lon) in enumerate(zip(station_lats, station_lons)):
+        idx, dist = _worker_index.query_radius(lat, lon, radius_km)
+        # Keep the peaks in input order, as the original nested loop did
+        order = np.argsort(idx, kind="stable")
+        station_idx.append(np.full(len(idx), offset + i, dtype=np.int64))
+        peak_idx.append(idx[order])
+        distances.append(dist[order])
+    if not station_idx:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    return (
+        np.concatenate(station_idx),
+        np.concatenate(peak_idx),
+        np.concatenate(distances),
+    )
+
+
+def spatial_join(
+    stations_df: pd.DataFrame,
+    munros_df: pd.DataFrame,
+    radius_km: float = EDGE_RADIUS_KM,
+    workers: int = 1,
+    chunk_size: int = EDGE_CHUNK_SIZE,
+):
+    """
+    Station × peak pairs within radius_km, via a grid index over the peaks.
+    Returns (station_idx, peak_idx, distance_km) arrays of row positions, ordered
+    station by station with peaks in input order. workers > 1 splits the
+    stations across processes.
+    """
+    if stations_df.empty or munros_df.empty:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+
+    peak_lats = munros_df["lat"].to_numpy(dtype=np.float64)
+    peak_lons = munros_df["lon"].to_numpy(dtype=np.float64)
+    station_lats = stations_df["lat"].to_numpy(dtype=np.float64)
+    station_lons = stations_df["lon"].to_numpy(dtype=np.float64)
+
+    chunks = [
+        (
+            start,
+            station_lats[start : start + chunk_size],
+            station_lons[start : start + chunk_size],
+            radius_km,
+        )
+        for start in range(0, len(stations_df), chunk_size)
+    ]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_edge_worker,
+            initargs=(peak_lats, peak_lons),
+        ) as pool:
+            parts = list(pool.map(_edges_for_chunk, chunks))
+    else:
+        _init_edge_worker(peak_lats, peak_lons)
+        parts = [_edges_for_chunk(chunk) for chunk in chunks]
+
+    return (
+        np.concatenate([p[0] for p in parts]),
+        np.concatenate([p[1] for p in parts]),
+        np.concatenate([p[2] for p in parts]),
+    )
+
+
+def edge_frame(stations_df, munros_df, station_idx, peak_idx, distances):
+    """
+    Materializes joined index arrays as station_to_munro_edges.csv rows.
+    """
+    # Take the original column values so coordinates are written exactly as received
+    return pd.DataFrame(
+        {
+            "station_name": stations_df["name"].to_numpy()[station_idx],
+            "station_lat": stations_df["lat"].to_numpy()[station_idx],
+            "station_lon": stations_df["lon"].to_numpy()[station_idx],
+            "munro_name": munros_df["name"].to_numpy()[peak_idx],
+            "munro_lat": munros_df["lat"].to_numpy()[peak_idx],
+            "munro_lon": munros_df["lon"].to_numpy()[peak_idx],
+            "distance_km": [round(float(d), 2) for d in distances],
+        },
+        columns=EDGE_COLUMNS,
+    )
+
+
+def build_edges(
+    stations_df: pd.DataFrame,
+    munros_df: pd.DataFrame,
+    radius_km: float = EDGE_RADIUS_KM,
+    workers: int = 1,
+    chunk_size: int = EDGE_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Station → Munro edges within radius_km. Rows come out station by station,
+    peaks in input order, matching the old nested-loop output.
+    """
+    joined = spatial_join(stations_df, munros_df, radius_km, workers, chunk_size)
+    return edge_frame(stations_df, munros_df, *joined)
+
+
+def incremental_edges(
+    prev_edges: pd.DataFrame,
+    old_stations: pd.DataFrame,
+    old_munros: pd.DataFrame,
+    stations_df: pd.DataFrame,
+    munros_df: pd.DataFrame,
+    radius_km: float = EDGE_RADIUS_KM,
+    workers: int = 1,
+):
+    """
+    Rebuilds edges only for stations / peaks that were added, moved or renamed
+    since the previous snapshot; every other row is reused from prev_edges.
+    Output is ordered exactly as build_edges would order it.
+    """
+    station_changed = _changed_mask(old_stations, stations_df)
+    munro_changed = _changed_mask(old_munros, munros_df)
+
+    station_pos = {k: i for i, k in enumerate(_node_keys(stations_df))}
+    munro_pos = {k: i for i, k in enumerate(_node_keys(munros_df))}
+    parts = []
+
+    # Reuse rows where both ends are unchanged (removed nodes simply drop out)
+    s_keys = [
+        _node_key(*row)
+        for row in zip(
+            prev_edges["station_name"],
+            prev_edges["station_lat"],
+            prev_edges["station_lon"],
+        )
+    ]
+    m_keys = [
+        _node_key(*row)
+        for row in zip(
+            prev_edges["munro_name"], prev_edges["munro_lat"], prev_edges["munro_lon"]
+        )
+    ]
+    reused = [
+        (station_pos[s], munro_pos[m], d)
+        for s, m, d in zip(s_keys, m_keys, prev_edges["distance_km"])
+        if s in station_pos
+        and m in munro_pos
+        and not station_changed[station_pos[s]]
+        and not munro_changed[munro_pos[m]]
+    ]
+    if reused:
+        s_idx, m_idx, dist = zip(*reused)
+        parts.append(
+            (np.array(s_idx), np.array(m_idx), np.array(dist, dtype=np.float64))
+        )
+
+    # Changed stations against every peak
+    changed_s = np.flatnonzero(station_changed)
+    s_idx, m_idx, dist = spatial_join(
+        stations_df.iloc[changed_s], munros_df, radius_km, workers
+    )
+    parts.append((changed_s[s_idx], m_idx, dist))
+
+    # Unchanged stations against changed peaks
+    kept_s = np.flatnonzero(~station_changed)
+    changed_m = np.flatnonzero(munro_changed)
+    s_idx, m_idx, dist = spatial_join(
+        stations_df.iloc[kept_s], munros_df.iloc[changed_m], radius_km, workers
+    )
+    parts.append((kept_s[s_idx], changed_m[m_idx], dist))
+
+    station_idx = np.concatenate([p[0] for p in parts]).astype(np.int64)
+    peak_idx = np.concatenate([p[1] for p in parts]).astype(np.int64)
+    distances = np.concatenate([p[2] for p in parts])
+    order = np.lexsort((peak_idx, station_idx))
+
+    stats = {
+        "stations_changed": int(station_changed.sum()),
+        "peaks_changed": int(munro_changed.sum()),
+        "stations_removed": len(
+            set(old_stations["osm_id"]) - set(stations_df["osm_id"])
+        ),
+        "peaks_removed": len(set(old_munros["osm_id"]) - set(munros_df["osm_id"])),
+        "edges_reused": len(reused),
+    }
+    return (
+        edge_frame(
+            stations_df,
+            munros_df,
+            station_idx[order],
+            peak_idx[order],
+            distances[order],
+        ),
+        stats,
+    )
+
+
+def _node_key(name, lat, lon) -> tuple:
+    """
+    A node's name and position, with coordinates compared as numbers so
+    "56.80" (a snapshot) and "56.8" (a CSV) are the same place.
+    """
+    return (name, Decimal(str(lat)), Decimal(str(lon)))
+
+
+def _node_keys(df) -> list:
+    return [_node_key(*row) for row in zip(df["name"], df["lat"], df["lon"])]
+
+
+def _changed_mask(old_df, new_df) -> np.ndarray:
+    """
+    True for rows of new_df whose OSM node is new, renamed or moved.
+    """
+    old = dict(zip(old_df["osm_id"], _node_keys(old_df)))
+    return np.array(
+        [
+            old.get(osm_id) != key
+            for osm_id, key in zip(new_df["osm_id"], _node_keys(new_df))
+        ],
+        dtype=bool,
+    )
+
 
-# Process Munros
-munros = []
-for node in munro_result.nodes:
-    ele = node.tags.get("ele")
+def fetch_overpass(query: str) -> bytes:
+    """
+    Runs one Overpass query and returns the raw JSON response body.
+    """
+    response = requests.post(OVERPASS_URL, data={"data": query}, timeout=180)
+    response.raise_for_status()
+    return response.content
+
+
+def save_snapshot(raw_peaks: bytes, raw_stations: bytes, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Stores raw Overpass responses as a new versioned snapshot, unless they are
+    identical to the latest one. Returns the snapshot directory.
+    """
+    checksums = {
+        "peaks.json": hashlib.sha256(raw_peaks).hexdigest(),
+        "stations.json": hashlib.sha256(raw_stations).hexdigest(),
+    }
+    latest = latest_snapshot(snapshot_dir)
+    if latest and load_manifest(latest).get("checksums") == checksums:
+        print(f"[📦 Snapshot unchanged] {latest}")
+        return latest
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(snapshot_dir, version)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "peaks.json"), "wb") as f:
+        f.write(raw_peaks)
+    with open(os.path.join(path, "stations.json"), "wb") as f:
+        f.write(raw_stations)
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(
+            {
+                "version": version,
+                "overpass_url": OVERPASS_URL,
+                "queries": {"peaks.json": munro_query, "stations.json": station_query},
+                "checksums": checksums,
+            },
+            f,
+            indent=2,
+        )
+    with open(os.path.join(snapshot_dir, "LATEST"), "w") as f:
+        f.write(version)
+
+    print(f"[📦 Saved snapshot] {path}")
+    return path
+
+
+def latest_snapshot(snapshot_dir=SNAPSHOT_DIR):
     try:
-        ele = float(ele)
-        if ele >= 914.4:
-            munros.append(
-                {
-                    "name": node.tags.get("name", "Unnamed"),
-                    "lat": node.lat,
-                    "lon": node.lon,
-                    "height": ele,
-                }
-            )
-    except (TypeError, ValueError):
-        continue
-
-# Process Stations
-stations = []
-for node in station_result.nodes:
-    stations.append(
-        {"name": node.tags.get("name", "Unnamed"), "lat": node.lat, "lon": node.lon}
+        with open(os.path.join(snapshot_dir, "LATEST")) as f:
+            return os.path.join(snapshot_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest(path) -> dict:
+    with open(os.path.join(path, "manifest.json")) as f:
+        return json.load(f)
+
+
+def load_snapshot(path):
+    """
+    Parses a snapshot directory into (munros_df, stations_df). Coordinates stay
+    Decimal, as overpy returned them, so the CSVs keep the OSM precision.
+    """
+    with open(os.path.join(path, "peaks.json"), "rb") as f:
+        peak_nodes = _nodes(f.read())
+    with open(os.path.join(path, "stations.json"), "rb") as f:
+        station_nodes = _nodes(f.read())
+
+    # Process Munros
+    munros = []
+    for node in peak_nodes:
+        ele = node.get("tags", {}).get("ele")
+        try:
+            ele = float(ele)
+            if ele >= MUNRO_MIN_HEIGHT_M:
+                munros.append(
+                    {
+                        "osm_id": node["id"],
+                        "name": node["tags"].get("name", "Unnamed"),
+                        "lat": node["lat"],
+                        "lon": node["lon"],
+                        "height": ele,
+                    }
+                )
+        except (TypeError, ValueError):
+            continue
+
+    # Process Stations
+    stations = [
+        {
+            "osm_id": node["id"],
+            "name": node.get("tags", {}).get("name", "Unnamed"),
+            "lat": node["lat"],
+            "lon": node["lon"],
+        }
+        for node in station_nodes
+    ]
+
+    munros_df = pd.DataFrame(munros, columns=["osm_id", "name", "lat", "lon", "height"])
+    stations_df = pd.DataFrame(stations, columns=["osm_id", "name", "lat", "lon"])
+    return munros_df, stations_df
+
+
+def _nodes(raw: bytes) -> list:
+    data = json.loads(raw, parse_float=Decimal)
+    return [e for e in data.get("elements", []) if e.get("type") == "node"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build Munro / station datasets from OSM"
+    )
+    parser.add_argument("--radius-km", type=float, default=EDGE_RADIUS_KM)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--offline", action="store_true", help="Use the latest local snapshot"
+    )
+    parser.add_argument(
+        "--snapshot", help=f"Build from a snapshot directory (e.g. {FIXTURE_SNAPSHOT})"
+    )
+    parser.add_argument("--full", action="store_true", help="Ignore the previous build")
+    parser.add_argument(
+        "--out-dir",
+        help=f"Where to write the datasets (default {DATA_DIR}; "
+        "required with --snapshot)",
     )
+    args = parser.parse_args()
+    if args.out_dir is None:
+        # A fixture or old snapshot must not replace the live datasets by default
+        if args.snapshot:
+            parser.error("--snapshot needs an explicit --out-dir")
+        args.out_dir = DATA_DIR
+
+    if args.snapshot:
+        snapshot = args.snapshot
+    elif args.offline:
+        snapshot = latest_snapshot()
+        if not snapshot:
+            raise SystemExit(f"No local snapshot in {SNAPSHOT_DIR}; run once online.")
+    else:
+        snapshot = save_snapshot(
+            fetch_overpass(munro_query), fetch_overpass(station_query)
+        )
+
+    version = load_manifest(snapshot).get("version")
+    munros_df, stations_df = load_snapshot(snapshot)
+    print(
+        f"[📦 Snapshot {version}] {len(munros_df)} peaks, {len(stations_df)} stations"
+    )
+
+    munros_path = os.path.join(args.out_dir, "munros_osm.csv")
+    stations_path = os.path.join(args.out_dir, "train_stations_osm.csv")
+    edges_path = os.path.join(args.out_dir, "station_to_munro_edges.csv")
+    record_path = os.path.join(args.out_dir, BUILD_RECORD)
+
+    previous = None
+    if not args.full and os.path.exists(record_path) and os.path.exists(edges_path):
+        with open(record_path) as f:
+            previous = json.load(f)
+        if previous.get("radius_km") != args.radius_km or not os.path.isdir(
+            previous.get("snapshot", "")
+        ):
+            previous = None
+
+    if previous and previous.get("version") == version:
+        print("[✅ Datasets already built from this snapshot]")
+        return
+
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    # Save
+    munros_df.drop(columns="osm_id").to_csv(munros_path, index=False)
+    stations_df.drop(columns="osm_id").to_csv(stations_path, index=False)
+
+    print(f"Saved: {munros_path} and {stations_path}")
+
+    if previous:
+        old_munros, old_stations = load_snapshot(previous["snapshot"])
+        prev_edges = pd.read_csv(
+            edges_path,
+            dtype={
+                "station_lat": str,
+                "station_lon": str,
+                "munro_lat": str,
+                "munro_lon": str,
+            },
+            keep_default_na=False,
+        )
+        edges_df, stats = incremental_edges(
+            prev_edges,
+            old_stations,
+            old_munros,
+            stations_df,
+            munros_df,
+            radius_km=args.radius_km,
+            workers=args.workers,
+        )
+        print(f"[♻️ Incremental rebuild] {stats}")
+    else:
+        edges_df = build_edges(
+            stations_df, munros_df, radius_km=args.radius_km, workers=args.workers
+        )
+
+    # Save results
+    edges_df.to_csv(edges_path, index=False)
+    with open(record_path, "w") as f:
+        json.dump(
+            {"snapshot": snapshot, "version": version, "radius_km": args.radius_km},
+            f,
+            indent=2,
+        )
+
+    print(f"Saved: {edges_path}")
+
+    build_registry(
+        path=os.path.join(args.out_dir, "munro_registry.json"),
+        munros_path=munros_path,
+    )
+
+    compile_datasets(
+        out_dir=os.path.join(args.out_dir, "compiled"),
+        munros_path=munros_path,
+        stations_path=stations_path,
+        edges_path=edges_path,
+    )
+
+    # Isochrones depend on the live station data, so only a live build refreshes them
+    if args.out_dir == DATA_DIR:
+        # Imported here: station resolution loads the data written above
+        from tools.isochrones import build_isochrone_cache
+
+        build_isochrone_cache()
+
 
-# Convert to DataFrames
-munros_df = pd.DataFrame(munros)
-stations_df = pd.DataFrame(stations)
-
-# Save
-munros_df.to_csv("data/munros_osm.csv", index=False)
-stations_df.to_csv("data/train_stations_osm.csv", index=False)
-
-print("Saved: data/munros_osm.csv and data/train_stations_osm.csv")
-
-edges = []
-
-for _, station in stations_df.iterrows():
-    for _, munro in munros_df.iterrows():
-        distance = geodesic(
-            (station["lat"], station["lon"]), (munro["lat"], munro["lon"])
-        ).km
-        if distance <= 30:  # Filter for practical hiking proximity
-            edges.append(
-                {
-                    "station_name": station["name"],
-                    "station_lat": station["lat"],
-                    "station_lon": station["lon"],
-                    "munro_name": munro["name"],
-                    "munro_lat": munro["lat"],
-                    "munro_lon": munro["lon"],
-                    "distance_km": round(distance, 2),
-                }
-            )
-
-# Save results
-edges_df = pd.DataFrame(edges)
-edges_df.to_csv("data/station_to_munro_edges.csv", index=False)
-
-print("Saved: data/station_to_munro_edges.csv")
+if __name__ == "__main__":
+    main()
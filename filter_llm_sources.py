@@ -1,7 +1,6 @@
-from langchain_openai import ChatOpenAI
-from difflib import get_close_matches
-
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+from tools.llm_clients import chat_model
+from tools.llm_cache import cached_invoke
+from tools.munros import munro_routes, route_position
 
 
 def extract_top_munros_from_answer(prompt: str, answer: str, sources: list, top_k=3):
@@ -31,7 +30,9 @@ Return ONLY the top {top_k} Munro names — one per line.
 If you name a Munro that was not in the original list, that’s okay — but try to stay relevant to the user’s question.
 """
     try:
-        output = llm.invoke(full_prompt).content
+        output = cached_invoke(
+            "extract_top_munros_from_answer", chat_model(), full_prompt
+        )
         print("\n[🧠 LLM Output]")
         print(output)
 
@@ -44,27 +45,32 @@ If you name a Munro that was not in the original list, that’s okay — but try
         if not ranked_names:
             raise ValueError("LLM returned no Munros")
 
-        # Match ranked names to sources (fuzzy match if possible)
+        # Match ranked names to sources by canonical Munro
+        by_position = {}
+        for s in sources:
+            position = route_position(s.get("name"), s.get("munro_id"))
+            if position is not None:
+                by_position.setdefault(position, s)
+
         final = []
         used = set()
 
         for name in ranked_names:
-            # First try exact match
-            match = next((s for s in sources if s["name"] == name), None)
-
-            # If not found, try fuzzy
-            if not match:
-                names = [s["name"] for s in sources]
-                close = get_close_matches(name, names, n=1, cutoff=0.8)
-                if close:
-                    match = next((s for s in sources if s["name"] == close[0]), None)
-
-            if match and match["name"] not in used:
-                final.append(match)
-                used.add(match["name"])
-            else:
+            position = route_position(name)
+            if position is None:
                 # Include name anyway (no metadata)
                 final.append({"name": name, "url": None})
+                continue
+            if position in used:
+                continue
+            used.add(position)
+
+            match = by_position.get(position)
+            if match is None:
+                # Not among the sources, but a known Munro
+                route = munro_routes[position]
+                match = {"name": route["name"], "url": route["url"]}
+            final.append(match)
 
         return final[:top_k]
 
@@ -1,60 +1,42 @@
 from agent import parse_hike_preferences
 from router import route_based_on_preferences
-from tools.generation import generate_munro_summary
-from rag_retriever import answer_hiking_query
-from filter_llm_sources import extract_top_munros_from_answer
+from tools.generation import generate_munro_summary, stream_munro_summary
+from rag_retriever import answer_with_top_munros
+from tools.llm_cache import print_cache_report
+from tools.munros import munro_routes, registry, route_position
 import sys
-import json
-import unicodedata
-import difflib
 
-
-def normalize_name(name: str) -> str:
-    return (
-        unicodedata.normalize("NFKD", name)
-        .encode("ascii", "ignore")
-        .decode("utf-8")
-        .lower()
-        .replace("’", "'")
-        .lstrip("-• ")
-        .strip()
-    )
-
-
-# Load all Munros into memory for enrichment
-with open("munro_descriptions.json") as f:
-    all_munros = json.load(f)
+# All Munro route descriptions, for enrichment
+all_munros = munro_routes
 
 
 def enrich_munro_metadata(selected: list, all_munros: list) -> list:
     """
-    Match selected Munro names to full metadata using normalization + fuzzy fallback.
+    Match selected Munros to full metadata by registry ID, falling back to the
+    shared route-name index for bare names.
     """
-    # Normalized map of full dataset
-    name_map = {normalize_name(m["name"]): m for m in all_munros}
-    normalized_keys = list(name_map.keys())
-
     enriched = []
 
     for m in selected:
         input_name = m["name"]
-        norm_input = normalize_name(input_name)
-        match = name_map.get(norm_input)
+        position = route_position(input_name, m.get("munro_id"))
+        if position is None:
+            print(f"[⚠️ No match found for] '{input_name}'")
+            continue  # skip unmatched entry
 
-        if not match:
-            # Fuzzy fallback (compare normalized names)
-            close_matches = difflib.get_close_matches(
-                norm_input, normalized_keys, n=1, cutoff=0.8
-            )
-            if close_matches:
-                match = name_map[close_matches[0]]
-                print(f"[🔁 Fuzzy matched] '{input_name}' → '{match['name']}'")
-            else:
-                print(f"[⚠️ No match found for] '{input_name}' → '{norm_input}'")
-                continue  # skip unmatched entry
+        match = all_munros[position]
+        if match["name"] != input_name:
+            print(f"[🔁 Matched] '{input_name}' → '{match['name']}'")
+
+        # Name-only picks get the ID of the route they resolved to
+        munro_id = m.get("munro_id")
+        if munro_id is None and registry is not None:
+            munro_id = registry.routes[position]
 
         enriched.append(
             {
+                "munro_id": munro_id,
+                "route_summary": m.get("route_summary"),
                 "name": match["name"],
                 "distance_km": m.get("distance_km", 0.0),
                 "terrain": match.get("terrain", "N/A"),
@@ -67,9 +49,31 @@ def enrich_munro_metadata(selected: list, all_munros: list) -> list:
     return enriched
 
 
+def print_summary(recommendations: list, stream: bool = False):
+    """
+    Prints the route summary; when streaming, each Munro's section is printed
+    as soon as the LLM has finished writing it.
+    """
+    print("\n[📝 Generating Summary]")
+    if stream:
+        print("\n[📖 Suggested Routes Summary]")
+        for section in stream_munro_summary(recommendations):
+            print(f"---\n{section}\n", flush=True)
+        return
+
+    summary = generate_munro_summary.invoke({"recommendations": recommendations})
+    print("\n[📖 Suggested Routes Summary]")
+    print(summary)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        user_prompt = " ".join(sys.argv[1:])
+    # --stream: print summary sections as they are generated
+    args = sys.argv[1:]
+    stream = "--stream" in args
+    args = [a for a in args if a != "--stream"]
+
+    if args:
+        user_prompt = " ".join(args)
     else:
         user_prompt = input("Enter your hiking query: ")
 
@@ -93,10 +97,7 @@ if __name__ == "__main__":
                 for m in station["top_munros"]:
                     print(f"  - {m['raw']}")
 
-            print("\n[📝 Generating Summary]")
-            summary = generate_munro_summary.invoke({"recommendations": results})
-            print("\n[📖 Suggested Routes Summary]")
-            print(summary)
+            print_summary(results, stream)
 
         elif action == "munros_reranked_by_preferences":
             print("\n[📊 Reranked Munros Based on Your Preferences]")
@@ -113,23 +114,41 @@ if __name__ == "__main__":
                     {"station_name": station["station_name"], "top_munros": enriched}
                 )
 
-            print("\n[📝 Generating Summary]")
-            summary = generate_munro_summary.invoke(
-                {"recommendations": enriched_results}
-            )
-            print("\n[📖 Suggested Routes Summary]")
-            print(summary)
+            print_summary(enriched_results, stream)
 
         elif action == "stations_then_munros":
-            print("\n[ℹ️ Station lookup required]")
-            for item in results:
-                print("-", item)
+            if "origin" in routing_decision:
+                print(
+                    f"\n[🚆 Munros reachable by train from {routing_decision['origin']}]"
+                )
+                for station in results:
+                    print(
+                        f"\n🚉 {station['station_name']} — {station['travel_minutes']} min "
+                        f"({station['departure']} → {station['arrival']})"
+                    )
+                    for m in station["top_munros"]:
+                        print(f"  - {m['raw']}")
+
+                if results:
+                    print_summary(results, stream)
+                else:
+                    print("No stations with nearby Munros are reachable in that time.")
+            else:
+                print("\n[ℹ️ Station lookup required]")
+                for item in results:
+                    print("-", item)
 
         elif action == "freeform_query":
             print("\n[🧠 Freeform Munro Question Detected]")
             print(f"Query: {routing_decision['query']}")
 
-            response = answer_hiking_query(routing_decision["query"])
+            # Step 1: Answer, then pick the top 3 relevant Munros using the LLM
+            # (both reused for paraphrases of an earlier question)
+            response = answer_with_top_munros(
+                routing_decision["query"],
+                top_k=3,
+                preferences=routing_decision.get("preferences"),
+            )
 
             print("\n[🧭 Answer]")
             print(response["answer"])
@@ -138,14 +157,7 @@ if __name__ == "__main__":
             for src in response["sources"]:
                 print(f"- {src['name']} — {src['url']}")
 
-            # Step 1: Pick the top 3 relevant Munros using the LLM
-            top_munros = extract_top_munros_from_answer(
-                prompt=routing_decision["query"],
-                answer=response["answer"],
-                sources=response["sources"],
-                top_k=3,
-            )
-
+            top_munros = response["top_munros"]
             print(top_munros)
 
             # Step 2: Enrich with full metadata
@@ -158,13 +170,7 @@ if __name__ == "__main__":
                 }
             ]
 
-            print("\n[📝 Generating Summary]")
-            summary = generate_munro_summary.invoke(
-                {"recommendations": recommendation_block}
-            )
-
-            print("\n[📖 Suggested Routes Summary]")
-            print(summary)
+            print_summary(recommendation_block, stream)
 
         elif action == "insufficient_input":
             print("\n[⚠️ Not enough information to generate suggestions]")
@@ -177,3 +183,5 @@ if __name__ == "__main__":
     except Exception as e:
         print("\n[❌ Failed to extract hike preferences]")
         print(str(e))
+
+    print_cache_report()
@@ -1,33 +1,284 @@
+import argparse
+import hashlib
 import json
-from langchain.vectorstores import FAISS
-from langchain.embeddings import OpenAIEmbeddings
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-# Load dataset
-with open("munros.json") as f:
-    munros = json.load(f)
-
-# Create documents with metadata
-documents = []
-for m in munros:
-    content = f"{m['name']} — {m['summary']}\n\n{m['description']}"
-    metadata = {
-        "name": m["name"],
-        "distance": m["distance"],
-        "time": m["time"],
-        "grade": m["grade"],
-        "bog": m["bog"],
-        "start": m["start"],
-        "url": m["url"],
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(MODULE_DIR)
+sys.path.insert(0, ROOT)
+
+from munro_rag.vector_store import (  # noqa: E402
+    INDEX_DIR,
+    VectorStore,
+    load_embedding_source,
+    save_index,
+)
+from tools.llm_clients import base_url  # noqa: E402
+from tools.llm_clients import embeddings as make_embeddings  # noqa: E402
+
+MUNROS_PATH = os.path.join(MODULE_DIR, "munros.json")
+REGISTRY_PATH = os.path.join(ROOT, "data", "munro_registry.json")
+EMBEDDING_CACHE_PATH = os.path.join(ROOT, "data", "cache", "embeddings.sqlite")
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+BATCH_SIZE = 64
+MAX_CONCURRENT_BATCHES = 4
+MAX_BATCHES_PER_MINUTE = 120
+MAX_ATTEMPTS = 4
+
+
+def chunk_key(model: str, text: str, endpoint: Optional[str] = None) -> str:
+    """
+    Cache key of one chunk's embedding: the endpoint, the model and the exact
+    chunk text. The default endpoint adds nothing, so its keys are unchanged.
+    """
+    source = f"{endpoint}\n{model}" if endpoint else model
+    return hashlib.sha256(f"{source}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Chunk embeddings on disk, keyed by chunk_key, as float32 blobs in SQLite.
+    Every batch is committed as it lands, so an interrupted build resumes
+    from the last finished batch.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            batch = unique[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT key, vector FROM embeddings WHERE key IN "
+                f"({','.join('?' * len(batch))})",
+                batch,
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, list]):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [
+                (key, np.asarray(vector, dtype=np.float32).tobytes())
+                for key, vector in items.items()
+            ],
+        )
+        self.conn.commit()
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 60 / per_minute seconds apart across threads.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def load_chunks(munros_path: str = MUNROS_PATH) -> List[Document]:
+    """
+    One document per route, with registry IDs in the metadata, split into
+    overlapping chunks.
+    """
+    with open(munros_path) as f:
+        munros = json.load(f)
+
+    # Canonical Munro IDs (python -m tools.registry), keyed by route URL
+    with open(REGISTRY_PATH) as f:
+        munro_ids = {m["url"]: m["id"] for m in json.load(f)["munros"]}
+
+    documents = []
+    for m in munros:
+        content = f"{m['name']} — {m['summary']}\n\n{m['description']}"
+        metadata = {
+            "munro_id": munro_ids.get(m["url"]),
+            "name": m["name"],
+            "distance": m["distance"],
+            "time": m["time"],
+            "grade": m["grade"],
+            "bog": m["bog"],
+            "start": m["start"],
+            "url": m["url"],
+        }
+        documents.append(Document(page_content=content, metadata=metadata))
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    return splitter.split_documents(documents)
+
+
+def embed_batches(
+    texts: Dict[str, str],
+    embed_documents: Callable[[List[str]], List[list]],
+    cache: EmbeddingCache,
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = MAX_CONCURRENT_BATCHES,
+    per_minute: float = MAX_BATCHES_PER_MINUTE,
+):
+    """
+    Embeds texts (key → chunk text) in concurrent, rate-limited batches,
+    retrying failed batches with backoff and storing each in the cache as
+    it completes.
+    """
+    keys = list(texts)
+    batches = [keys[i : i + batch_size] for i in range(0, len(keys), batch_size)]
+    limiter = RateLimiter(per_minute)
+
+    def run(batch: List[str]) -> Dict[str, list]:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            limiter.wait()
+            try:
+                vectors = embed_documents([texts[key] for key in batch])
+                return dict(zip(batch, vectors))
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                print(f"[⚠️ Embedding batch failed, retrying] {e}")
+                time.sleep(2**attempt)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in as_completed([pool.submit(run, batch) for batch in batches]):
+            # Writes stay on this thread: one SQLite connection
+            embedded = future.result()
+            cache.put_many(embedded)
+            done += len(embedded)
+            print(f"  {done}/{len(keys)} chunks embedded")
+
+
+def build_index(
+    index_dir: str = INDEX_DIR,
+    cache_path: str = EMBEDDING_CACHE_PATH,
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = MAX_CONCURRENT_BATCHES,
+    per_minute: float = MAX_BATCHES_PER_MINUTE,
+):
+    """
+    Brings the vector index up to date with munros.json. Chunks already in
+    the index or the embedding cache are reused. Only new or edited chunks
+    are embedded, and the index is only rewritten when something changed.
+    """
+    chunks = load_chunks()
+    embeddings = make_embeddings()  # or HuggingFaceEmbeddings(...)
+    model = getattr(embeddings, "model", type(embeddings).__name__)
+    endpoint = base_url()
+    source = {"model": model, "endpoint": endpoint}
+    keys = [chunk_key(model, doc.page_content, endpoint) for doc in chunks]
+    documents = [
+        {"page_content": d.page_content, "metadata": d.metadata} for d in chunks
+    ]
+
+    vectors: Dict[str, np.ndarray] = {}
+    try:
+        current = VectorStore.load(index_dir)
+    except FileNotFoundError:
+        current = None
+    # Indexes from before the source was recorded were built by the default endpoint
+    current_source = load_embedding_source(index_dir) or {
+        "model": model,
+        "endpoint": None,
+    }
+    if current is not None and current_source == source:
+        for row, doc in enumerate(current.documents):
+            key = chunk_key(model, doc["page_content"], endpoint)
+            vectors[key] = current.vectors[row]
+
+    cache = EmbeddingCache(cache_path)
+    missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+    vectors.update(cache.get_many(missing))
+    texts = {
+        key: doc["page_content"]
+        for key, doc in zip(keys, documents)
+        if key not in vectors
     }
-    documents.append(Document(page_content=content, metadata=metadata))
+    print(
+        f"[🧮 Embedding index] {len(chunks)} chunks: {len(set(keys)) - len(texts)} "
+        f"reused, {len(texts)} to embed"
+    )
+
+    if texts:
+        embed_batches(
+            texts,
+            embeddings.embed_documents,
+            cache,
+            batch_size,
+            concurrency,
+            per_minute,
+        )
+        vectors.update(cache.get_many(list(texts)))
+
+    if (
+        current is not None
+        and current_source == source
+        and current.documents == documents
+    ):
+        print(f"✅ {index_dir} is up to date")
+        return
+
+    old_keys = (
+        {
+            chunk_key(
+                current_source["model"], d["page_content"], current_source["endpoint"]
+            )
+            for d in current.documents
+        }
+        if current is not None
+        else set()
+    )
+    added = len(set(keys) - old_keys)
+    removed = len(old_keys - set(keys))
+    save_index(np.stack([vectors[key] for key in keys]), documents, index_dir, source)
+    print(f"✅ Saved {index_dir}: {len(documents)} chunks (+{added} / -{removed})")
 
-# Optional: split longer texts
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-split_docs = splitter.split_documents(documents)
 
-# Create and save FAISS vector store
-embeddings = OpenAIEmbeddings()  # or HuggingFaceEmbeddings(...)
-vectorstore = FAISS.from_documents(split_docs, embeddings)
-vectorstore.save_local("munro_faiss_index")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Incrementally (re)build the Munro vector index"
+    )
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--cache", default=EMBEDDING_CACHE_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_BATCHES)
+    parser.add_argument(
+        "--per-minute",
+        type=float,
+        default=MAX_BATCHES_PER_MINUTE,
+        help="maximum embedding requests per minute",
+    )
+    args = parser.parse_args()
+    build_index(
+        args.index_dir, args.cache, args.batch_size, args.concurrency, args.per_minute
+    )
@@ -0,0 +1,124 @@
+import json
+import math
+import os
+import sys
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.datasets import ROUTES_PATH  # noqa: E402
+from tools.name_index import normalize_name  # noqa: E402
+
+# Term-frequency multipliers per field (a hit in the title outweighs one in
+# the long description)
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "title": 3.0,
+    "summary": 1.5,
+    "terrain": 1.0,
+    "description": 1.0,
+}
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "can", "do",
+    "for", "from", "good", "i", "in", "into", "is", "it", "me", "munro",
+    "munros", "my", "near", "of", "on", "or", "route", "routes", "that",
+    "the", "there", "this", "to", "up", "via", "walk", "walks", "want",
+    "what", "which", "with", "would", "you",
+}  # fmt: skip
+
+
+@lru_cache(maxsize=None)
+def stem(token: str) -> str:
+    """
+    Light suffix stripping so "scrambling", "scrambles" and "scramble" meet.
+    """
+    for suffix in ("ing", "ies", "es", "ed", "s", "e"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase ASCII stems, accents folded ("Dòrain" matches "Dorain").
+    """
+    return [stem(t) for t in normalize_name(text or "").split() if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over route records, one document per route with field-weighted
+    term frequencies. Term weights are query-independent, so they are worked
+    out once per posting and a query only sums its terms' postings.
+    """
+
+    def __init__(self, routes: List[dict], fields: Dict[str, float] = FIELD_WEIGHTS):
+        self.routes = routes
+        term_freqs = []
+        for route in routes:
+            tf = Counter()
+            for field, weight in fields.items():
+                for token, count in Counter(tokenize(route.get(field))).items():
+                    tf[token] += weight * count
+            term_freqs.append(tf)
+
+        lengths = np.array([sum(tf.values()) for tf in term_freqs], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) else 1.0
+        norms = K1 * (1 - B + B * lengths / max(avg_length, 1e-9))
+
+        postings = defaultdict(list)
+        for doc, tf in enumerate(term_freqs):
+            for term, freq in tf.items():
+                postings[term].append((doc, freq))
+
+        n = len(routes)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in postings.items():
+            docs, freqs = zip(*entries)
+            docs = np.array(docs, dtype=np.int32)
+            freqs = np.array(freqs, dtype=np.float32)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * freqs * (K1 + 1) / (freqs + norms[docs])
+            self.postings[term] = (docs, weights.astype(np.float32))
+
+    def __len__(self):
+        return len(self.routes)
+
+    def search(
+        self, query: str, k: int, mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        (route position, BM25 score) of the k best matching routes, best first.
+        Routes sharing no term with the query, or outside mask, are never
+        returned.
+        """
+        scores = np.zeros(len(self.routes), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term in self.postings:
+                docs, weights = self.postings[term]
+                scores[docs] += weights
+        if mask is not None:
+            scores[~mask] = 0
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+@lru_cache(maxsize=None)
+def get_lexical_index(routes_path: str = ROUTES_PATH) -> BM25Index:
+    """
+    The process-wide BM25 index, built on first use.
+    """
+    with open(routes_path, encoding="utf-8") as f:
+        return BM25Index(json.load(f))
@@ -1,15 +1,10 @@
 from langchain.chains import RetrievalQA
-from langchain.chat_models import ChatOpenAI
 from retriever import get_retriever
-import os
+from tools.llm_clients import chat_model
 
 retriever = get_retriever()
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0,
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-)
+llm = chat_model()
 
 qa_chain = RetrievalQA.from_chain_type(
     llm=llm,
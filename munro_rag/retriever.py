@@ -1,18 +1,176 @@
 import os
-from langchain_community.vectorstores.faiss import FAISS
-from langchain.embeddings import OpenAIEmbeddings
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional
 
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 
-def get_retriever(k=8):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from munro_rag.lexical_index import get_lexical_index, tokenize  # noqa: E402
+from munro_rag.vector_store import VectorStore, get_store  # noqa: E402
+from tools.llm_clients import embed_query  # noqa: E402
+from tools.route_filter import RouteConstraints, constrained_routes  # noqa: E402
+
+# hybrid: BM25 and vector rankings fused; vector: embeddings only;
+# lexical: BM25 only, no embedding call
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+RETRIEVAL_MODE = os.getenv("MUNRO_RETRIEVAL", "hybrid")
+
+RRF_K = 60
+# Each ranking offers this many routes per requested document to the fusion
+CANDIDATES_PER_RESULT = 4
+MAX_CHUNK_CHARS = 1000
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
     """
-    Loads the FAISS vector store retriever from disk and returns a retriever object.
+    Keys ordered by summed 1 / (k + rank) over the rankings; ties keep the
+    order in which keys were first seen.
     """
-    # Resolve full path to the index directory
-    index_path = os.path.join(os.path.dirname(__file__), "munro_faiss_index")
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1 / (k + rank)
+    return sorted(scores, key=lambda key: -scores[key])
 
-    embeddings = OpenAIEmbeddings()
-    vectorstore = FAISS.load_local(
-        index_path, embeddings, allow_dangerous_deserialization=True
+
+def _optional_store() -> Optional[VectorStore]:
+    try:
+        return get_store()
+    except FileNotFoundError:
+        return None
+
+
+def _route_document(route: dict, terms: set, store: Optional[VectorStore]) -> dict:
+    """
+    The stored chunk of a lexically matched route sharing most query terms,
+    or an excerpt of the route itself when the vector index lacks it.
+    """
+    rows = store.rows_by_url.get(route.get("url"), []) if store else []
+    if rows:
+        best = max(
+            rows,
+            key=lambda row: len(
+                terms & set(tokenize(store.documents[row]["page_content"]))
+            ),
+        )
+        return store.document(best)
+
+    content = f"{route['name']} — {route['summary']}\n\n{route['description']}"
+    return {
+        "page_content": content[:MAX_CHUNK_CHARS],
+        "metadata": {
+            "munro_id": None,
+            **{
+                field: route.get(field)
+                for field in ("name", "distance", "time", "grade", "bog", "start")
+            },
+            "url": route.get("url"),
+        },
+    }
+
+
+@lru_cache(maxsize=1)
+def chunk_route_positions() -> np.ndarray:
+    """
+    munro_descriptions.json position of every chunk's route (-1 if unknown).
+    """
+    positions = {route["url"]: i for i, route in enumerate(get_lexical_index().routes)}
+    return np.array(
+        [
+            positions.get(doc["metadata"].get("url"), -1)
+            for doc in get_store().documents
+        ],
+        dtype=np.int64,
     )
 
-    return vectorstore.as_retriever(search_kwargs={"k": k})
+
+def eligible_rows(route_mask: np.ndarray) -> np.ndarray:
+    """
+    Sorted vector-store rows whose route is allowed by route_mask.
+    """
+    positions = chunk_route_positions()
+    known = positions >= 0
+    return np.flatnonzero(known & route_mask[np.maximum(positions, 0)])
+
+
+def retrieve(
+    query: str,
+    k: int = 8,
+    mode: str = RETRIEVAL_MODE,
+    constraints: Optional[RouteConstraints] = None,
+) -> List[dict]:
+    """
+    Top-k chunks for query, one per route in hybrid and lexical modes, as
+    {"page_content", "metadata"} dicts. With constraints, only chunks of
+    routes within them are scored, so no top-k slot goes to an ineligible
+    route.
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}")
+
+    route_mask = constrained_routes(constraints) if constraints else None
+
+    def vector_search(store: VectorStore, limit: int):
+        rows = eligible_rows(route_mask) if route_mask is not None else None
+        return store.search(embed_query(query), limit, rows)
+
+    if mode == "vector":
+        store = get_store()
+        return [store.document(row) for row, _ in vector_search(store, k)]
+
+    candidates = k * CANDIDATES_PER_RESULT
+    lexical = get_lexical_index()
+    lexical_routes: Dict[str, dict] = {}
+    for position, _ in lexical.search(query, candidates, route_mask):
+        route = lexical.routes[position]
+        lexical_routes.setdefault(route["url"], route)
+
+    vector_rows: Dict[str, int] = {}
+    store = get_store() if mode == "hybrid" else _optional_store()
+    if mode == "hybrid":
+        for row, _ in vector_search(store, candidates):
+            url = store.documents[row]["metadata"].get("url")
+            vector_rows.setdefault(url, row)
+
+    terms = set(tokenize(query))
+    documents = []
+    for url in reciprocal_rank_fusion([list(vector_rows), list(lexical_routes)])[:k]:
+        if url in vector_rows:
+            documents.append(store.document(vector_rows[url]))
+        else:
+            documents.append(_route_document(lexical_routes[url], terms, store))
+    return documents
+
+
+class MunroRetriever(BaseRetriever):
+    """
+    Top-k chunks from the process-wide vector and BM25 indexes, optionally
+    restricted to routes within constraints. Stateless, so one instance
+    serves every query and thread.
+    """
+
+    k: int = 8
+    mode: str = RETRIEVAL_MODE
+    constraints: Optional[RouteConstraints] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager=None
+    ) -> List[Document]:
+        return [
+            Document(**doc)
+            for doc in retrieve(query, self.k, self.mode, self.constraints)
+        ]
+
+
+@lru_cache(maxsize=64)
+def get_retriever(k=8, mode=RETRIEVAL_MODE, constraints=None):
+    """
+    Shared retriever over the indexes, loaded once per process: a query costs
+    at most one embedding call plus the searches (none in lexical mode).
+    """
+    return MunroRetriever(k=k, mode=mode, constraints=constraints)
@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "munro_vector_index"
+)
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+CODES_FILE = "codes.npy"
+QUANTIZER_FILE = "quantizer.npy"
+# Model and endpoint the vectors came from, written by the index builder
+EMBEDDING_FILE = "embedding.json"
+
+# Scan int8 codes, then re-rank a shortlist exactly (off: exact float scan)
+QUANTIZED = os.getenv("MUNRO_QUANTIZED_INDEX", "0") == "1"
+# Shortlist size per requested result for the exact re-rank
+RERANK_FACTOR = 8
+# Rows per block when widening int8 codes for the scan
+SCAN_BLOCK_ROWS = 256
+
+
+def unit_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 codes: x ≈ offset + scale * code, code in [-127, 127].
+    A quarter of the float32 size; inner products with a float query come
+    straight from the codes.
+    """
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        scale = (high - low) / 254
+        return cls((high + low) / 2, np.where(scale == 0, 1, scale))
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors) - self.offset) / self.scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Approximate query · x for every coded row.
+        """
+        weights = query * self.scale
+        scores = np.empty(len(codes), dtype=np.float32)
+        # Widen one cache-sized block at a time into a reused buffer
+        buffer = np.empty((SCAN_BLOCK_ROWS, len(weights)), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+            block = codes[start : start + SCAN_BLOCK_ROWS]
+            widened = buffer[: len(block)]
+            np.copyto(widened, block, casting="unsafe")
+            np.dot(widened, weights, out=scores[start : start + len(block)])
+        return scores + float(query @ self.offset)
+
+
+class VectorStore:
+    """
+    Chunk embeddings as one unit-normalised float32 .npy matrix, memory-mapped
+    read-only so every worker process shares the same page cache, plus the
+    chunk text and metadata as JSON (no pickle). Search is an exact
+    inner-product scan, which ranks like FAISS's L2 on unit vectors.
+
+    With int8 codes (quantized), the scan reads the codes instead and only a
+    shortlist of RERANK_FACTOR * k rows is scored exactly from the float
+    matrix, so a worker touches about a quarter of the index memory.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        documents: List[dict],
+        codes: Optional[np.ndarray] = None,
+        quantizer: Optional[ScalarQuantizer] = None,
+    ):
+        if len(vectors) != len(documents):
+            raise ValueError(
+                f"{len(vectors)} vectors for {len(documents)} documents in the index"
+            )
+        if codes is not None and len(codes) != len(vectors):
+            raise ValueError(f"{len(codes)} codes for {len(vectors)} vectors")
+        self.vectors = vectors
+        self.documents = documents
+        self.codes = codes
+        self.quantizer = quantizer
+        self.rows_by_url: Dict[str, List[int]] = {}
+        for row, doc in enumerate(documents):
+            self.rows_by_url.setdefault(doc["metadata"].get("url"), []).append(row)
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def load(
+        cls, index_dir: str = INDEX_DIR, quantized: bool = QUANTIZED
+    ) -> "VectorStore":
+        vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, DOCUMENTS_FILE), encoding="utf-8") as f:
+            documents = json.load(f)
+
+        codes = quantizer = None
+        if quantized:
+            try:
+                codes = np.load(os.path.join(index_dir, CODES_FILE), mmap_mode="r")
+                offset, scale = np.load(os.path.join(index_dir, QUANTIZER_FILE))
+                quantizer = ScalarQuantizer(offset, scale)
+            except FileNotFoundError:
+                print("[⚠️ No int8 codes in the index] Rebuild it; searching floats")
+                codes = None
+        return cls(vectors, documents, codes, quantizer)
+
+    def search(
+        self, embedding, k: int, rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        (row, cosine similarity) of the k nearest chunks, best first. With
+        rows (sorted row numbers), only those chunks are read and scored.
+        """
+        query = unit_rows(embedding)
+        if self.codes is not None:
+            return self._search_codes(query, k, rows)
+        if rows is None:
+            scores = self.vectors @ query
+            rows = np.arange(len(scores))
+        else:
+            scores = self.vectors[rows] @ query
+        return _top_k(scores, rows, k)
+
+    def _search_codes(
+        self, query: np.ndarray, k: int, rows: Optional[np.ndarray]
+    ) -> List[Tuple[int, float]]:
+        codes = self.codes if rows is None else self.codes[rows]
+        if rows is None:
+            rows = np.arange(len(codes))
+        shortlist = _top_k(self.quantizer.scores(codes, query), rows, RERANK_FACTOR * k)
+        # Exact re-rank: only the shortlisted float rows are read
+        candidates = np.array(sorted(row for row, _ in shortlist), dtype=np.int64)
+        return _top_k(self.vectors[candidates] @ query, candidates, k)
+
+    def document(self, row: int) -> dict:
+        """
+        Chunk text and a copy of its metadata (callers may annotate it).
+        """
+        doc = self.documents[row]
+        return {"page_content": doc["page_content"], "metadata": dict(doc["metadata"])}
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    if not len(scores):
+        return []
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(int(rows[i]), float(scores[i])) for i in top]
+
+
+def save_index(
+    vectors,
+    documents: List[dict],
+    index_dir: str = INDEX_DIR,
+    embedding: Optional[dict] = None,
+):
+    """
+    Write an index (float vectors, int8 codes, documents and, if known, the
+    embedding source), replacing any previous one only once every file is
+    complete so running workers never map a half-written matrix.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    vectors = unit_rows(vectors)
+    quantizer = ScalarQuantizer.fit(vectors)
+    arrays = {
+        VECTORS_FILE: vectors,
+        CODES_FILE: quantizer.encode(vectors),
+        QUANTIZER_FILE: np.stack([quantizer.offset, quantizer.scale]),
+    }
+
+    for name, array in arrays.items():
+        with open(os.path.join(index_dir, name) + ".tmp", "wb") as f:
+            np.save(f, array)
+    records = {DOCUMENTS_FILE: documents}
+    if embedding is not None:
+        records[EMBEDDING_FILE] = embedding
+    for name, record in records.items():
+        with open(os.path.join(index_dir, name) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+    for name in [*arrays, *records]:
+        path = os.path.join(index_dir, name)
+        os.replace(path + ".tmp", path)
+    if embedding is None and os.path.exists(os.path.join(index_dir, EMBEDDING_FILE)):
+        os.remove(os.path.join(index_dir, EMBEDDING_FILE))
+
+
+def load_embedding_source(index_dir: str = INDEX_DIR) -> Optional[dict]:
+    """
+    {"model", "endpoint"} the index was embedded with, or None if unrecorded.
+    """
+    try:
+        with open(os.path.join(index_dir, EMBEDDING_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# index_dir → (file stamps, store) of the last load
+_stores: Dict[str, Tuple[tuple, VectorStore]] = {}
+
+
+def _index_stamp(index_dir: str) -> tuple:
+    stamps = []
+    for name in (VECTORS_FILE, DOCUMENTS_FILE, CODES_FILE, QUANTIZER_FILE):
+        try:
+            stat = os.stat(os.path.join(index_dir, name))
+        except FileNotFoundError:
+            continue
+        stamps.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(stamps)
+
+
+def get_store(index_dir: str = INDEX_DIR) -> VectorStore:
+    """
+    The process-wide store, loaded on first use and reloaded once the index
+    files change, so a rebuilt index is served without a restart.
+    """
+    stamp = _index_stamp(index_dir)
+    cached = _stores.get(index_dir)
+    if cached is None or cached[0] != stamp:
+        cached = _stores[index_dir] = (stamp, VectorStore.load(index_dir))
+    return cached[1]
+
+
+def convert_faiss_index(faiss_dir: str, index_dir: str = INDEX_DIR):
+    """
+    One-off migration of a LangChain FAISS store (index.faiss + index.pkl),
+    reusing its vectors instead of re-embedding the corpus.
+    """
+    from langchain_community.vectorstores.faiss import FAISS
+
+    # Embeddings are never called while copying vectors out
+    store = FAISS.load_local(faiss_dir, None, allow_dangerous_deserialization=True)
+    vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    documents = []
+    for i in range(store.index.ntotal):
+        doc = store.docstore.search(store.index_to_docstore_id[i])
+        documents.append({"page_content": doc.page_content, "metadata": doc.metadata})
+    save_index(vectors, documents, index_dir)
+    print(f"✅ Converted {len(documents)} chunks to {index_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a LangChain FAISS store to the memory-mapped index"
+    )
+    parser.add_argument("faiss_dir", nargs="?", default="munro_rag/munro_faiss_index")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args()
+    convert_faiss_index(args.faiss_dir, args.index_dir)
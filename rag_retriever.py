@@ -1,50 +1,263 @@
+import json
 import os
 import re
-import unicodedata
-from typing import List, Dict
+from functools import lru_cache
+from typing import Dict, List, Optional
 from langchain.chains import RetrievalQA
-from langchain.chat_models import ChatOpenAI
-from munro_rag.retriever import get_retriever
+from munro_rag.retriever import RETRIEVAL_MODE, get_retriever
+from filter_llm_sources import extract_top_munros_from_answer
+from tools.llm_cache import acached_invoke, cached, cached_invoke, llm_params
+from tools.llm_clients import base_url, chat_model
+from tools.munros import peak_names, registry, resolve_peak
 from tools.parse_hike_preferences import HikePreferences
+from tools.route_filter import RouteConstraints
+from tools.route_ranking import rank_candidates, tied_at_top
+from tools.semantic_cache import index_fingerprint, semantic_cached
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+# Freeform questions: one structured call for answer, picks and summaries
+# (0 = RetrievalQA answer, then a separate pick and summary call)
+SINGLE_CALL_ANSWERS = os.getenv("MUNRO_SINGLE_CALL_ANSWERS", "1") != "0"
 
+# Let the LLM order routes the metadata ranking can't separate (off by default)
+LLM_TIEBREAK = os.getenv("MUNRO_LLM_TIEBREAK", "0") == "1"
 
-def answer_hiking_query(query: str) -> dict:
+
+def qa_chain(k: int = 8, constraints: RouteConstraints = None) -> RetrievalQA:
     """
-    Answers a natural language question about Munros using RAG (Retriever-Augmented Generation).
+    Shared RetrievalQA chain over the process-wide retriever and the chat
+    model of the configured endpoint.
     """
-    retriever = get_retriever()
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0,
-        openai_api_key=os.getenv("OPENAI_API_KEY"),
-    )
+    return _qa_chain(k, constraints, base_url())
+
 
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        retriever=retriever,
+@lru_cache(maxsize=64)
+def _qa_chain(k: int, constraints: RouteConstraints, url: Optional[str]) -> RetrievalQA:
+    return RetrievalQA.from_chain_type(
+        llm=chat_model(),
+        retriever=get_retriever(k=k, constraints=constraints),
         chain_type="stuff",
         return_source_documents=True,
     )
 
-    result = qa_chain(query)
-    return {
-        "answer": result["result"],
-        "sources": [
-            {"name": doc.metadata.get("name"), "url": doc.metadata.get("url")}
-            for doc in result["source_documents"]
-        ],
-    }
+
+def answer_hiking_query(query: str, constraints: RouteConstraints = None) -> dict:
+    """
+    Answers a natural language question about Munros using RAG (Retriever-Augmented Generation).
+    With constraints, only routes within them are retrieved.
+    """
+    k = 8
+    llm = chat_model()
+
+    def run_chain() -> dict:
+        result = qa_chain(k, constraints)(query)
+        return {
+            "answer": result["result"],
+            "sources": [
+                {
+                    "name": doc.metadata.get("name"),
+                    "url": doc.metadata.get("url"),
+                    "munro_id": doc.metadata.get("munro_id"),
+                }
+                for doc in result["source_documents"]
+            ],
+        }
+
+    # Keyed on the query, the retrieval setup and the indexes' fingerprint,
+    # so a rebuilt index is never answered from stale sources
+    return cached(
+        "answer_hiking_query",
+        llm.model_name,
+        {
+            **llm_params(llm),
+            "k": k,
+            "retrieval": RETRIEVAL_MODE,
+            "index": index_fingerprint(),
+            "constraints": constraints._asdict() if constraints else None,
+        },
+        query,
+        run_chain,
+    )
 
 
-def rank_munros_by_preferences(preferences: HikePreferences, munros: list) -> list:
+def structured_answer_prompt(query: str, documents: list, top_k: int) -> str:
     """
-    Uses the LLM to semantically rank a provided list of Munros based on the user's preferences.
+    One prompt for the answer, the ranked Munro IDs and their route summaries.
+    Retrieved chunks are grouped per Munro under its registry ID.
     """
-    if not munros:
-        return []
+    blocks = {}
+    for doc in documents:
+        munro_id = doc.metadata.get("munro_id")
+        label = f"[{munro_id}] " if munro_id is not None else ""
+        blocks.setdefault(
+            munro_id if munro_id is not None else doc.metadata.get("name"),
+            [f"{label}{doc.metadata.get('name')}"],
+        ).append(doc.page_content)
+    context = "\n\n".join("\n".join(block) for block in blocks.values())
+
+    return f"""
+You are an experienced Scottish hiking guide. Answer the user's question using
+only the Munro route descriptions below. Each Munro is headed by its ID in
+square brackets.
+
+{context}
+
+Question: {query}
+
+Return a valid JSON object with keys:
+- answer: your answer to the question (string)
+- munro_ids: IDs of the up to {top_k} Munros above that best match the
+  question, best first (list of ints; only IDs listed above)
+- summaries: for each of those IDs, a Route Summary in 2–3 friendly sentences
+  covering terrain, difficulty, highlights and anything to prepare for
+  (object mapping the ID as a string to a string)
+"""
+
+
+def answer_in_one_call(
+    query: str, top_k: int = 3, k: int = 8, constraints: RouteConstraints = None
+) -> dict:
+    """
+    Freeform answer in a single LLM round trip: retrieval feeds one structured
+    call that returns the answer, the top Munros (limited to the retrieved
+    sources) and a route summary for each.
+    """
+    documents = get_retriever(k=k, constraints=constraints).get_relevant_documents(
+        query
+    )
+    if constraints and not documents:
+        print("[🚫 No Munro routes within your limits] Searching all routes")
+        documents = get_retriever(k=k).get_relevant_documents(query)
+    for doc in documents:
+        if doc.metadata.get("munro_id") is None and registry is not None:
+            doc.metadata["munro_id"] = registry.id_for_name(doc.metadata.get("name"))
+
+    sources = [
+        {
+            "name": doc.metadata.get("name"),
+            "url": doc.metadata.get("url"),
+            "munro_id": doc.metadata.get("munro_id"),
+        }
+        for doc in documents
+    ]
+    content = cached_invoke(
+        "answer_in_one_call",
+        chat_model(),
+        structured_answer_prompt(query, documents, top_k),
+    )
+
+    try:
+        # Tolerate a ```json fence around the object
+        parsed = json.loads(re.sub(r"^```(?:json)?|```$", "", content.strip()).strip())
+        answer = parsed["answer"]
+        ids = [int(i) for i in parsed.get("munro_ids") or []]
+        summaries = {str(k): v for k, v in (parsed.get("summaries") or {}).items()}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Unparseable structured answer: {e}\n{content}")
+
+    by_id = {}
+    for source in sources:
+        if source["munro_id"] is not None:
+            by_id.setdefault(source["munro_id"], source)
+    top_munros, seen = [], set()
+    for munro_id in ids:
+        source = by_id.get(munro_id)
+        if source is None or munro_id in seen:
+            continue  # not retrieved: never recommend it
+        seen.add(munro_id)
+        top_munros.append({**source, "route_summary": summaries.get(str(munro_id))})
+    return {"answer": answer, "sources": sources, "top_munros": top_munros[:top_k]}
+
+
+def answer_with_top_munros(
+    query: str, top_k: int = 3, preferences: HikePreferences = None
+) -> dict:
+    """
+    Answer to a freeform question plus the top Munros for it (with route
+    summaries in single-call mode). Paraphrases of an earlier question reuse
+    its result through the semantic cache, skipping retrieval and the LLM
+    (except with lexical retrieval, which makes no embedding call to reuse).
+    Hard limits in preferences (time, distance, grade, bog) filter retrieval.
+    """
+    constraints = (
+        RouteConstraints.from_preferences(preferences) if preferences else None
+    )
 
+    def compute() -> dict:
+        if SINGLE_CALL_ANSWERS:
+            try:
+                return answer_in_one_call(query, top_k=top_k, constraints=constraints)
+            except ValueError as e:
+                print(f"[⚠️ Fallback: separate answer and pick calls] — {e}")
+
+        response = answer_hiking_query(query, constraints)
+        top_munros = extract_top_munros_from_answer(
+            prompt=query,
+            answer=response["answer"],
+            sources=response["sources"],
+            top_k=top_k,
+        )
+        return {**response, "top_munros": top_munros}
+
+    # The cache embeds every query; lexical retrieval exists to avoid that
+    if RETRIEVAL_MODE == "lexical":
+        result = compute()
+    else:
+        result = semantic_cached(
+            query,
+            compute,
+            constraints=constraints._asdict() if constraints else None,
+        )
+    return {**result, "top_munros": result["top_munros"][:top_k]}
+
+
+def rank_munros_by_preferences(
+    preferences: HikePreferences, munros: list, tiebreak: bool = LLM_TIEBREAK
+) -> list:
+    """
+    Ranks a station's candidate Munros against the user's preferences from route
+    metadata (distance, time, grade, bog and description keywords). The LLM is
+    only asked to order locally tied routes, when tiebreak is on and there are
+    subjective preferences.
+    """
+    ranked = rank_candidates(preferences, munros)
+    tied = tied_at_top(ranked)
+    if not (tiebreak and preferences.soft_preferences and tied > 1):
+        return ranked
+
+    prompt = rerank_prompt(preferences, ranked[:tied])
+    result = cached_invoke("rank_munros_by_preferences", chat_model(), prompt)
+    return break_ties(ranked, tied, ranked_from_output(result, ranked[:tied]))
+
+
+async def arank_munros_by_preferences(
+    preferences: HikePreferences, munros: list, tiebreak: bool = LLM_TIEBREAK
+) -> list:
+    """
+    Async rank_munros_by_preferences, so several stations' tie-breaks can run at once.
+    """
+    ranked = rank_candidates(preferences, munros)
+    tied = tied_at_top(ranked)
+    if not (tiebreak and preferences.soft_preferences and tied > 1):
+        return ranked
+
+    prompt = rerank_prompt(preferences, ranked[:tied])
+    result = await acached_invoke("rank_munros_by_preferences", chat_model(), prompt)
+    return break_ties(ranked, tied, ranked_from_output(result, ranked[:tied]))
+
+
+def break_ties(ranked: list, tied: int, llm_order: list) -> list:
+    """
+    Reorders the first tied candidates as the LLM ranked them; any it left out
+    keep their local order after those it named.
+    """
+    head = llm_order + [m for m in ranked[:tied] if m not in llm_order]
+    return head + ranked[tied:]
+
+
+def rerank_prompt(preferences: HikePreferences, munros: list) -> str:
+    """
+    The reranking prompt for one station's candidate Munros.
+    """
     # Clean any leading symbols from names at the source
     for m in munros:
         m["name"] = m["name"].lstrip("-• ").strip()
@@ -80,8 +293,13 @@ Please carefully consider the user's preferences and rank the top 3–5 Munros f
 
 Return only the Munro names, one per line.
 """
+    return prompt
+
 
-    result = llm.invoke(prompt).content
+def ranked_from_output(result: str, munros: list) -> list:
+    """
+    Parses the LLM's one-name-per-line ranking and matches it to the candidates.
+    """
     ranked_names = [
         line.strip("-• ").strip()
         for line in result.strip().splitlines()
@@ -98,29 +316,26 @@ Return only the Munro names, one per line.
     return match_ranked_munros(ranked_names, munros)
 
 
-def normalize_name(name: str) -> str:
-    """
-    Normalize a string to ASCII, lowercase, and remove apostrophes and accents.
-    """
-    return (
-        unicodedata.normalize("NFKD", name)
-        .encode("ascii", "ignore")
-        .decode("utf-8")
-        .lower()
-        .replace("’", "'")
-        .strip()
-    )
-
-
 def match_ranked_munros(ranked_names: list, munros: list) -> list:
     """
-    Match LLM-ranked names back to full munro objects with robust matching.
+    Match LLM-ranked names back to full munro objects: by normalized name, then
+    by registry ID (any known spelling), then through the shared peak-name index.
     """
+    by_name, by_id = {}, {}
+    for m in munros:
+        by_name.setdefault(peak_names.normalize(m["name"]), m)
+        if m.get("munro_id") is not None:
+            by_id.setdefault(m["munro_id"], m)
+
     matches = []
     for ranked in ranked_names:
-        norm_ranked = normalize_name(ranked)
-        for m in munros:
-            if normalize_name(m["name"]) == norm_ranked:
-                matches.append(m)
-                break
+        m = by_name.get(peak_names.normalize(ranked))
+        if m is None and registry is not None:
+            m = by_id.get(registry.id_for_name(ranked))
+        if m is None:
+            resolved = resolve_peak(ranked)
+            if resolved is not None:
+                m = by_name.get(peak_names.normalize(resolved.name))
+        if m is not None and m not in matches:
+            matches.append(m)
     return matches
@@ -1,51 +1,82 @@
 from tools.parse_hike_preferences import HikePreferences
-from tools.munros import get_munros_near_station
-from rag_retriever import rank_munros_by_preferences
+from tools.munros import munro_id_for_peak, munros_near_station
+from tools.transport import ambiguous_station, resolve_station
+from tools.timetable import DEFAULT_DEPARTURE, load_timetable
+from tools.isochrones import get_isochrone_cache
+from tools.route_filter import peaks_matching
+from rag_retriever import arank_munros_by_preferences
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import time
 
+# Stations reranked at once (1 = one after another)
+RERANK_CONCURRENCY = int(os.getenv("MUNRO_RERANK_CONCURRENCY", "4"))
 
-def route_based_on_preferences(preferences: HikePreferences, user_prompt: str) -> dict:
+
+def station_candidates(station_name: str, limit: int, peak_mask=None) -> list:
     """
-    Decides what tool or function to call next based on the parsed hike preferences.
-    Handles:
-    - Munros near stations only
-    - Station + preferences (uses RAG to rank)
-    - Origin city + travel time
-    - Freeform / fallback queries
+    Nearest Munros to a station as router entries (registry munro_id, name,
+    distance_km, raw line), optionally only those allowed by peak_mask.
     """
+    return [
+        {
+            "munro_id": munro_id_for_peak(m.peak_id),
+            "peak_id": m.peak_id,
+            "name": m.name,
+            "distance_km": m.distance_km,
+            "raw": f"- {m.name} ({m.distance_km} km)",
+        }
+        for m in munros_near_station(station_name, limit=limit, peak_mask=peak_mask)
+    ]
 
-    # ✅ Case 1: Station(s) + preferences => fetch nearby Munros, then rerank
-    if preferences.station_keywords and any(
-        [
-            preferences.max_time_hours,
-            preferences.max_distance_km,
-            preferences.grade,
-            preferences.bog_tolerance,
-            preferences.features,
-            preferences.soft_preferences,
-        ]
-    ):
-        reranked_results = []
-
-        for keyword in preferences.station_keywords:
-            raw_text = get_munros_near_station.invoke({"station_name": keyword})
-
-            munro_lines = raw_text.split("\n")[1:] if "\n" in raw_text else []
-            munro_entries = []
-
-            for line in munro_lines:
-                if not line.strip():
-                    continue
-                try:
-                    name_part = line.split(" (")[0].strip()
-                    distance_km = float(line.split(" (")[1].replace(" km)", ""))
-                    munro_entries.append(
-                        {"name": name_part, "distance_km": distance_km, "raw": line}
-                    )
-                except (IndexError, ValueError):
-                    continue
+
+def resolve_station_keywords(keywords: list) -> list:
+    """
+    Maps LLM-extracted station mentions to canonical station names, keeping order
+    and dropping duplicates. Unresolvable or ambiguous mentions are passed
+    through unchanged.
+    """
+    resolved = []
+    for keyword in keywords:
+        match = resolve_station(keyword)
+        name = match.name if match else keyword
+        if match and name != keyword:
+            print(f"[🚉 Resolved station] '{keyword}' → '{name}' ({match.method})")
+        elif match is None:
+            candidates = ambiguous_station(keyword)
+            if candidates:
+                print(
+                    f"[❓ Ambiguous station] '{keyword}' could be "
+                    + ", ".join(m.name for m in candidates)
+                )
+        if name not in resolved:
+            resolved.append(name)
+    return resolved
+
+
+async def arerank_stations(
+    preferences: HikePreferences,
+    keywords: list,
+    concurrency: int = RERANK_CONCURRENCY,
+) -> list:
+    """
+    Fetches nearby Munros and reranks them for each station, with up to
+    concurrency stations (and their optional LLM tie-breaks) in flight. Results keep the order of keywords.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    elapsed = [0.0] * len(keywords)
+    # Hard limits (time, distance, grade, bog) prune candidates before ranking
+    peak_mask = peaks_matching(preferences)
+
+    async def rerank(i: int, keyword: str) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
 
             # Limit to top 15 closest for reranking
-            candidates = sorted(munro_entries, key=lambda x: x["distance_km"])[:15]
+            candidates = station_candidates(keyword, limit=15, peak_mask=peak_mask)
+            if peak_mask is not None and not candidates:
+                print(f"\n[🚫 No Munros near '{keyword}' within your limits]")
 
             # ✅ Debug print
             print(f"\n[🔍 Nearby Munros near '{keyword}' (before reranking)]")
@@ -53,14 +84,92 @@ def route_based_on_preferences(preferences: HikePreferences, user_prompt: str) -
                 print(f"  - {m['name']} ({m['distance_km']} km)")
 
             # Rerank based on structured + soft preferences
-            reranked = rank_munros_by_preferences(preferences, candidates)[:3]
+            reranked = (await arank_munros_by_preferences(preferences, candidates))[:3]
 
             # ✅ Debug: Show ranked results
             print(f"\n[🏅 Top-ranked Munros near '{keyword}']")
             for m in reranked:
-                print(f"  - {m['name']} ({m['distance_km']} km)")
+                print(f"  - {m['name']} ({m['distance_km']} km, score {m['score']})")
+
+            elapsed[i] = time.perf_counter() - started
+        return {"station_name": keyword, "top_munros": reranked}
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(rerank(i, k) for i, k in enumerate(keywords)))
+    wall = time.perf_counter() - started
+
+    if len(keywords) > 1:
+        print(
+            f"\n[⏱️ Reranked {len(keywords)} stations in {wall:.2f}s "
+            f"(one at a time ≈ {sum(elapsed):.2f}s, saved {max(sum(elapsed) - wall, 0):.2f}s)]"
+        )
+    return list(results)
+
+
+def wants_rerank(preferences: HikePreferences) -> bool:
+    """
+    True when stations come with preferences, so nearby Munros get reranked.
+    """
+    return bool(preferences.station_keywords) and any(
+        [
+            preferences.max_time_hours,
+            preferences.max_distance_km,
+            preferences.grade,
+            preferences.bog_tolerance,
+            preferences.features,
+            preferences.soft_preferences,
+        ]
+    )
+
+
+def run_coroutine(coro):
+    """
+    Runs coro to completion from sync code. Inside a running event loop (a
+    notebook, an async server) asyncio.run would raise, so the coroutine gets
+    its own loop on a worker thread; async callers should await it instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+async def aroute_based_on_preferences(
+    preferences: HikePreferences, user_prompt: str
+) -> dict:
+    """
+    Async route_based_on_preferences: awaits the station reranking on the
+    caller's loop, and runs the other (blocking) cases on a worker thread.
+    """
+    if wants_rerank(preferences):
+        reranked_results = await arerank_stations(
+            preferences, resolve_station_keywords(preferences.station_keywords)
+        )
+        return {"action": "munros_reranked_by_preferences", "results": reranked_results}
+
+    return await asyncio.to_thread(route_based_on_preferences, preferences, user_prompt)
+
+
+def route_based_on_preferences(preferences: HikePreferences, user_prompt: str) -> dict:
+    """
+    Decides what tool or function to call next based on the parsed hike preferences.
+    Handles:
+    - Munros near stations only
+    - Station + preferences (uses RAG to rank)
+    - Origin city + travel time
+    - Freeform / fallback queries
+    Async callers should await aroute_based_on_preferences instead.
+    """
 
-            reranked_results.append({"station_name": keyword, "top_munros": reranked})
+    # ✅ Case 1: Station(s) + preferences => fetch nearby Munros, then rerank
+    if wants_rerank(preferences):
+        reranked_results = run_coroutine(
+            arerank_stations(
+                preferences, resolve_station_keywords(preferences.station_keywords)
+            )
+        )
 
         return {"action": "munros_reranked_by_preferences", "results": reranked_results}
 
@@ -68,24 +177,8 @@ def route_based_on_preferences(preferences: HikePreferences, user_prompt: str) -
     elif preferences.station_keywords:
         station_results = []
 
-        for keyword in preferences.station_keywords:
-            raw_text = get_munros_near_station.invoke({"station_name": keyword})
-            munro_lines = raw_text.split("\n")[1:] if "\n" in raw_text else []
-
-            munro_entries = []
-            for line in munro_lines:
-                if not line.strip():
-                    continue
-                try:
-                    name_part = line.split(" (")[0].strip()
-                    distance_km = float(line.split(" (")[1].replace(" km)", ""))
-                    munro_entries.append(
-                        {"name": name_part, "distance_km": distance_km, "raw": line}
-                    )
-                except (IndexError, ValueError):
-                    continue
-
-            top_munros = sorted(munro_entries, key=lambda x: x["distance_km"])[:3]
+        for keyword in resolve_station_keywords(preferences.station_keywords):
+            top_munros = station_candidates(keyword, limit=3)
 
             # ✅ Debug print
             print(f"\n[📍 Closest Munros near '{keyword}']")
@@ -98,6 +191,57 @@ def route_based_on_preferences(preferences: HikePreferences, user_prompt: str) -
 
     # ✅ Case 3: Origin city + travel time (no station)
     elif preferences.origin_city and preferences.max_travel_time_minutes:
+        timetable = load_timetable()
+        if timetable is not None:
+            origin = resolve_station_keywords([preferences.origin_city])[0]
+
+            # Common origins are precomputed; anything else runs the timetable scan
+            isochrones = get_isochrone_cache()
+            reachable = (
+                isochrones.lookup(
+                    origin, preferences.max_travel_time_minutes, DEFAULT_DEPARTURE
+                )
+                if isochrones is not None
+                else None
+            )
+            if reachable is None:
+                reachable = timetable.reachable(
+                    origin, preferences.max_travel_time_minutes
+                )
+
+            peak_mask = peaks_matching(preferences)
+            station_results = []
+            for station in reachable:
+                top_munros = station_candidates(
+                    station.station_name, limit=3, peak_mask=peak_mask
+                )
+                if top_munros:
+                    station_results.append(
+                        {
+                            "station_name": station.station_name,
+                            "travel_minutes": station.travel_minutes,
+                            "departure": station.departure,
+                            "arrival": station.arrival,
+                            "top_munros": top_munros,
+                        }
+                    )
+
+            # ✅ Debug print
+            print(
+                f"\n[🚆 Stations with Munros within {preferences.max_travel_time_minutes} min of '{origin}']"
+            )
+            for station in station_results:
+                print(
+                    f"  - {station['station_name']} ({station['travel_minutes']} min)"
+                )
+
+            return {
+                "action": "stations_then_munros",
+                "origin": origin,
+                "results": station_results,
+            }
+
+        # No timetable installed: describe the lookup that would be needed
         return {
             "action": "stations_then_munros",
             "results": [
@@ -107,7 +251,11 @@ def route_based_on_preferences(preferences: HikePreferences, user_prompt: str) -
 
     # ✅ Case 4: Freeform fallback
     elif user_prompt and len(user_prompt.split()) > 4:
-        return {"action": "freeform_query", "query": user_prompt}
+        return {
+            "action": "freeform_query",
+            "query": user_prompt,
+            "preferences": preferences,
+        }
 
     # ❌ Fallback
     return {
@@ -1,13 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
+import os
 import sqlite3
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+# tools/ lives in the repository root; its data paths are anchored there
+sys.path.insert(0, os.path.dirname(SERVER_DIR))
 
 print("🚀 Starting Munro Flask API...")
 
 app = Flask(__name__)
 CORS(app)  # enable all origins for demo
 
-DB_PATH = "db.sqlite"
+DB_PATH = os.path.join(SERVER_DIR, "db.sqlite")
 
 
 @app.route("/api/munros")
@@ -41,5 +48,52 @@ def get_munros():
     return jsonify(results)
 
 
+@app.route("/api/munros/<int:munro_id>")
+def get_munro(munro_id):
+    # Row IDs are the canonical Munro IDs from data/munro_registry.json
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute("SELECT * FROM munros WHERE id = ?", (munro_id,)).fetchone()
+    conn.close()
+
+    if row is None:
+        return jsonify({"error": f"Unknown Munro {munro_id}"}), 404
+    keys = ["id", "name", "summary", "distance", "time", "grade", "bog", "start"]
+    return jsonify(dict(zip(keys, row)))
+
+
+@app.route("/api/summary/stream", methods=["POST"])
+def stream_summary():
+    """
+    Server-sent events: one "section" event per Munro as the summary is
+    generated, then "done". Body: {"recommendations": [...]} as used by
+    generate_munro_summary.
+    """
+    recommendations = (request.get_json(silent=True) or {}).get("recommendations")
+    if not recommendations:
+        return jsonify({"error": "recommendations are required"}), 400
+
+    # Imported on first use: it loads the datasets and LLM clients, and a
+    # failure there must not take the catalogue endpoints down with it
+    try:
+        from tools.generation import stream_munro_summary
+    except Exception as e:
+        return jsonify({"error": f"Summary generation unavailable: {e}"}), 503
+
+    def events():
+        try:
+            for section in stream_munro_summary(recommendations):
+                yield f"event: section\ndata: {json.dumps({'text': section})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
     app.run(debug=True)
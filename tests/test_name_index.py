@@ -0,0 +1,35 @@
+import pytest
+
+from tools.name_index import NameIndex
+
+STATIONS = ["Blairhill", "Blair Atholl", "Gleneagles", "Glenfinnan", "Connel Ferry"]
+
+
+@pytest.fixture
+def index():
+    return NameIndex(enumerate(STATIONS))
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("Blair", "Blair Atholl"),
+        ("Blairh", "Blairhill"),
+        ("Glenfin", "Glenfinnan"),
+        ("Connel", "Connel Ferry"),
+        ("Glenfinan", "Glenfinnan"),
+    ],
+)
+def test_resolve(index, query, expected):
+    assert index.resolve(query).name == expected
+    assert index.ambiguous(query) == []
+
+
+def test_ambiguous_prefix_is_not_resolved(index):
+    assert index.resolve("Glen") is None
+    assert {m.name for m in index.ambiguous("Glen")} == {"Gleneagles", "Glenfinnan"}
+
+
+def test_unknown_name_is_neither_resolved_nor_ambiguous(index):
+    assert index.resolve("Inverness") is None
+    assert index.ambiguous("Inverness") == []
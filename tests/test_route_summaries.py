@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_openai")
+
+import tools.route_summaries as route_summaries  # noqa: E402
+from tools.munros import munro_routes, registry, route_position  # noqa: E402
+from tools.route_summaries import (  # noqa: E402
+    NO_ROUTE_SUMMARY,
+    RouteSummaries,
+    compose_sections,
+)
+
+KNOWN_MUNROS = ["Ben Nevis", "Schiehallion"]
+
+
+@pytest.fixture
+def stored_summaries(tmp_path, monkeypatch):
+    summaries = RouteSummaries(str(tmp_path / "route_summaries.json"))
+    monkeypatch.setattr(route_summaries, "get_route_summaries", lambda: summaries)
+    return summaries
+
+
+def name_only(names):
+    return [
+        {"station_name": "Fort William", "top_munros": [{"name": n} for n in names]}
+    ]
+
+
+@pytest.mark.skipif(registry is None, reason="Munro registry not built")
+def test_name_only_recommendation_gets_stored_summary(stored_summaries):
+    for name in KNOWN_MUNROS:
+        route = munro_routes[route_position(name)]
+        stored_summaries.put(route, f"Stored summary of {name}.", "test")
+
+    sections, missing = compose_sections(name_only(KNOWN_MUNROS))
+
+    assert missing == []
+    for name, section in zip(KNOWN_MUNROS, sections):
+        assert f"Stored summary of {name}." in section
+        assert NO_ROUTE_SUMMARY not in section
+
+
+@pytest.mark.skipif(registry is None, reason="Munro registry not built")
+def test_name_only_recommendation_without_stored_summary_goes_to_llm(
+    stored_summaries,
+):
+    sections, missing = compose_sections(name_only(KNOWN_MUNROS))
+
+    assert sections == [None, None]
+    assert [m["name"] for m in missing[0]["top_munros"]] == KNOWN_MUNROS
+
+
+def test_unknown_hill_gets_no_route_summary(stored_summaries):
+    sections, missing = compose_sections(name_only(["Not A Real Hill"]))
+
+    assert missing == []
+    assert NO_ROUTE_SUMMARY in sections[0]
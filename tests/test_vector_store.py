@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from munro_rag.vector_store import (
+    VectorStore,
+    convert_faiss_index,
+    get_store,
+    save_index,
+    unit_rows,
+)
+
+
+def documents(n):
+    return [
+        {"page_content": f"Chunk {i}", "metadata": {"url": f"https://example/{i}"}}
+        for i in range(n)
+    ]
+
+
+def vectors(n, dim=8):
+    return np.random.default_rng(n).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_get_store_reloads_a_rebuilt_index(tmp_path):
+    index_dir = str(tmp_path)
+    save_index(vectors(3), documents(3), index_dir)
+    store = get_store(index_dir)
+    assert len(store) == 3
+    assert get_store(index_dir) is store
+
+    save_index(vectors(5), documents(5), index_dir)
+
+    rebuilt = get_store(index_dir)
+    assert len(rebuilt) == 5
+    assert rebuilt.document(4)["page_content"] == "Chunk 4"
+
+
+def test_convert_faiss_index(tmp_path):
+    pytest.importorskip("faiss")
+    pytest.importorskip("langchain_community")
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores.faiss import FAISS
+
+    docs, embedded = documents(4), vectors(4)
+    faiss_store = FAISS.from_embeddings(
+        [(d["page_content"], v.tolist()) for d, v in zip(docs, embedded)],
+        FakeEmbeddings(size=embedded.shape[1]),
+        metadatas=[d["metadata"] for d in docs],
+    )
+    faiss_dir = str(tmp_path / "faiss")
+    faiss_store.save_local(faiss_dir)
+
+    index_dir = str(tmp_path / "index")
+    convert_faiss_index(faiss_dir, index_dir)
+
+    store = VectorStore.load(index_dir)
+    assert store.documents == docs
+    np.testing.assert_allclose(store.vectors, unit_rows(embedded), rtol=1e-6)
+    row, similarity = store.search(embedded[2], k=1)[0]
+    assert row == 2 and similarity == pytest.approx(1.0)
@@ -0,0 +1,111 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class MunroCandidate(NamedTuple):
+    peak_id: int
+    name: str
+    distance_km: float
+
+
+class StationAdjacency:
+    """
+    Station → Munro adjacency in CSR form, built once from the edges table.
+    Each station owns one contiguous slice of the peak_ids / distances arrays,
+    already sorted nearest first, keyed by lower-cased station name.
+    """
+
+    def __init__(
+        self,
+        offsets: Dict[str, Tuple[int, int]],
+        peak_ids: np.ndarray,
+        distances: np.ndarray,
+        munro_names: np.ndarray,
+    ):
+        self.offsets = offsets
+        self.peak_ids = peak_ids
+        self.distances = distances
+        self.munro_names = munro_names
+
+    @classmethod
+    def from_edges(cls, edges_df, munros_df) -> "StationAdjacency":
+        """
+        Builds the index from station_to_munro_edges.csv rows. Peak IDs are row
+        positions in munros_df, matched on (name, lat, lon).
+        """
+        peak_ids = {
+            key: i
+            for i, key in enumerate(
+                zip(munros_df["name"], munros_df["lat"], munros_df["lon"])
+            )
+        }
+        ids = np.array(
+            [
+                peak_ids.get(key, -1)
+                for key in zip(
+                    edges_df["munro_name"], edges_df["munro_lat"], edges_df["munro_lon"]
+                )
+            ],
+            dtype=np.int64,
+        )
+        stations = edges_df["station_name"].str.lower().to_numpy()
+        distances = edges_df["distance_km"].to_numpy(dtype=np.float64)
+
+        # Group by station, nearest first (stable, so ties keep file order)
+        order = np.lexsort((distances, stations))
+        stations = stations[order]
+
+        offsets = {}
+        bounds = np.flatnonzero(stations[1:] != stations[:-1]) + 1
+        starts = np.concatenate(([0], bounds)) if len(stations) else []
+        ends = np.concatenate((bounds, [len(stations)])) if len(stations) else []
+        for start, end in zip(starts, ends):
+            offsets[stations[start]] = (int(start), int(end))
+
+        return cls(
+            offsets,
+            ids[order],
+            distances[order],
+            edges_df["munro_name"].to_numpy(dtype=object)[order],
+        )
+
+    def __contains__(self, station_name: str) -> bool:
+        return station_name.lower() in self.offsets
+
+    def stations(self) -> List[str]:
+        return list(self.offsets)
+
+    def candidates(
+        self,
+        station_name: str,
+        limit: Optional[int] = None,
+        max_km: Optional[float] = None,
+        peak_mask: Optional[np.ndarray] = None,
+    ) -> List[MunroCandidate]:
+        """
+        Munros near a station as structured records, nearest first. peak_mask
+        (a boolean array over peak IDs) keeps only the allowed peaks; limit
+        then counts allowed peaks.
+        """
+        start, end = self.offsets.get(station_name.lower(), (0, 0))
+        if max_km is not None:
+            end = start + int(
+                np.searchsorted(self.distances[start:end], max_km, side="right")
+            )
+
+        rows = np.arange(start, end)
+        if peak_mask is not None:
+            ids = self.peak_ids[start:end]
+            rows = rows[(ids >= 0) & peak_mask[np.maximum(ids, 0)]]
+        if limit is not None:
+            rows = rows[:limit]
+
+        return [
+            MunroCandidate(
+                int(self.peak_ids[i]),
+                str(self.munro_names[i]),
+                float(self.distances[i]),
+            )
+            for i in rows.tolist()
+        ]
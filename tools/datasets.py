@@ -0,0 +1,324 @@
+import json
+import os
+from collections.abc import Mapping, Sequence
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from tools.adjacency import StationAdjacency
+from tools.paths import repo_path, source_key
+
+MUNROS_PATH = repo_path("data", "munros_osm.csv")
+STATIONS_PATH = repo_path("data", "train_stations_osm.csv")
+EDGES_PATH = repo_path("data", "station_to_munro_edges.csv")
+ROUTES_PATH = repo_path("munro_descriptions.json")
+COMPILED_DIR = repo_path("data", "compiled")
+
+FORMAT_VERSION = 2
+
+ROUTE_TEXT_FIELDS = [
+    "name",
+    "url",
+    "title",
+    "summary",
+    "description",
+    "terrain",
+    "public_transport",
+    "start",
+    "gpx_file",
+]
+ROUTE_NUMERIC_FIELDS = {
+    "distance": np.float64,
+    "time": np.float64,
+    "grade": np.int8,
+    "bog": np.int8,
+}
+
+
+class StringTable:
+    """
+    Interned UTF-8 strings: one contiguous byte blob plus an offsets array.
+    Both are memory-mapped; a string is only decoded when it is accessed.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if i < 0:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+
+class StringColumn(Sequence):
+    """
+    A column of string ids backed by a StringTable, decoded on access.
+    """
+
+    def __init__(self, strings: StringTable, ids: np.ndarray):
+        self.strings = strings
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.strings[int(j)] for j in self.ids[i]]
+        return self.strings[int(self.ids[i])]
+
+
+class Record(Mapping):
+    """
+    Read-only dict view of one row of a compiled table.
+    """
+
+    def __init__(self, table: "RecordTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key):
+        if key not in self._table.columns:
+            raise KeyError(key)
+        value = self._table.columns[key][self._row]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+
+class RecordTable(Sequence):
+    """
+    A compiled table exposed as a sequence of lazy records, so it can stand in
+    for a list of dicts loaded from JSON.
+    """
+
+    def __init__(self, columns: Dict[str, Sequence]):
+        self.columns = columns
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Record(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Record(self, i)
+
+
+class CompiledDatasets:
+    """
+    Memory-mapped view of the compiled dataset directory.
+    """
+
+    def __init__(self, path: str = COMPILED_DIR):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.strings = StringTable(
+            self.column("strings", "blob"), self.column("strings", "offsets")
+        )
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f"{table}.{name}.npy"), mmap_mode="r")
+
+    def strings_column(self, table: str, name: str) -> StringColumn:
+        return StringColumn(self.strings, self.column(table, name))
+
+    def frame(self, table: str) -> pd.DataFrame:
+        """
+        Small tables (peaks, stations) as DataFrames; numeric columns stay mmap-backed.
+        """
+        data = {}
+        for name, kind in self.manifest["tables"][table]["columns"].items():
+            if kind == "str":
+                data[name] = list(self.strings_column(table, name)[:])
+            else:
+                data[name] = self.column(table, name)
+        return pd.DataFrame(data, copy=False)
+
+    def records(self, table: str) -> RecordTable:
+        columns = {}
+        for name, kind in self.manifest["tables"][table]["columns"].items():
+            if kind == "str":
+                columns[name] = self.strings_column(table, name)
+            else:
+                columns[name] = self.column(table, name)
+        return RecordTable(columns)
+
+    def station_adjacency(self) -> StationAdjacency:
+        keys = self.strings_column("adjacency", "station")
+        starts = self.column("adjacency", "start")
+        ends = self.column("adjacency", "end")
+        offsets = {keys[i]: (int(starts[i]), int(ends[i])) for i in range(len(keys))}
+        return StationAdjacency(
+            offsets,
+            self.column("adjacency", "peak_id"),
+            self.column("adjacency", "distance_km"),
+            self.strings_column("adjacency", "munro_name"),
+        )
+
+
+def _source_stamp(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_compiled(path: str = COMPILED_DIR) -> Optional[CompiledDatasets]:
+    """
+    Opens the compiled datasets, or returns None if they are missing or older
+    than their source files (callers then fall back to CSV / JSON).
+    """
+    try:
+        compiled = CompiledDatasets(path)
+    except FileNotFoundError:
+        return None
+
+    if compiled.manifest.get("format") != FORMAT_VERSION:
+        return None
+    for source, stamp in compiled.manifest.get("sources", {}).items():
+        try:
+            if _source_stamp(repo_path(source)) != stamp:
+                print(
+                    f"[⚠️ Compiled datasets are stale] {source} changed; using sources"
+                )
+                return None
+        except FileNotFoundError:
+            continue
+    return compiled
+
+
+class _StringInterner:
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __call__(self, value) -> int:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return -1
+        value = str(value)
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+        return self.ids[value]
+
+    def column(self, values) -> np.ndarray:
+        return np.array([self(v) for v in values], dtype=np.int32)
+
+
+def compile_datasets(
+    out_dir: str = COMPILED_DIR,
+    munros_path: str = MUNROS_PATH,
+    stations_path: str = STATIONS_PATH,
+    edges_path: str = EDGES_PATH,
+    routes_path: str = ROUTES_PATH,
+):
+    """
+    Compiles peaks, stations, the station → Munro adjacency and the route
+    descriptions into fixed-width .npy columns plus one interned string table.
+    """
+    munros_df = pd.read_csv(munros_path)
+    stations_df = pd.read_csv(stations_path)
+    edges_df = pd.read_csv(edges_path)
+    with open(routes_path) as f:
+        routes = json.load(f)
+
+    intern = _StringInterner()
+    tables = {}
+
+    def save(table, columns):
+        tables[table] = {"rows": 0, "columns": {}}
+        for name, (kind, values) in columns.items():
+            np.save(os.path.join(out_dir, f"{table}.{name}.npy"), values)
+            tables[table]["columns"][name] = kind
+            tables[table]["rows"] = len(values)
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    save(
+        "peaks",
+        {
+            "name": ("str", intern.column(munros_df["name"])),
+            "lat": ("f8", munros_df["lat"].to_numpy(dtype=np.float64)),
+            "lon": ("f8", munros_df["lon"].to_numpy(dtype=np.float64)),
+            "height": ("f8", munros_df["height"].to_numpy(dtype=np.float64)),
+        },
+    )
+    save(
+        "stations",
+        {
+            "name": ("str", intern.column(stations_df["name"])),
+            "lat": ("f8", stations_df["lat"].to_numpy(dtype=np.float64)),
+            "lon": ("f8", stations_df["lon"].to_numpy(dtype=np.float64)),
+        },
+    )
+
+    adjacency = StationAdjacency.from_edges(edges_df, munros_df)
+    keys = list(adjacency.offsets)
+    save(
+        "adjacency",
+        {
+            "station": ("str", intern.column(keys)),
+            "start": (
+                "i8",
+                np.array([adjacency.offsets[k][0] for k in keys], dtype=np.int64),
+            ),
+            "end": (
+                "i8",
+                np.array([adjacency.offsets[k][1] for k in keys], dtype=np.int64),
+            ),
+            "peak_id": ("i4", adjacency.peak_ids.astype(np.int32)),
+            "distance_km": ("f8", adjacency.distances),
+            "munro_name": ("str", intern.column(adjacency.munro_names)),
+        },
+    )
+
+    route_columns = {
+        name: ("str", intern.column([r.get(name) for r in routes]))
+        for name in ROUTE_TEXT_FIELDS
+    }
+    for name, dtype in ROUTE_NUMERIC_FIELDS.items():
+        route_columns[name] = (
+            np.dtype(dtype).str,
+            np.array([r.get(name) for r in routes], dtype=dtype),
+        )
+    save("routes", route_columns)
+
+    encoded = [s.encode("utf-8") for s in intern.values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    np.save(
+        os.path.join(out_dir, "strings.blob.npy"),
+        np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    )
+    np.save(os.path.join(out_dir, "strings.offsets.npy"), offsets)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "sources": {
+            source_key(path): _source_stamp(path)
+            for path in (munros_path, stations_path, edges_path, routes_path)
+        },
+        "tables": tables,
+        "strings": len(intern.values),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Saved: {out_dir} ({len(intern.values)} interned strings)")
+    return manifest
+
+
+if __name__ == "__main__":
+    compile_datasets()
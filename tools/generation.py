@@ -1,18 +1,24 @@
+import re
+from typing import Iterable, Iterator, List, Optional
 from langchain.tools import tool
-from langchain_openai import ChatOpenAI
+from tools.llm_cache import cached_invoke, cached_stream
+from tools.llm_clients import chat_model
+from tools.name_index import normalize_name
+from tools.route_summaries import compose_sections
 import os  # TEST
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0,
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-)
+# Compose summaries from the stored per-route summaries (python -m
+# tools.route_summaries); 0 = have the LLM write every summary per request
+STORED_SUMMARIES = os.getenv("MUNRO_STORED_SUMMARIES", "1") != "0"
 
+# Each Munro's section in the summary starts with a "---" line
+SECTION_BREAK = re.compile(r"^[ \t]*---[ \t]*$", re.MULTILINE)
+SECTION_NAME = re.compile(r"Name:[ \t]*(.+)")
 
-@tool
-def generate_munro_summary(recommendations: list) -> str:
+
+def summary_prompt(recommendations: list) -> str:
     """
-    Given a list of Munro recommendations (with metadata), generate a structured and friendly route summary.
+    The route-summary prompt for a list of station → Munro recommendations.
     """
 
     # Build structured text block for the LLM
@@ -55,4 +61,118 @@ For each Munro, return a structured recommendation in this format:
 Make the summaries helpful, informative, and welcoming for someone planning a hike.
 """
 
-    return llm.invoke(prompt).content
+    return prompt
+
+
+@tool
+def generate_munro_summary(recommendations: list) -> str:
+    """
+    Given a list of Munro recommendations (with metadata), generate a structured and friendly route summary.
+    """
+    if not STORED_SUMMARIES:
+        return cached_invoke(
+            "generate_munro_summary", chat_model(), summary_prompt(recommendations)
+        )
+
+    # Only routes without a current stored summary go to the LLM
+    sections, missing = compose_sections(recommendations)
+    written = []
+    if missing:
+        text = cached_invoke(
+            "generate_munro_summary", chat_model(), summary_prompt(missing)
+        )
+        written = split_sections([text])
+    return "".join(
+        f"---\n{section}\n\n"
+        for section in ordered_sections(sections, missing, written)
+    )
+
+
+def split_sections(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Regroups streamed text chunks into whole "---"-separated sections, each
+    yielded as soon as the next section starts.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = SECTION_BREAK.split(buffer)
+        for section in complete:
+            if section.strip():
+                yield section.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def ordered_sections(
+    sections: List[Optional[str]], missing: list, written: Iterable[str]
+) -> Iterator[str]:
+    """
+    Fills the None slots of compose_sections with the LLM's sections for
+    missing, matched by Munro name (else taken in prompt order), and yields
+    every section in recommendation order as soon as all before it are
+    ready. Slots the LLM skipped are dropped; sections matching no slot come
+    last.
+    """
+    sections = list(sections)
+    gaps = [i for i, section in enumerate(sections) if section is None]
+    names = {
+        i: normalize_name(munro.get("name", ""))
+        for i, munro in zip(gaps, (m for item in missing for m in item["top_munros"]))
+    }
+    unmatched = []
+    ready = 0
+
+    def flush() -> Iterator[str]:
+        nonlocal ready
+        while ready < len(sections) and sections[ready] is not None:
+            yield sections[ready]
+            ready += 1
+
+    yield from flush()
+    for section in written:
+        match = SECTION_NAME.search(section)
+        name = normalize_name(match.group(1).strip("*_ ")) if match else None
+        open_gaps = [i for i in gaps if sections[i] is None]
+        slot = next(
+            (i for i in open_gaps if names.get(i) == name),
+            open_gaps[0] if open_gaps else None,
+        )
+        if slot is None:
+            unmatched.append(section)
+        else:
+            sections[slot] = section
+            yield from flush()
+
+    yield from (section for section in sections[ready:] if section is not None)
+    yield from unmatched
+
+
+def stream_munro_summary(
+    recommendations: list, by_section: bool = True
+) -> Iterator[str]:
+    """
+    Streaming generate_munro_summary: yields one Munro's section at a time (or
+    raw tokens with by_section=False) as the completion arrives, in
+    recommendation order. Stored sections come out as soon as every section
+    before them has; with some stored, by_section=False yields whole sections.
+    """
+    if not STORED_SUMMARIES:
+        sections, missing = [], recommendations
+    else:
+        sections, missing = compose_sections(recommendations)
+
+    def llm_chunks() -> Iterator[str]:
+        if missing:
+            yield from cached_stream(
+                "generate_munro_summary", chat_model(), summary_prompt(missing)
+            )
+
+    # Nothing stored: the LLM writes every section, already in order
+    if all(section is None for section in sections):
+        return split_sections(llm_chunks()) if by_section else llm_chunks()
+
+    ordered = ordered_sections(sections, missing, split_sections(llm_chunks()))
+    if by_section:
+        return ordered
+    return (f"---\n{section}\n\n" for section in ordered)
@@ -0,0 +1,235 @@
+import math
+from typing import List, NamedTuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# WGS-84 ellipsoid (same model geopy's geodesic uses)
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B_KM = WGS84_A_KM * (1 - WGS84_F)
+
+KM_PER_DEGREE_LAT = 111.2
+
+
+class NearbyPeak(NamedTuple):
+    peak_id: int
+    name: str
+    lat: float
+    lon: float
+    height: float
+    distance_km: float
+
+
+def haversine_km(lat, lon, lats, lons) -> np.ndarray:
+    """
+    Great-circle distance (km) from one point to an array of points.
+    """
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(query_lats, query_lons, lats, lons) -> np.ndarray:
+    """
+    Batch haversine: returns a (len(query_lats), len(lats)) matrix of distances in km.
+    """
+    q_lat = np.radians(np.asarray(query_lats, dtype=np.float64))[:, None]
+    q_lon = np.radians(np.asarray(query_lons, dtype=np.float64))[:, None]
+    p_lat = np.radians(np.asarray(lats, dtype=np.float64))[None, :]
+    p_lon = np.radians(np.asarray(lons, dtype=np.float64))[None, :]
+    a = (
+        np.sin((p_lat - q_lat) / 2) ** 2
+        + np.cos(q_lat) * np.cos(p_lat) * np.sin((p_lon - q_lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def geodesic_km(lat, lon, lats, lons, max_iter: int = 200) -> np.ndarray:
+    """
+    Ellipsoidal (WGS-84) distance in km from one point to an array of points.
+    Vectorized Vincenty inverse formula; agrees with geopy's geodesic to well under
+    a metre for anything that isn't near-antipodal.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+
+    u1 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat)))
+    u2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lats)))
+    big_l = np.radians(lons - lon)
+    sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+    lam = big_l.copy()
+    for _ in range(max_iter):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(
+            cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam
+        )
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sin_alpha = np.where(
+                sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma
+            )
+            cos2_alpha = 1 - sin_alpha**2
+            cos_2sm = np.where(
+                cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha
+            )
+        c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        lam_prev = lam
+        lam = big_l + (1 - c) * WGS84_F * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sm + c * cos_sigma * (-1 + 2 * cos_2sm**2))
+        )
+        if np.all(np.abs(lam - lam_prev) < 1e-12):
+            break
+
+    u_sq = cos2_alpha * (WGS84_A_KM**2 - WGS84_B_KM**2) / WGS84_B_KM**2
+    big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = (
+        big_b
+        * sin_sigma
+        * (
+            cos_2sm
+            + big_b
+            / 4
+            * (
+                cos_sigma * (-1 + 2 * cos_2sm**2)
+                - big_b / 6 * cos_2sm * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sm**2)
+            )
+        )
+    )
+    return WGS84_B_KM * big_a * (sigma - delta_sigma)
+
+
+class PeakIndex:
+    """
+    Grid-bucketed spatial index over a set of named points (peaks, stations, ...).
+    Points are sorted by (row, col) cell so every grid row of a query window is one
+    contiguous slice. Candidates are pre-filtered with haversine and the survivors
+    get exact ellipsoidal distances.
+    """
+
+    def __init__(self, names, lats, lons, heights=None, cell_km: float = 10.0):
+        self.names = np.asarray(names, dtype=object)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.heights = (
+            np.asarray(heights, dtype=np.float64)
+            if heights is not None
+            else np.full(len(self.lats), np.nan)
+        )
+        self.cell_deg = cell_km / KM_PER_DEGREE_LAT
+
+        rows, cols = self._cells(self.lats, self.lons)
+        self._row0 = int(rows.min()) if len(rows) else 0
+        self._col0 = int(cols.min()) if len(cols) else 0
+        self._ncols = int(cols.max() - self._col0 + 1) if len(cols) else 1
+        self._nrows = int(rows.max() - self._row0 + 1) if len(rows) else 1
+
+        keys = (rows - self._row0) * self._ncols + (cols - self._col0)
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+        self._max_abs_lat = float(np.abs(self.lats).max()) if len(self.lats) else 0.0
+
+    @classmethod
+    def from_frame(cls, df, name_col="name", height_col="height", cell_km=10.0):
+        heights = df[height_col] if height_col in df.columns else None
+        return cls(df[name_col], df["lat"], df["lon"], heights, cell_km=cell_km)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _cells(self, lats, lons):
+        rows = np.floor(np.asarray(lats) / self.cell_deg).astype(np.int64)
+        cols = np.floor(np.asarray(lons) / self.cell_deg).astype(np.int64)
+        return rows, cols
+
+    def candidates(self, lat: float, lon: float, max_km: float) -> np.ndarray:
+        """
+        Indices of points in the grid cells overlapping the query's bounding box.
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+
+        dlat = max_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(min(self._max_abs_lat, abs(lat) + dlat, 89.9)))
+        dlon = max_km / (KM_PER_DEGREE_LAT * cos_lat)
+
+        r_lo, c_lo = self._cells(lat - dlat, lon - dlon)
+        r_hi, c_hi = self._cells(lat + dlat, lon + dlon)
+        r_lo = max(int(r_lo) - self._row0, 0)
+        r_hi = min(int(r_hi) - self._row0, self._nrows - 1)
+        c_lo = max(int(c_lo) - self._col0, 0)
+        c_hi = min(int(c_hi) - self._col0, self._ncols - 1)
+        if r_lo > r_hi or c_lo > c_hi:
+            return np.empty(0, dtype=np.int64)
+
+        row_starts = np.arange(r_lo, r_hi + 1) * self._ncols
+        lo = np.searchsorted(self._keys, row_starts + c_lo, side="left")
+        hi = np.searchsorted(self._keys, row_starts + c_hi, side="right")
+        slices = [self._order[a:b] for a, b in zip(lo, hi) if b > a]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def query_radius(self, lat: float, lon: float, max_km: float):
+        """
+        Returns (indices, distances_km) of all points within max_km, nearest first.
+        """
+        idx = self.candidates(lat, lon, max_km)
+        if not len(idx):
+            return idx, np.empty(0)
+
+        # Haversine can be up to ~0.6% off the ellipsoid, so keep a margin
+        rough = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        idx = idx[rough <= max_km * 1.01 + 0.01]
+        dist = geodesic_km(lat, lon, self.lats[idx], self.lons[idx])
+        keep = dist <= max_km
+        idx, dist = idx[keep], dist[keep]
+
+        order = np.lexsort((idx, dist))
+        return idx[order], dist[order]
+
+    def query_nearest(self, lat: float, lon: float, k: int = 5):
+        """
+        Returns (indices, distances_km) of the k nearest points, nearest first.
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        radius = self.cell_deg * KM_PER_DEGREE_LAT
+        while radius < math.pi * EARTH_RADIUS_KM:
+            idx, dist = self.query_radius(lat, lon, radius)
+            if len(idx) >= k:
+                return idx[:k], dist[:k]
+            radius *= 2
+
+        dist = geodesic_km(lat, lon, self.lats, self.lons)
+        order = np.lexsort((np.arange(len(dist)), dist))[:k]
+        return order, dist[order]
+
+    def records(self, idx, dist) -> List[NearbyPeak]:
+        return [
+            NearbyPeak(
+                peak_id=int(i),
+                name=str(self.names[i]),
+                lat=float(self.lats[i]),
+                lon=float(self.lons[i]),
+                height=float(self.heights[i]),
+                distance_km=round(float(d), 2),
+            )
+            for i, d in zip(idx, dist)
+        ]
+
+    def within(self, lat: float, lon: float, max_km: float = 30) -> List[NearbyPeak]:
+        return self.records(*self.query_radius(lat, lon, max_km))
+
+    def nearest(self, lat: float, lon: float, k: int = 5) -> List[NearbyPeak]:
+        return self.records(*self.query_nearest(lat, lon, k))
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+from bisect import bisect_right
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from tools.datasets import STATIONS_PATH
+from tools.paths import repo_path
+from tools.timetable import (
+    DEPARTURE_WINDOW_MINUTES,
+    TIMETABLE_DIR,
+    ReachableStation,
+    Timetable,
+    active_services,
+    has_timetable,
+    load_timetable,
+    parse_time,
+)
+from tools.transport import STATION_ALIASES_PATH, resolve_station
+
+ISOCHRONES_PATH = repo_path("data", "cache", "isochrones.json")
+
+# Where most queries start from
+MAJOR_ORIGINS = ["Edinburgh", "Glasgow", "Inverness", "Perth", "Stirling", "Aberdeen"]
+
+# Hourly departures from 06:00 to 21:00, each covering the same departure
+# window as Timetable.reachable, so a cached answer equals the scan's
+BAND_MINUTES = DEPARTURE_WINDOW_MINUTES
+FIRST_BAND = "06:00"
+N_BANDS = 16
+
+# Longest travel-time budget the cache answers; longer ones fall back to the scan
+MAX_CACHED_MINUTES = 360
+
+
+def _band_key(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}"
+
+
+@lru_cache(maxsize=4)
+def _service_key(timetable_dir: str, stamp: tuple, service_date: date) -> str:
+    services = active_services(timetable_dir, service_date)
+    return "all" if services is None else ",".join(sorted(services))
+
+
+def data_fingerprint(
+    timetable_dir: str = TIMETABLE_DIR, service_date: Optional[date] = None
+) -> str:
+    """
+    Fingerprint of everything the cache depends on: the timetable files, the
+    station data, the station aliases, the departure window and the services
+    running on the day the timetable was filtered to. Uses size + mtime, so
+    only calendar.txt is read, once per day or edit.
+    """
+    paths = [STATIONS_PATH, STATION_ALIASES_PATH]
+    if os.path.isdir(timetable_dir):
+        paths += sorted(
+            os.path.join(timetable_dir, name) for name in os.listdir(timetable_dir)
+        )
+
+    digest = hashlib.sha256()
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stamp.append((path, stat.st_size, stat.st_mtime_ns))
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    services = _service_key(timetable_dir, tuple(stamp), service_date or date.today())
+    digest.update(f"window:{BAND_MINUTES}\nservices:{services}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_isochrones(
+    timetable: Timetable, origins: List[str] = MAJOR_ORIGINS
+) -> Dict[str, dict]:
+    """
+    For each origin station and cached departure time, the best (shortest)
+    journey to every station reachable within MAX_CACHED_MINUTES on a train
+    leaving within BAND_MINUTES of it, sorted by travel time.
+    """
+    profiles = {}
+    for city in origins:
+        match = resolve_station(city)
+        if match is None or match.name not in timetable.station_ids:
+            print(f"[⚠️ Isochrones] No timetabled station for '{city}', skipping")
+            continue
+
+        bands = {}
+        for band in range(N_BANDS):
+            start = parse_time(FIRST_BAND) + band * BAND_MINUTES * 60
+            reachable = timetable.reachable(
+                match.name,
+                MAX_CACHED_MINUTES,
+                departure=_band_key(start),
+            )
+            bands[_band_key(start)] = [list(r) for r in reachable]
+        profiles[match.name] = bands
+    return profiles
+
+
+class IsochroneCache:
+    """
+    Precomputed arrival-time profiles for the major origins: an origin +
+    travel-budget query is a dict lookup plus a bisect on the sorted times.
+    """
+
+    def __init__(self, fingerprint: str, profiles: Dict[str, dict]):
+        self.fingerprint = fingerprint
+        self.profiles = {
+            origin: {
+                band: [ReachableStation(*row) for row in rows]
+                for band, rows in bands.items()
+            }
+            for origin, bands in profiles.items()
+        }
+        self.minutes = {
+            origin: {
+                band: [r.travel_minutes for r in rows] for band, rows in bands.items()
+            }
+            for origin, bands in self.profiles.items()
+        }
+
+    def lookup(
+        self,
+        origin: str,
+        max_minutes: int,
+        departure: str,
+        window_minutes: int = DEPARTURE_WINDOW_MINUTES,
+    ) -> Optional[List[ReachableStation]]:
+        """
+        Stations reachable within max_minutes, as Timetable.reachable would
+        return them, or None if this query is not cached.
+        """
+        band = _band_key(parse_time(departure))
+        if (
+            band not in self.profiles.get(origin, {})
+            or window_minutes != BAND_MINUTES
+            or max_minutes > MAX_CACHED_MINUTES
+        ):
+            return None
+        cut = bisect_right(self.minutes[origin][band], max_minutes)
+        return self.profiles[origin][band][:cut]
+
+    def save(self, path: str = ISOCHRONES_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "fingerprint": self.fingerprint,
+                    "profiles": {
+                        origin: {
+                            band: [list(r) for r in rows]
+                            for band, rows in bands.items()
+                        }
+                        for origin, bands in self.profiles.items()
+                    },
+                },
+                f,
+            )
+
+
+_cache: Optional[IsochroneCache] = None
+# (fingerprint, cache file size + mtime) last found missing or stale, so the
+# file is only re-read once the data or the file itself changes
+_unusable: Optional[tuple] = None
+
+
+def _file_stamp(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def get_isochrone_cache(
+    path: str = ISOCHRONES_PATH, timetable_dir: str = TIMETABLE_DIR
+) -> Optional[IsochroneCache]:
+    """
+    The process-wide isochrone cache, loaded from disk while its fingerprint
+    still matches the timetable / station data. Returns None when there is no
+    timetable or the cache is missing or stale (callers then run the timetable
+    scan); it is never rebuilt on the request path (python -m tools.isochrones).
+    """
+    global _cache, _unusable
+    if not has_timetable(timetable_dir):
+        return None
+
+    fingerprint = data_fingerprint(timetable_dir)
+    if _cache is not None and _cache.fingerprint == fingerprint:
+        return _cache
+    checked = (fingerprint, _file_stamp(path))
+    if _unusable == checked:
+        return None
+
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+        if stored.get("fingerprint") == fingerprint:
+            _cache = IsochroneCache(fingerprint, stored["profiles"])
+            return _cache
+        print(
+            "[⚠️ Isochrone cache is stale] Using the timetable scan; "
+            "rebuild it with python -m tools.isochrones"
+        )
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(
+            "[⚠️ No isochrone cache] Using the timetable scan; "
+            "build it with python -m tools.isochrones"
+        )
+    _cache, _unusable = None, checked
+    return None
+
+
+def build_isochrone_cache(
+    path: str = ISOCHRONES_PATH, timetable_dir: str = TIMETABLE_DIR
+) -> Optional[IsochroneCache]:
+    """
+    Offline build step: precomputes the isochrones for today's services and
+    saves them. Returns None when there is no timetable.
+    """
+    timetable = load_timetable(timetable_dir)
+    if timetable is None:
+        print(f"[⚠️ Isochrones] No timetable in {timetable_dir}, skipping")
+        return None
+    cache = IsochroneCache(data_fingerprint(timetable_dir), build_isochrones(timetable))
+    cache.save(path)
+    print(f"[💾 Saved isochrones] {path}")
+    return cache
+
+
+if __name__ == "__main__":
+    build_isochrone_cache()
@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from tools.llm_clients import base_url
+from tools.paths import repo_path
+
+LLM_CACHE_PATH = os.getenv(
+    "MUNRO_LLM_CACHE_PATH", repo_path("data", "cache", "llm.sqlite")
+)
+LLM_CACHE_ENABLED = os.getenv("MUNRO_LLM_CACHE", "1") != "0"
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+MEMORY_ENTRIES = 256
+MAX_DISK_ENTRIES = 20_000
+
+_MISSING = object()
+
+
+def cache_key(site: str, model: str, params: dict, prompt: Any) -> str:
+    """
+    Hash of everything that determines a completion: call site, endpoint,
+    model, sampling parameters and the prompt (a string or any JSON-able
+    payload). The default endpoint adds nothing, so its keys are unchanged.
+    """
+    key = {"site": site, "model": model, "params": params, "prompt": prompt}
+    if base_url():
+        key["endpoint"] = base_url()
+    payload = json.dumps(
+        key,
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level response cache: an in-memory LRU in front of a SQLite table.
+    Entries expire after ttl_seconds; the disk table is trimmed to max_entries
+    by least-recent use. Hits and misses are counted per call site.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        memory_entries: int = MEMORY_ENTRIES,
+        max_entries: int = MAX_DISK_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              key TEXT PRIMARY KEY,
+              site TEXT,
+              value TEXT,
+              created REAL,
+              last_used REAL
+            )
+            """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)"
+        )
+        self.conn.commit()
+
+    def _remember(self, key: str, value: Any, created: float):
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str, site: str = "default") -> Any:
+        """
+        Cached value for key, or _MISSING. Counts a memory hit, disk hit or miss.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self.memory.move_to_end(key)
+                self.stats[site]["memory_hits"] += 1
+                return entry[0]
+
+            row = self.conn.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                self.conn.execute(
+                    "UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key)
+                )
+                self.conn.commit()
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.stats[site]["disk_hits"] += 1
+                return value
+
+            self.memory.pop(key, None)
+            self.stats[site]["misses"] += 1
+            return _MISSING
+
+    def set(self, key: str, value: Any, site: str = "default"):
+        now = time.time()
+        with self.lock:
+            self._remember(key, value, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (key, site, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        self.conn.execute(
+            "DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_seconds,)
+        )
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            self.conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                  SELECT key FROM llm_cache ORDER BY last_used LIMIT ?
+                )
+                """,
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.conn.execute("DELETE FROM llm_cache")
+            self.conn.commit()
+
+    def report(self) -> Dict[str, dict]:
+        """
+        Per call site: memory hits, disk hits, misses and the overall hit rate.
+        """
+        report = {}
+        for site, counts in sorted(self.stats.items()):
+            hits = counts["memory_hits"] + counts["disk_hits"]
+            total = hits + counts["misses"]
+            report[site] = {
+                "memory_hits": counts["memory_hits"],
+                "disk_hits": counts["disk_hits"],
+                "misses": counts["misses"],
+                "hit_rate": round(hits / total, 3) if total else 0.0,
+            }
+        return report
+
+
+_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    The process-wide cache, opened on first use (None when disabled).
+    """
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = LLMCache()
+    return _cache
+
+
+def cached(
+    site: str, model: str, params: dict, prompt: Any, compute: Callable[[], Any]
+) -> Any:
+    """
+    Returns the cached result of compute() for this (site, model, params,
+    prompt), calling it on a miss. Results must be JSON-serializable.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return compute()
+
+    key = cache_key(site, model, params, prompt)
+    value = cache.get(key, site)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, site)
+    return value
+
+
+def llm_params(llm) -> dict:
+    return {"temperature": getattr(llm, "temperature", None)}
+
+
+def cached_invoke(site: str, llm, prompt: str) -> str:
+    """
+    llm.invoke(prompt).content for a LangChain chat model, through the cache.
+    Sampled (temperature > 0) completions are not cached.
+    """
+    if getattr(llm, "temperature", 0):
+        return llm.invoke(prompt).content
+    return cached(
+        site,
+        llm.model_name,
+        llm_params(llm),
+        prompt,
+        lambda: llm.invoke(prompt).content,
+    )
+
+
+async def acached_invoke(site: str, llm, prompt: str) -> str:
+    """
+    Async cached_invoke: awaits llm.ainvoke(prompt) on a miss. The SQLite
+    reads and writes run on a worker thread so they never block the event loop.
+    """
+    if getattr(llm, "temperature", 0):
+        return (await llm.ainvoke(prompt)).content
+    cache = await asyncio.to_thread(get_llm_cache)
+    if cache is None:
+        return (await llm.ainvoke(prompt)).content
+
+    key = cache_key(site, llm.model_name, llm_params(llm), prompt)
+    value = await asyncio.to_thread(cache.get, key, site)
+    if value is _MISSING:
+        value = (await llm.ainvoke(prompt)).content
+        await asyncio.to_thread(cache.set, key, value, site)
+    return value
+
+
+def cached_stream(site: str, llm, prompt: str) -> Iterator[str]:
+    """
+    Streams llm.stream(prompt) as text chunks. A cached completion is yielded
+    in one piece; a streamed one is cached once it has completed.
+    """
+    cache = get_llm_cache()
+    if cache is None or getattr(llm, "temperature", 0):
+        for chunk in llm.stream(prompt):
+            yield chunk.content
+        return
+
+    key = cache_key(site, llm.model_name, llm_params(llm), prompt)
+    value = cache.get(key, site)
+    if value is not _MISSING:
+        yield value
+        return
+
+    parts = []
+    for chunk in llm.stream(prompt):
+        parts.append(chunk.content)
+        yield chunk.content
+    cache.set(key, "".join(parts), site)
+
+
+def print_cache_report():
+    cache = get_llm_cache()
+    if cache is None or not cache.stats:
+        return
+    print("\n[🗄️ LLM cache]")
+    for site, counts in cache.report().items():
+        print(
+            f"  {site}: {counts['memory_hits']} memory / {counts['disk_hits']} disk "
+            f"hits, {counts['misses']} misses ({counts['hit_rate']:.0%})"
+        )
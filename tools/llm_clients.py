@@ -0,0 +1,82 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai import OpenAI
+
+CHAT_MODEL = "gpt-3.5-turbo"
+STAND_IN_API_KEY = "stand-in"
+
+
+def base_url() -> Optional[str]:
+    """
+    MUNRO_OPENAI_BASE_URL points every client at an OpenAI-compatible server
+    instead of the real API, e.g. the local stand-in (python -m
+    tools.openai_stand_in, http://127.0.0.1:8765/v1). Read at call time so a
+    .env loaded after import still applies.
+    """
+    return os.getenv("MUNRO_OPENAI_BASE_URL") or None
+
+
+def api_key() -> str:
+    if base_url() and not os.getenv("OPENAI_API_KEY"):
+        return STAND_IN_API_KEY
+    return os.getenv("OPENAI_API_KEY")
+
+
+def chat_model(model: str = CHAT_MODEL, temperature: float = 0):
+    """
+    LangChain chat model for the configured endpoint. One instance per
+    settings, shared process-wide so its HTTP connections stay alive.
+    """
+    return _chat_model(model, temperature, base_url(), api_key())
+
+
+@lru_cache(maxsize=None)
+def _chat_model(model: str, temperature: float, url: Optional[str], key: str):
+    return ChatOpenAI(
+        model=model, temperature=temperature, openai_api_key=key, base_url=url
+    )
+
+
+def embeddings():
+    """
+    LangChain embeddings for the configured endpoint, shared process-wide.
+    """
+    return _embeddings(base_url(), api_key())
+
+
+@lru_cache(maxsize=None)
+def _embeddings(url: Optional[str], key: str):
+    if url:
+        # Send text, not tiktoken IDs: other servers only accept strings
+        return OpenAIEmbeddings(
+            openai_api_key=key, base_url=url, check_embedding_ctx_length=False
+        )
+    return OpenAIEmbeddings(openai_api_key=key)
+
+
+@lru_cache(maxsize=256)
+def _embed_query(text: str, url: Optional[str], key: str) -> tuple:
+    return tuple(_embeddings(url, key).embed_query(text))
+
+
+def embed_query(text: str) -> list:
+    """
+    Embedding of one query. Memoized, so the semantic cache and the retriever
+    embed a question only once between them.
+    """
+    return list(_embed_query(text, base_url(), api_key()))
+
+
+def openai_client():
+    """
+    Plain OpenAI SDK client for the configured endpoint, shared process-wide.
+    """
+    return _openai_client(base_url(), api_key())
+
+
+@lru_cache(maxsize=None)
+def _openai_client(url: Optional[str], key: str):
+    return OpenAI(api_key=key, base_url=url)
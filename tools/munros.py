@@ -1,18 +1,101 @@
+import json
 import pandas as pd
+from typing import List, Optional
 from langchain.tools import tool
-from geopy.distance import geodesic
+from tools.adjacency import MunroCandidate, StationAdjacency
+from tools.datasets import EDGES_PATH, MUNROS_PATH, ROUTES_PATH, load_compiled
+from tools.geo_index import NearbyPeak, PeakIndex
+from tools.name_index import NameIndex, NameMatch
+from tools.registry import bare_name_aliases, load_registry
 
+# Load static data once (memory-mapped compiled datasets when available)
+compiled = load_compiled()
+if compiled is not None:
+    munros_df = compiled.frame("peaks")
+    station_adjacency = compiled.station_adjacency()
+    munro_routes = compiled.records("routes")
+else:
+    munros_df = pd.read_csv(MUNROS_PATH)
+    # Station → Munro adjacency, sorted by distance per station
+    station_adjacency = StationAdjacency.from_edges(pd.read_csv(EDGES_PATH), munros_df)
+    with open(ROUTES_PATH) as f:
+        munro_routes = json.load(f)
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    return geodesic((lat1, lon1), (lat2, lon2)).km
+# Spatial index over all peaks, built once at load time
+munro_index = PeakIndex.from_frame(munros_df)
 
 
-# Load static data once
-EDGES_PATH = "data/station_to_munro_edges.csv"
-MUNROS_PATH = "data/munros_osm.csv"
+# Canonical Munro IDs shared by every source (None if not built / stale)
+registry = load_registry()
 
-edges_df = pd.read_csv(EDGES_PATH)
-munros_df = pd.read_csv(MUNROS_PATH)
+# Canonical-name indexes, built once: peaks by munros_df row, routes by position
+peak_names = NameIndex(enumerate(munros_df["name"]))
+route_name_list = [r["name"] for r in munro_routes]
+route_names = NameIndex(
+    enumerate(route_name_list), aliases=bare_name_aliases(route_name_list)
+)
+
+
+def resolve_peak(name: str) -> Optional[NameMatch]:
+    """
+    Resolves a (possibly LLM-mangled) Munro name to a munros_df row and OSM name.
+    """
+    return peak_names.resolve(name)
+
+
+def resolve_route(name: str) -> Optional[NameMatch]:
+    """
+    Resolves a (possibly LLM-mangled) Munro name to its route description; the
+    match ID is the position in munro_routes.
+    """
+    return route_names.resolve(name)
+
+
+def munro_id_for_peak(peak_id: int) -> Optional[int]:
+    """
+    Registry ID of the Munro an OSM peak row belongs to (None for tops).
+    """
+    return registry.id_for_peak(peak_id) if registry is not None else None
+
+
+def route_position(
+    name: Optional[str] = None, munro_id: Optional[int] = None
+) -> Optional[int]:
+    """
+    Position in munro_routes of a Munro: an integer lookup when its registry ID
+    (or an exact known spelling) is available, otherwise the fuzzy route index.
+    """
+    if registry is not None:
+        if munro_id is None and name:
+            munro_id = registry.id_for_name(name)
+        if munro_id is not None and registry.route_position(munro_id) is not None:
+            return registry.route_position(munro_id)
+    match = resolve_route(name) if name else None
+    return match.id if match else None
+
+
+def munros_near_station(
+    station_name: str, limit: Optional[int] = None, peak_mask=None
+) -> List[MunroCandidate]:
+    """
+    Structured lookup: Munros near a train station as (peak_id, name, distance_km), nearest first.
+    peak_mask restricts the result to allowed peaks (see tools.route_filter).
+    """
+    return station_adjacency.candidates(station_name, limit=limit, peak_mask=peak_mask)
+
+
+def nearby_munros(lat: float, lon: float, max_km: float = 30) -> List[NearbyPeak]:
+    """
+    Typed radius query: all Munros within max_km of a coordinate, nearest first.
+    """
+    return munro_index.within(lat, lon, max_km)
+
+
+def nearest_munros(lat: float, lon: float, k: int = 5) -> List[NearbyPeak]:
+    """
+    Typed k-nearest query: the k Munros closest to a coordinate, nearest first.
+    """
+    return munro_index.nearest(lat, lon, k)
 
 
 @tool
@@ -22,31 +105,20 @@ def get_munros_near_station(station_name: str) -> str:
     Input: Station name (e.g. 'Aviemore')
     Output: Formatted list of Munros with distance
     """
-    matches = edges_df[edges_df["station_name"].str.lower() == station_name.lower()]
-    if matches.empty:
+    candidates = munros_near_station(station_name)
+    if not candidates:
         return f"No Munros found near station: {station_name}"
 
-    munros = matches.sort_values("distance_km")[["munro_name", "distance_km"]]
-    result = "\n".join(
-        [
-            f"- {row['munro_name']} ({row['distance_km']} km)"
-            for _, row in munros.iterrows()
-        ]
-    )
+    result = "\n".join([f"- {m.name} ({m.distance_km} km)" for m in candidates])
     return f"Munros near {station_name}:\n{result}"
 
 
 @tool
 def find_nearby_munros(lat: float, lon: float, max_km: int = 30) -> list:
     """
-    Returns a list of Munros within a certain distance of a lat/lon coordinate.
+    Returns a list of Munros within a certain distance of a lat/lon coordinate, nearest first.
     """
-    results = []
-    for _, row in munros_df.iterrows():
-        dist = haversine_distance(lat, lon, row["lat"], row["lon"])
-        if dist <= max_km:
-            results.append(f"{row['name']} ({round(dist, 2)} km)")
-    return results
+    return [f"{p.name} ({p.distance_km} km)" for p in nearby_munros(lat, lon, max_km)]
 
 
 @tool
@@ -55,8 +127,8 @@ def get_munro_info(name: str) -> str:
     Returns basic metadata about a Munro by name.
     Note: difficulty is not available in munros_osm.csv.
     """
-    row = munros_df[munros_df["name"].str.lower() == name.lower()]
-    if row.empty:
+    match = resolve_peak(name)
+    if match is None:
         return "Munro not found."
-    r = row.iloc[0]
+    r = munros_df.iloc[match.id]
     return f"{r['name']} is {r['height']}m tall. Location: ({r['lat']}, {r['lon']})"
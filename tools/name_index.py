@@ -0,0 +1,219 @@
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class NameMatch(NamedTuple):
+    id: int
+    name: str
+    score: float
+    method: str
+
+
+def normalize_name(
+    name: str, token_aliases: Optional[Dict[str, str]] = None, stopwords=()
+) -> str:
+    """
+    Normalize a name to lowercase ASCII words: accents, apostrophes, bullets and
+    punctuation are dropped, tokens are rewritten through token_aliases and
+    stopwords removed (unless that would leave nothing).
+    """
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("utf-8")
+    # A Gaelic article runs into the next word: "Creag a'Mhàim" is "Creag a' Mhàim"
+    text = re.sub(r"['’`](?=[A-Z])", " ", text).lower()
+    text = re.sub(r"['’`]", "", text.replace("&", " and "))
+    tokens = re.sub(r"[^a-z0-9]+", " ", text).split()
+    if token_aliases:
+        tokens = [token_aliases.get(t, t) for t in tokens]
+    kept = [t for t in tokens if t not in stopwords]
+    return " ".join(kept or tokens)
+
+
+def levenshtein(a: str, b: str, max_dist: Optional[int] = None) -> int:
+    """
+    Edit distance between two strings, giving up early once max_dist is exceeded.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_dist is not None and len(a) - len(b) > max_dist:
+        return max_dist + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if max_dist is not None and min(current) > max_dist:
+            return max_dist + 1
+        previous = current
+    return previous[-1]
+
+
+def _trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    Resolves free-text names to canonical (id, name) entries, built once:
+    - exact lookup over normalized names and aliases
+    - a prefix trie over every word-start suffix ("william" finds "Fort William")
+    - a character-trigram index whose candidates are ranked by edit distance
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Tuple[int, str]],
+        aliases: Optional[Dict[str, str]] = None,
+        token_aliases: Optional[Dict[str, str]] = None,
+        stopwords=(),
+        max_candidates: int = 20,
+    ):
+        self.token_aliases = token_aliases or {}
+        self.stopwords = set(stopwords)
+        self.max_candidates = max_candidates
+
+        self.names: Dict[int, str] = {}
+        self.keys: List[str] = []  # normalized key per key id
+        self.key_ids: List[int] = []  # entry id per key id
+        self.exact: Dict[str, int] = {}
+        self.trie: dict = {}
+        self.trigrams: Dict[str, List[int]] = defaultdict(list)
+
+        for entry_id, name in entries:
+            self.names[entry_id] = name
+            self._add_key(self.normalize(name), entry_id)
+
+        by_name = {self.normalize(name): i for i, name in self.names.items()}
+        for alias, canonical in (aliases or {}).items():
+            entry_id = by_name.get(self.normalize(canonical))
+            if entry_id is not None:
+                self._add_key(self.normalize(alias), entry_id)
+
+    def normalize(self, name: str) -> str:
+        return normalize_name(name, self.token_aliases, self.stopwords)
+
+    def _add_key(self, key: str, entry_id: int):
+        if not key or key in self.exact:
+            return
+        key_id = len(self.keys)
+        self.keys.append(key)
+        self.key_ids.append(entry_id)
+        self.exact[key] = key_id
+
+        words = key.split()
+        for start in range(len(words)):
+            node = self.trie
+            for ch in " ".join(words[start:]):
+                node = node.setdefault(ch, {})
+                node.setdefault("", set()).add(key_id)
+
+        for gram in _trigrams(key):
+            self.trigrams[gram].append(key_id)
+
+    def _prefix(self, key: str) -> set:
+        node = self.trie
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get("", set())
+
+    def _match(self, key_id: int, score: float, method: str) -> NameMatch:
+        entry_id = self.key_ids[key_id]
+        return NameMatch(entry_id, self.names[entry_id], round(score, 3), method)
+
+    def search(
+        self, query: str, limit: int = 10, min_score: float = 0.6
+    ) -> List[NameMatch]:
+        """
+        Ranked matches for a query: exact / alias, then prefix, then fuzzy.
+        """
+        key = self.normalize(query)
+        if not key:
+            return []
+
+        scored: Dict[int, NameMatch] = {}
+
+        def offer(match: NameMatch):
+            best = scored.get(match.id)
+            if best is None or match.score > best.score:
+                scored[match.id] = match
+
+        key_id = self.exact.get(key)
+        if key_id is not None:
+            offer(self._match(key_id, 1.0, "exact"))
+
+        for key_id in self._prefix(key):
+            # Prefix of a longer name: score by how much of the name was typed
+            offer(
+                self._match(
+                    key_id, 0.8 + 0.19 * len(key) / len(self.keys[key_id]), "prefix"
+                )
+            )
+
+        if not scored or max(m.score for m in scored.values()) < 1.0:
+            counts: Dict[int, int] = defaultdict(int)
+            for gram in _trigrams(key):
+                for key_id in self.trigrams.get(gram, ()):
+                    counts[key_id] += 1
+            candidates = sorted(counts, key=lambda k: (-counts[k], k))
+            # Only edit-distance the candidates sharing most of the best overlap
+            floor = counts[candidates[0]] // 2 if candidates else 0
+            candidates = [k for k in candidates if counts[k] > floor]
+            for key_id in candidates[: self.max_candidates]:
+                candidate = self.keys[key_id]
+                longest = max(len(key), len(candidate))
+                max_dist = int(longest * (1 - min_score))
+                dist = levenshtein(key, candidate, max_dist)
+                if dist <= max_dist:
+                    offer(self._match(key_id, 0.95 * (1 - dist / longest), "fuzzy"))
+
+        ranked = sorted(
+            (m for m in scored.values() if m.score >= min_score),
+            key=lambda m: (-m.score, len(m.name), m.name),
+        )
+        return ranked[:limit]
+
+    def _best(self, query: str, min_score: float) -> List[NameMatch]:
+        """
+        The matches a query fits best: the top match alone, unless it is a
+        prefix hit. Prefix hits are ranked by how much of the name was typed,
+        which favours short names, so instead every prefix hit where the query
+        ends on a word ("Blair" → Blair Atholl, not Blairhill) is kept, or
+        else every prefix hit ("Glen" → Gleneagles, Glenfinnan, ...).
+        """
+        matches = self.search(query, limit=self.max_candidates, min_score=min_score)
+        if not matches or matches[0].method != "prefix":
+            return matches[:1]
+
+        prefixes = [m for m in matches if m.method == "prefix"]
+        if len(prefixes) == 1:
+            return prefixes
+        key = self.normalize(query)
+        whole_words = {
+            self.key_ids[key_id]
+            for key_id in self._prefix(key)
+            if f" {key} " in f" {self.keys[key_id]} "
+        }
+        return [m for m in prefixes if m.id in whole_words] or prefixes
+
+    def resolve(self, query: str, min_score: float = 0.75) -> Optional[NameMatch]:
+        """
+        Best single match for a query, or None if nothing is close enough or
+        the query is a prefix of several names equally (see ambiguous).
+        """
+        best = self._best(query, min_score)
+        return best[0] if len(best) == 1 else None
+
+    def ambiguous(self, query: str, min_score: float = 0.75) -> List[NameMatch]:
+        """
+        The names a query could equally mean when resolve declines to pick
+        one, or an empty list.
+        """
+        best = self._best(query, min_score)
+        return best if len(best) > 1 else []
@@ -0,0 +1,415 @@
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+import numpy as np
+from tools.preference_rules import extract_preferences
+
+DEFAULT_PORT = 8765
+EMBEDDING_DIMENSIONS = 1536
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:12], 16)
+
+
+def embed_text(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> np.ndarray:
+    """
+    Deterministic unit vector: hashed bag of words (and word pairs), so texts
+    sharing words are close, like real embeddings only much cruder.
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = _digest(feature)
+        vector[h % dimensions] += 1.0 if (h >> 20) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# --- Chat responders: recognise the app's prompts and answer in their format ---
+
+
+def _after(text: str, marker: str) -> str:
+    return text.split(marker, 1)[1] if marker in text else ""
+
+
+def _match(pattern: str, text: str, default):
+    found = re.search(pattern, text, re.MULTILINE)
+    return found.group(1) if found else default
+
+
+def _parse_preferences(prompt: str) -> str:
+    user_prompt = _after(prompt, "User prompt:").strip()
+    return json.dumps(extract_preferences(user_prompt).fields)
+
+
+def _rank_names(prompt: str) -> str:
+    block = _after(prompt, "Below is a list of Munros").split("Please", 1)[0]
+    names = [line[2:].strip() for line in block.splitlines() if line.startswith("- ")]
+    return "\n".join(names[:5])
+
+
+def _top_munros(prompt: str) -> str:
+    top_k = int(_match(r"top (\d+) Munro", prompt, 3))
+    block = _after(prompt, "candidate Munros and their associated links:")
+    names = [
+        line[2:].split(" — ")[0].strip()
+        for line in block.splitlines()
+        if line.startswith("- ")
+    ]
+    return "\n".join(names[:top_k])
+
+
+def _structured_answer(prompt: str) -> str:
+    top_k = int(_match(r"up to (\d+) Munros", prompt, 3))
+    munros = re.findall(r"^\[(\d+)\] (.+)$", prompt, re.MULTILINE)[:top_k]
+    return json.dumps(
+        {
+            "answer": "Good options are "
+            + (", ".join(name for _, name in munros) or "hard to say")
+            + ".",
+            "munro_ids": [int(i) for i, _ in munros],
+            "summaries": {
+                i: f"{name} is a rewarding hill day with a steady climb and fine views."
+                for i, name in munros
+            },
+        }
+    )
+
+
+def _summary_sections(prompt: str) -> str:
+    sections = []
+    for block in _after(prompt, "each with metadata:").split("\n---\n")[1:]:
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if "Name" not in fields:
+            continue
+        sections.append(
+            f"---\n🏔️ Name: {fields['Name']}  \n"
+            f"📍 Distance from Station: {fields.get('Distance from Station', 'N/A')}  \n"
+            f"🚆 Transport Info: {fields.get('Transport Info', 'N/A')}  \n"
+            f"🌄 Terrain: {fields.get('Terrain', 'N/A')}  \n"
+            f"📎 GPX File: {fields.get('GPX File', 'N/A')}  \n"
+            f"📝 Route Summary: A steady walk up {fields['Name']} with good views."
+        )
+    return "\n\n".join(sections)
+
+
+def _route_summary(prompt: str) -> str:
+    name = _match(r"^Name: (.+)$", prompt, "this hill")
+    return (
+        f"{name} is a classic Munro day on mixed paths and open hillside. "
+        "The going is steady with some steeper ground near the top. "
+        "Take a map and compass and be ready for changeable weather."
+    )
+
+
+def _score(prompt: str) -> str:
+    return f"{_digest(prompt) % 101 / 100:.2f}"
+
+
+RESPONDERS: List[tuple] = [
+    ("Extract the following details from the user's hiking prompt", _parse_preferences),
+    ("Return only the Munro names, one per line.", _rank_names),
+    ("Return ONLY the top", _top_munros),
+    ("- munro_ids:", _structured_answer),
+    ("return a structured recommendation in this format", _summary_sections),
+    ("Write a Route Summary", _route_summary),
+    ("Respond with a single number", _score),
+]
+
+FILLER_WORDS = (
+    "the route climbs steadily from the glen onto a broad ridge with wide views "
+    "across the surrounding hills before a rocky final rise to the summit cairn"
+).split()
+
+
+def chat_response(prompt: str, default_words: int = 60) -> str:
+    for marker, responder in RESPONDERS:
+        if marker in prompt:
+            return responder(prompt)
+    # Anything else (e.g. a RetrievalQA answer): deterministic filler prose
+    start = _digest(prompt)
+    words = [
+        FILLER_WORDS[(start + i) % len(FILLER_WORDS)] for i in range(default_words)
+    ]
+    return " ".join(words).capitalize() + "."
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
+
+
+def _tokens(text: str) -> int:
+    # Roughly 4 characters per token, like OpenAI's tokenizers on English
+    return max(1, len(text) // 4)
+
+
+class StandInConfig:
+    """
+    Latency model: a lognormal time to first token (median latency_ms), then
+    completion tokens at tokens_per_second. error_rate of requests fail with
+    one of error_codes.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 400,
+        latency_sigma: float = 0.35,
+        tokens_per_second: float = 80,
+        error_rate: float = 0.0,
+        error_codes: List[int] = (429, 500),
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.dimensions = dimensions
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def first_token_seconds(self) -> float:
+        with self.lock:
+            return self.random.lognormvariate(0, self.latency_sigma) * (
+                self.latency_ms / 1000
+            )
+
+    def injected_error(self) -> Optional[int]:
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                return self.random.choice(self.error_codes)
+        return None
+
+
+def make_handler(config: StandInConfig) -> type:
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, status: int):
+            config.stats[f"error_{status}"] += 1
+            kind = "rate_limit_exceeded" if status == 429 else "server_error"
+            self._json(
+                status,
+                {
+                    "error": {
+                        "message": f"Injected {status}",
+                        "type": kind,
+                        "code": kind,
+                    }
+                },
+            )
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._json(
+                    200,
+                    {
+                        "object": "list",
+                        "data": [{"id": "gpt-3.5-turbo", "object": "model"}],
+                    },
+                )
+            elif self.path.rstrip("/").endswith("/stats"):
+                self._json(200, dict(config.stats))
+            else:
+                self._json(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            routes = {
+                "/chat/completions": self._chat,
+                "/embeddings": self._embeddings,
+            }
+            for suffix, handle in routes.items():
+                if self.path.rstrip("/").endswith(suffix):
+                    config.stats[suffix.strip("/")] += 1
+                    status = config.injected_error()
+                    if status is not None:
+                        time.sleep(config.first_token_seconds())
+                        return self._error(status)
+                    return handle(body)
+            self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def _chat(self, body: dict):
+            prompt = "\n".join(_message_text(m) for m in body.get("messages", []))
+            text = chat_response(prompt)
+            model = body.get("model", "gpt-3.5-turbo")
+            created = int(time.time())
+            completion_id = f"chatcmpl-standin-{_digest(prompt):x}"
+            usage = {
+                "prompt_tokens": _tokens(prompt),
+                "completion_tokens": _tokens(text),
+                "total_tokens": _tokens(prompt) + _tokens(text),
+            }
+
+            time.sleep(config.first_token_seconds())
+            if not body.get("stream"):
+                time.sleep(usage["completion_tokens"] / config.tokens_per_second)
+                return self._json(
+                    200,
+                    {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": created,
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": text},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": usage,
+                    },
+                )
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(delta: dict, finish_reason=None):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            event({"role": "assistant", "content": ""})
+            for piece in re.findall(r"\S+\s*|\s+", text):
+                time.sleep(_tokens(piece) / config.tokens_per_second)
+                event({"content": piece})
+            event({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def _embeddings(self, body: dict):
+            inputs = body.get("input", [])
+            if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            texts = [t if isinstance(t, str) else " ".join(map(str, t)) for t in inputs]
+            dimensions = body.get("dimensions") or config.dimensions
+            time.sleep(config.first_token_seconds())
+
+            data = []
+            for i, text in enumerate(texts):
+                vector = embed_text(text, dimensions)
+                if body.get("encoding_format") == "base64":
+                    embedding = base64.b64encode(
+                        vector.astype("<f4").tobytes()
+                    ).decode()
+                else:
+                    embedding = vector.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": embedding})
+            tokens = sum(_tokens(t) for t in texts)
+            self._json(
+                200,
+                {
+                    "object": "list",
+                    "data": data,
+                    "model": body.get("model", "text-embedding-ada-002"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                },
+            )
+
+    return StandInHandler
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    config: Optional[StandInConfig] = None,
+    ready: Optional[Callable[[ThreadingHTTPServer], None]] = None,
+):
+    """
+    Runs the stand-in until interrupted. ready(server) is called once it listens.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config or StandInConfig()))
+    server.daemon_threads = True
+    if ready is not None:
+        ready(server)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline OpenAI-compatible stand-in (chat + embeddings)"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--latency-ms", type=float, default=400, help="median time to first token"
+    )
+    parser.add_argument(
+        "--latency-sigma", type=float, default=0.35, help="lognormal spread"
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=80)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--error-codes", default="429,500", help="comma-separated HTTP statuses"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_codes=[int(c) for c in args.error_codes.split(",") if c],
+        seed=args.seed,
+    )
+    serve(
+        args.host,
+        args.port,
+        config,
+        ready=lambda server: print(
+            f"[🧪 OpenAI stand-in] http://{args.host}:{server.server_port}/v1 "
+            f"(set MUNRO_OPENAI_BASE_URL to use it)"
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
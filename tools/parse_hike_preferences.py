@@ -1,10 +1,11 @@
 from pydantic import BaseModel
 from langchain_core.tools import tool
 from typing import Optional, List
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
-import os
+from tools.llm_cache import cached_invoke
+from tools.llm_clients import chat_model
+from tools.preference_rules import RULES_MIN_CONFIDENCE, extract_preferences
 
 load_dotenv()
 
@@ -50,22 +51,12 @@ User prompt: {user_prompt}
 """)
 
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo",
-    temperature=0,
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-)
-
-chain = prompt_template | llm
-
-
-@tool
-def parse_hike_preferences(user_prompt: str) -> HikePreferences:
-    """
-    Parses a user's natural language hiking query to extract structured hike preferences.
-    """
-    response = chain.invoke({"user_prompt": user_prompt})
-    content = response.content
+def llm_parse_preferences(user_prompt: str) -> HikePreferences:
+    content = cached_invoke(
+        "parse_hike_preferences",
+        chat_model(),
+        prompt_template.format(user_prompt=user_prompt),
+    )
 
     try:
         parsed = HikePreferences.parse_raw(content)
@@ -74,3 +65,16 @@ def parse_hike_preferences(user_prompt: str) -> HikePreferences:
         raise ValueError(
             f"Failed to parse hike preferences: {e}\nLLM response content:\n{content}"
         )
+
+
+@tool
+def parse_hike_preferences(user_prompt: str) -> HikePreferences:
+    """
+    Parses a user's natural language hiking query to extract structured hike preferences.
+    """
+    # Simple prompts ("munros near Aviemore under 15km") don't need the LLM
+    rules = extract_preferences(user_prompt)
+    if rules.confidence >= RULES_MIN_CONFIDENCE:
+        print(f"[⚡ Parsed without LLM] confidence {rules.confidence:.2f}")
+        return HikePreferences(**rules.fields)
+    return llm_parse_preferences(user_prompt)
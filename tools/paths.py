@@ -0,0 +1,22 @@
+import os
+
+# Repository root: data paths are anchored here, so every entry point (the
+# CLI from the root, the server from server/) reads the same files
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def repo_path(*parts: str) -> str:
+    """
+    Absolute path of a file in the repository (absolute parts pass through).
+    """
+    return os.path.join(ROOT, *parts)
+
+
+def source_key(path: str) -> str:
+    """
+    How a source file is named in manifests: relative to the repository root
+    when inside it, so records stay valid whichever directory wrote them.
+    """
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path, ROOT)
+    return path if relative.startswith(os.pardir) else relative
@@ -0,0 +1,390 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from tools.transport import station_resolver
+
+# Rule output is used instead of the LLM's at or above this confidence
+RULES_MIN_CONFIDENCE = 0.85
+
+# Places treated as a journey origin ("from Glasgow") rather than a station to hike from
+ORIGIN_CITIES = [
+    "Aberdeen",
+    "Dundee",
+    "Edinburgh",
+    "Glasgow",
+    "Inverness",
+    "Perth",
+    "Stirling",
+]
+
+NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+    "fifteen": 15,
+    "twenty": 20,
+    "thirty": 30,
+    "forty": 40,
+    "fifty": 50,
+    "sixty": 60,
+    "ninety": 90,
+}
+_NUMBER = r"(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r"|an?|half an?)"
+
+# Words that mark a duration as public-transport travel time rather than hiking time
+TRAVEL_CUES = re.compile(
+    r"\b(train|trains|travel|travelling|traveling|journey|rail|railway|reachable|"
+    r"commute|away)\b",
+    re.IGNORECASE,
+)
+
+GRADE_KEYWORDS = {
+    1: ["very easy", "easiest"],
+    2: ["easy", "gentle", "beginner", "beginners", "beginner-friendly", "novice"],
+    3: ["moderate", "intermediate", "medium"],
+    4: ["challenging", "hard", "difficult", "tough", "strenuous", "steep"],
+    5: ["very hard", "very difficult", "technical", "extreme", "hardest"],
+}
+
+BOG_PATTERNS = [
+    (
+        1,
+        r"\b(avoid|avoiding|hate|hates|dislike|no|not|without|minimal|little)\b"
+        r"(\s+\w+){0,2}\s+(bog|boggy|bogs|mud|muddy)\b",
+    ),
+    (1, r"\b(dry|dry underfoot)\b"),
+    (
+        5,
+        r"\b(don'?t|do not|doesn'?t) mind\b(\s+\w+){0,2}\s+(bog|boggy|bogs|mud|muddy)\b",
+    ),
+    (5, r"\b(bog|boggy|bogs|mud|muddy)\b(\s+\w+){0,2}\s+(is|are)\s+(fine|ok|okay)\b"),
+]
+
+FEATURES = {
+    "ridge": ["ridge", "ridges", "ridge walk", "ridge walking"],
+    "loop": ["loop", "circular", "circuit", "round"],
+    "scrambling": ["scramble", "scrambles", "scrambling"],
+    "views": ["views", "view", "viewpoint", "panoramic"],
+    "summit": ["summit", "summits"],
+    "waterfall": ["waterfall", "waterfalls"],
+    "loch": ["loch", "lochs", "lochside"],
+}
+
+SOFT_PREFERENCES = {
+    "scenic": ["scenic", "beautiful", "stunning", "pretty"],
+    "quiet": [
+        "quiet",
+        "peaceful",
+        "not busy",
+        "avoid busy",
+        "avoid crowds",
+        "uncrowded",
+        "secluded",
+    ],
+    "remote": ["remote", "wild", "isolated"],
+    "dog-friendly": ["dog-friendly", "dog friendly", "with my dog", "with a dog"],
+    "child-friendly": [
+        "child-friendly",
+        "child friendly",
+        "kid-friendly",
+        "kid friendly",
+        "family-friendly",
+        "family friendly",
+        "with kids",
+        "with children",
+    ],
+    "beginner-friendly": ["beginner-friendly", "beginner friendly", "for beginners"],
+    "challenging": ["challenging"],
+}
+
+# Words that carry no preference ("munros near ...", "show me hikes ...")
+FILLER = set("""
+    a about accessible an and any anything are around at be best by can close could
+    day days do find for from get give go going good great hike hikes hiking hill hills
+    how i i'd i'm id im in is it like list looking me mountain mountains munro munros
+    my near nearby of on or please public recommend recommendations route routes show
+    some something start starting station stations suggest suggestions that the there
+    to train trains transport trip walk walks walking want what which with within
+    would you
+    under less than up max maximum no long km kilometres
+    kilometers miles mile hours hour hrs hr minutes mins min time ideally
+    """.split())
+
+# A lower bound ("at least 15km") can't be expressed as a max_* field
+_LOWER_BOUND = re.compile(
+    r"\b(at least|over|more than|longer than|further than|above|upwards of|"
+    r"minimum(?: of)?)\s+$",
+    re.IGNORECASE,
+)
+_NEGATION = re.compile(r"(\bnot|n['’]t|\bno|\bnever)(\s+\w+){0,3}\s+$", re.IGNORECASE)
+_TOKEN = re.compile(r"[A-Za-z][A-Za-z'’\-]*|\d+(?:\.\d+)?")
+_CLAUSE_BREAK = re.compile(r"[.;!?\n]")
+
+
+class RuleParse(NamedTuple):
+    fields: Dict[str, object]
+    confidence: float
+    unexplained: List[str]
+
+
+def _number(text: str) -> Optional[float]:
+    text = text.lower().strip()
+    if text in ("a", "an"):
+        return 1.0
+    if text.startswith("half"):
+        return 0.5
+    if text in NUMBER_WORDS:
+        return float(NUMBER_WORDS[text])
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _clause(text: str, start: int, end: int) -> str:
+    left = max((m.end() for m in _CLAUSE_BREAK.finditer(text, 0, start)), default=0)
+    right = _CLAUSE_BREAK.search(text, end)
+    return text[left : right.start() if right else len(text)]
+
+
+def _phrase_pattern(phrase: str) -> str:
+    return r"\b" + r"[\s\-]+".join(map(re.escape, phrase.split())) + r"\b"
+
+
+class _Extractor:
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.consumed = [False] * len(prompt)
+        self.fields: Dict[str, object] = {
+            "origin_city": None,
+            "max_travel_time_minutes": None,
+            "max_time_hours": None,
+            "max_distance_km": None,
+            "grade": None,
+            "bog_tolerance": None,
+            "features": None,
+            "station_keywords": [],
+            "soft_preferences": [],
+        }
+        self.ambiguous: List[str] = []
+
+    def consume(self, start: int, end: int):
+        for i in range(start, end):
+            self.consumed[i] = True
+
+    def set(self, field: str, value, reason: str):
+        current = self.fields[field]
+        if current is not None and current != value:
+            self.ambiguous.append(f"{field}: {current} vs {value} ({reason})")
+        self.fields[field] = value
+
+    def durations(self):
+        pattern = re.compile(
+            r"\b(?:(under|less than|up to|max(?:imum)?|no more than|within|at most)\s+)?"
+            + _NUMBER
+            + r"(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?\s*"
+            r"(hours?|hrs?|h|minutes?|mins?)\b",
+            re.IGNORECASE,
+        )
+        for m in pattern.finditer(self.prompt):
+            value = _number(m.group(2))
+            if m.group(3):  # a range: "4-5 hours" → the upper bound
+                value = float(m.group(3))
+            if value is None:
+                continue
+            minutes = value if m.group(4).lower().startswith("m") else value * 60
+            self.consume(m.start(), m.end())
+            if _LOWER_BOUND.search(self.prompt[: m.start()]):
+                self.ambiguous.append(f"lower bound on '{m.group(0)}'")
+                continue
+
+            # "within 2 hours of Glasgow" is a journey even without a travel word
+            origin = re.match(r"\s+(?:of|from)\s+(\w+)", self.prompt[m.end() :])
+            if TRAVEL_CUES.search(_clause(self.prompt, m.start(), m.end())) or (
+                origin and origin.group(1).title() in ORIGIN_CITIES
+            ):
+                self.set("max_travel_time_minutes", int(round(minutes)), m.group(0))
+            elif minutes % 60:
+                # max_time_hours is whole hours; leave "4.5 hours" to the LLM
+                self.ambiguous.append(f"fractional hiking time '{m.group(0)}'")
+            else:
+                self.set("max_time_hours", int(minutes // 60), m.group(0))
+
+    def distances(self):
+        pattern = re.compile(
+            r"\b(?:(under|less than|up to|max(?:imum)?|no more than|within|at most)\s+)?"
+            + _NUMBER
+            + r"\s*(km|kms|kilomet(?:er|re)s?|k|miles?|mi)\b",
+            re.IGNORECASE,
+        )
+        for m in pattern.finditer(self.prompt):
+            value = _number(m.group(2))
+            if value is None:
+                continue
+            if m.group(3).lower().startswith("mi"):
+                value *= 1.609344
+            self.consume(m.start(), m.end())
+            if _LOWER_BOUND.search(self.prompt[: m.start()]):
+                self.ambiguous.append(f"lower bound on '{m.group(0)}'")
+                continue
+            self.set("max_distance_km", round(value, 1), m.group(0))
+
+    def keywords(self):
+        text = self.prompt.lower()
+        grades = set()
+        for grade, words in GRADE_KEYWORDS.items():
+            for word in words:
+                for m in re.finditer(_phrase_pattern(word), text):
+                    if any(self.consumed[m.start() : m.end()]):
+                        pass
+                    elif _NEGATION.search(text[: m.start()]):
+                        # "doesn't need to be difficult" says little about the grade
+                        self.ambiguous.append(f"negated grade keyword '{word}'")
+                    else:
+                        grades.add(grade)
+                    self.consume(m.start(), m.end())
+        # "very hard" also contains "hard": keep the most specific (longest) phrase
+        if grades:
+            if len(grades) > 1 and not (grades == {4, 5} or grades == {1, 2}):
+                self.ambiguous.append(f"grade keywords {sorted(grades)}")
+            self.set("grade", max(grades) if min(grades) >= 4 else min(grades), "")
+
+        for tolerance, pattern in BOG_PATTERNS:
+            for m in re.finditer(pattern, text):
+                self.consume(m.start(), m.end())
+                self.set("bog_tolerance", tolerance, m.group(0))
+        for m in re.finditer(r"\b(bog|boggy|bogs|mud|muddy)\b", text):
+            if not any(self.consumed[m.start() : m.end()]):
+                self.ambiguous.append(f"bog mention '{m.group(0)}'")
+
+        matches = []
+        for field, vocabulary in (
+            ("features", FEATURES),
+            ("soft_preferences", SOFT_PREFERENCES),
+        ):
+            for label, phrases in vocabulary.items():
+                for phrase in sorted(phrases, key=len, reverse=True):
+                    for m in re.finditer(_phrase_pattern(phrase), text):
+                        self.consume(m.start(), m.end())
+                        matches.append((field, label, m))
+
+        # Checked once every phrase is consumed, so the "not" of "not busy" or
+        # "no more than" doesn't negate the next keyword
+        for field, label, m in matches:
+            negation = _NEGATION.search(text[: m.start()])
+            if negation and not self.consumed[negation.start()]:
+                # "no scrambling" is an exclusion, which the fields can't hold
+                self.ambiguous.append(f"negated {field} keyword '{m.group(0)}'")
+                continue
+            found = self.fields[field] or []
+            if label not in found:
+                self.fields[field] = found + [label]
+
+    def places(self):
+        """
+        Station / origin mentions: capitalized runs ("Bridge of Orchy") and the
+        words after a place cue ("near aviemore"), resolved on exact names only.
+        """
+        spans = []
+        capitalized = re.compile(
+            r"\b[A-Z][\w'’\-]*(?:\s+(?:of|and|na|on|[A-Z][\w'’\-]*))*(?<!\sof)(?<!\sand)"
+        )
+        spans += [(m.start(), m.end()) for m in capitalized.finditer(self.prompt)]
+        cue = re.compile(
+            r"\b(?:near|from|at|around|to|via|in|of)\s+((?:[a-z][\w'’\-]*\s*){1,6})",
+            re.IGNORECASE,
+        )
+        spans += [(m.start(1), m.end(1)) for m in cue.finditer(self.prompt)]
+
+        origin_cue = re.compile(r"\b(?:from|of)\s+$", re.IGNORECASE)
+        for start, end in sorted(spans, key=lambda span: (span[0], -span[1])):
+            words = list(re.finditer(r"[\w'’\-]+", self.prompt[start:end]))
+            i = 0
+            while i < len(words):
+                if any(
+                    self.consumed[start + words[i].start() : start + words[i].end()]
+                ):
+                    i += 1
+                    continue
+                # Longest run of words starting here that names a place exactly
+                for j in range(len(words), i, -1):
+                    a, b = start + words[i].start(), start + words[j - 1].end()
+                    name = self.prompt[a:b]
+                    place = self._place(name, origin_cue.search(self.prompt[:a]))
+                    if place is not None:
+                        self.consume(a, b)
+                        i = j
+                        break
+                else:
+                    i += 1
+
+    def _place(self, name: str, after_from) -> Optional[str]:
+        city = next((c for c in ORIGIN_CITIES if c.lower() == name.lower()), None)
+        if city is not None and (
+            after_from or self.fields["max_travel_time_minutes"] is not None
+        ):
+            self.set("origin_city", city, name)
+            return city
+
+        key = station_resolver.normalize(name)
+        if key in FILLER or not key:
+            return None
+        match = station_resolver.resolve(name, min_score=0.9)
+        # A prefix hit means a longer name ("Bridge of" → "Bridge of Allan")
+        if match is None or match.method == "prefix":
+            return None
+        if match.method != "exact" and len(key) < 6:
+            return None
+        if match.name not in self.fields["station_keywords"]:
+            self.fields["station_keywords"].append(match.name)
+        return match.name
+
+    def unexplained(self) -> List[str]:
+        return [
+            m.group(0)
+            for m in _TOKEN.finditer(self.prompt)
+            if not all(self.consumed[m.start() : m.end()])
+            and m.group(0).lower().replace("’", "'") not in FILLER
+        ]
+
+
+def extract_preferences(user_prompt: str) -> RuleParse:
+    """
+    Deterministic HikePreferences extraction. Confidence is the share of
+    meaningful words explained by a rule; it is 0 when nothing structured was
+    found or the rules disagree with each other.
+    """
+    extractor = _Extractor(user_prompt)
+    extractor.durations()
+    extractor.distances()
+    extractor.keywords()
+    extractor.places()
+    # An origin city only makes sense with a travel-time budget, and vice versa
+    fields = extractor.fields
+    if fields["origin_city"] and not fields["max_travel_time_minutes"]:
+        extractor.ambiguous.append("origin without travel time")
+
+    unexplained = extractor.unexplained()
+    tokens = [
+        m.group(0)
+        for m in _TOKEN.finditer(user_prompt)
+        if m.group(0).lower().replace("’", "'") not in FILLER
+        or not all(extractor.consumed[m.start() : m.end()])
+    ]
+    structured = any(
+        fields[f] for f in fields if f not in ("features", "soft_preferences")
+    )
+    if not structured or extractor.ambiguous:
+        confidence = 0.0
+    else:
+        confidence = 1 - len(unexplained) / max(len(tokens), 1)
+    return RuleParse(fields, round(confidence, 3), unexplained + extractor.ambiguous)
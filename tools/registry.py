@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import pandas as pd
+from tools.datasets import MUNROS_PATH, ROUTES_PATH
+from tools.geo_index import haversine_km
+from tools.name_index import NameIndex, normalize_name
+from tools.paths import repo_path, source_key
+
+REGISTRY_PATH = repo_path("data", "munro_registry.json")
+REGISTRY_OVERRIDES_PATH = repo_path("data", "munro_registry_overrides.json")
+RAG_MUNROS_PATH = repo_path("munro_rag", "munros.json")
+MUNRO_LIST_PATH = repo_path("munro_list.json")
+SQLITE_PATH = repo_path("db.sqlite")
+
+FORMAT_VERSION = 1
+
+# OSM peaks are linked to a Munro by exact / alias name or a close fuzzy match
+PEAK_MATCH_MIN_SCORE = 0.9
+# An override pins a Munro to the OSM peak nearest its coordinates, within this
+OVERRIDE_MAX_KM = 1.0
+
+
+def bare_name_aliases(names: List[str]) -> Dict[str, str]:
+    """
+    "Ben More (Mull)" is also known as "Ben More", unless the bare name is
+    shared by several routes ("An Socach (Affric)", "An Socach (Braemar)", ...).
+    """
+    bare = {name: re.sub(r"\s*\(.*?\)\s*$", "", name) for name in names}
+    counts = Counter(normalize_name(b) for b in bare.values())
+    return {
+        b: name
+        for name, b in bare.items()
+        if b != name and counts[normalize_name(b)] == 1
+    }
+
+
+def _repair_mojibake(name: str) -> str:
+    # db.sqlite was seeded from UTF-8 JSON read as cp1252 ("CÃ rn" for "Càrn")
+    try:
+        return name.encode("cp1252").decode("utf-8")
+    except UnicodeError:
+        return name
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class MunroRegistry:
+    """
+    Canonical Munro entities with stable integer IDs, plus precomputed
+    source → ID mappings so runtime joins are dict / list lookups:
+    - names: every known spelling (normalized) → ID
+    - peaks: munros_osm.csv row → ID (None for tops and unlinked peaks)
+    - routes: munro_descriptions.json position → ID
+    """
+
+    def __init__(self, data: dict):
+        self.munros = {m["id"]: m for m in data["munros"]}
+        self.names: Dict[str, int] = data["names"]
+        self.peaks: List[Optional[int]] = data["peaks"]
+        self.routes: List[int] = data["routes"]
+        self.route_positions = {munro_id: i for i, munro_id in enumerate(self.routes)}
+
+    def __len__(self):
+        return len(self.munros)
+
+    def __contains__(self, munro_id: int) -> bool:
+        return munro_id in self.munros
+
+    def __getitem__(self, munro_id: int) -> dict:
+        return self.munros[munro_id]
+
+    def id_for_name(self, name: str) -> Optional[int]:
+        return self.names.get(normalize_name(name))
+
+    def id_for_peak(self, peak_id: int) -> Optional[int]:
+        if 0 <= peak_id < len(self.peaks):
+            return self.peaks[peak_id]
+        return None
+
+    def route_position(self, munro_id: int) -> Optional[int]:
+        return self.route_positions.get(munro_id)
+
+
+def load_registry(
+    path: str = REGISTRY_PATH, munros_path: str = MUNROS_PATH
+) -> Optional[MunroRegistry]:
+    """
+    Loads the registry, or returns None if it is missing or was built from a
+    different munros_osm.csv (peak rows would no longer line up).
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if data.get("format") != FORMAT_VERSION:
+        return None
+    stored = data.get("sources", {}).get(source_key(munros_path))
+    if _file_digest(munros_path) != stored:
+        print(f"[⚠️ Munro registry is stale] {munros_path} changed; rebuild it")
+        return None
+    return MunroRegistry(data)
+
+
+def _link_peaks(
+    munros_df: pd.DataFrame,
+    routes: List[dict],
+    route_ids: List[int],
+    overrides: Dict[str, List[float]],
+):
+    """
+    Links OSM peak rows to Munro IDs: overrides first (nearest peak to the
+    pinned coordinates), then names. When several peaks claim one Munro the
+    highest wins (same-named tops are usually lower), the rest stay unlinked.
+    """
+    peaks: List[Optional[int]] = [None] * len(munros_df)
+    id_by_url = {r["url"]: munro_id for r, munro_id in zip(routes, route_ids)}
+    lats = munros_df["lat"].to_numpy(dtype=float)
+    lons = munros_df["lon"].to_numpy(dtype=float)
+    heights = munros_df["height"].to_numpy(dtype=float)
+
+    pinned = set()
+    for url, (lat, lon) in overrides.items():
+        munro_id = id_by_url.get(url)
+        if munro_id is None:
+            print(f"[⚠️ Registry override] Unknown route {url}")
+            continue
+        distances = haversine_km(lat, lon, lats, lons)
+        row = int(distances.argmin())
+        if distances[row] > OVERRIDE_MAX_KM:
+            print(f"[⚠️ Registry override] No OSM peak near {url}")
+            continue
+        peaks[row] = munro_id
+        pinned.add(munro_id)
+
+    names = [r["name"] for r in routes]
+    index = NameIndex(
+        zip(route_ids, names),
+        aliases=bare_name_aliases(names),
+    )
+    claims = defaultdict(list)
+    for row, name in enumerate(munros_df["name"]):
+        if peaks[row] is not None or name == "Unnamed":
+            continue
+        match = index.resolve(name, min_score=PEAK_MATCH_MIN_SCORE)
+        # A prefix hit is a longer name ("Aonach Eagach" ⊂ "Meall Dearg (Aonach Eagach)")
+        if match is None or match.method == "prefix" or match.id in pinned:
+            continue
+        claims[match.id].append(row)
+
+    conflicts = []
+    for munro_id, rows in claims.items():
+        rows = sorted(rows, key=lambda r: -heights[r])
+        peaks[rows[0]] = munro_id
+        conflicts += [(munro_id, munros_df["name"].iloc[r]) for r in rows[1:]]
+    return peaks, conflicts
+
+
+def build_registry(
+    path: str = REGISTRY_PATH,
+    munros_path: str = MUNROS_PATH,
+    routes_path: str = ROUTES_PATH,
+    overrides_path: str = REGISTRY_OVERRIDES_PATH,
+    extra_sources: List[str] = (RAG_MUNROS_PATH, MUNRO_LIST_PATH),
+    sqlite_path: str = SQLITE_PATH,
+) -> MunroRegistry:
+    """
+    Builds the registry. One entity per Walkhighlands route (keyed by URL);
+    IDs of an existing registry are kept and new routes get the next free ID,
+    so IDs are stable across rebuilds.
+    """
+    with open(routes_path) as f:
+        routes = json.load(f)
+    munros_df = pd.read_csv(munros_path)
+    try:
+        with open(overrides_path) as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        overrides = {}
+
+    previous = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = {m["url"]: m["id"] for m in json.load(f)["munros"]}
+
+    next_id = max(previous.values(), default=0) + 1
+    route_ids = []
+    for r in routes:
+        if r["url"] not in previous:
+            previous[r["url"]] = next_id
+            next_id += 1
+        route_ids.append(previous[r["url"]])
+
+    peaks, conflicts = _link_peaks(munros_df, routes, route_ids, overrides)
+    peak_of = {
+        munro_id: row for row, munro_id in enumerate(peaks) if munro_id is not None
+    }
+
+    names: Dict[str, int] = {}
+    id_by_url = dict(zip((r["url"] for r in routes), route_ids))
+
+    def add_name(name: Optional[str], munro_id: Optional[int]):
+        if name and munro_id is not None:
+            names.setdefault(normalize_name(name), munro_id)
+
+    for r, munro_id in zip(routes, route_ids):
+        add_name(r["name"], munro_id)
+    for alias, canonical in bare_name_aliases([r["name"] for r in routes]).items():
+        add_name(alias, names[normalize_name(canonical)])
+    for source in extra_sources:
+        with open(source) as f:
+            for r in json.load(f):
+                add_name(r.get("name"), id_by_url.get(r.get("url")))
+    if os.path.exists(sqlite_path):
+        conn = sqlite3.connect(sqlite_path)
+        for row_id, name in conn.execute("SELECT id, name FROM munros"):
+            munro_id = names.get(normalize_name(_repair_mojibake(name)))
+            add_name(name, munro_id)
+            # The Flask API serves rows by ID, so they must be the registry IDs
+            if munro_id is not None and munro_id != row_id:
+                print(f"[⚠️ {sqlite_path}] Row {row_id} is Munro {munro_id}")
+        conn.close()
+    for row, munro_id in enumerate(peaks):
+        add_name(munros_df["name"].iloc[row], munro_id)
+
+    data = {
+        "format": FORMAT_VERSION,
+        "sources": {source_key(munros_path): _file_digest(munros_path)},
+        "munros": [
+            {
+                "id": munro_id,
+                "name": r["name"],
+                "url": r["url"],
+                "peak": peak_of.get(munro_id),
+            }
+            for r, munro_id in zip(routes, route_ids)
+        ],
+        "routes": route_ids,
+        "peaks": peaks,
+        "names": names,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+
+    unlinked = [m["name"] for m in data["munros"] if m["peak"] is None]
+    print(
+        f"Saved: {path} ({len(route_ids)} Munros, {len(names)} names, "
+        f"{len(route_ids) - len(unlinked)} linked to OSM peaks)"
+    )
+    if unlinked:
+        print(f"[⚠️ No OSM peak for] {', '.join(unlinked)}")
+    for munro_id, name in conflicts:
+        print(f"[⚠️ Unlinked duplicate] OSM '{name}' (Munro {munro_id} taken)")
+    return MunroRegistry(data)
+
+
+if __name__ == "__main__":
+    build_registry()
@@ -0,0 +1,164 @@
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from tools.munros import munros_df, registry, route_position, station_adjacency
+from tools.route_ranking import RouteAttributes, route_attributes
+
+# Station radius for filtered retrieval (the adjacency edges reach ~30 km)
+DEFAULT_STATION_RADIUS_KM = 30.0
+
+
+class RouteFilterIndex:
+    """
+    Hard-constraint index over the route attributes: one sorted copy of each
+    column, so "at most x" is a binary search giving a bitset (boolean mask)
+    over routes. Constraint masks are intersected, then projected onto OSM
+    peak rows so they compose with the station adjacency index.
+    """
+
+    def __init__(self, attributes: RouteAttributes, peak_positions: np.ndarray):
+        self.columns: Dict[str, np.ndarray] = {
+            "time": attributes.time,
+            "distance": attributes.distance,
+            "grade": attributes.grade,
+            "bog": attributes.bog,
+        }
+        self.order = {
+            name: np.argsort(values, kind="stable")
+            for name, values in self.columns.items()
+        }
+        self.sorted = {
+            name: values[self.order[name]] for name, values in self.columns.items()
+        }
+        self.n_routes = len(attributes)
+        # Route position of every peak row, -1 for tops and unlinked peaks
+        self.peak_positions = peak_positions
+
+    def at_most(self, column: str, limit: float) -> np.ndarray:
+        """
+        Mask of routes whose column value is <= limit (missing values never match).
+        """
+        cut = int(np.searchsorted(self.sorted[column], limit, side="right"))
+        mask = np.zeros(self.n_routes, dtype=bool)
+        mask[self.order[column][:cut]] = True
+        return mask
+
+    def routes_matching(self, preferences) -> Optional[np.ndarray]:
+        """
+        Mask of routes within every hard limit in preferences: max time, max
+        distance, grade and bog tolerance as upper bounds. None when there are
+        no hard limits.
+        """
+        limits = [
+            ("time", preferences.max_time_hours),
+            ("distance", preferences.max_distance_km),
+            ("grade", preferences.grade),
+            ("bog", preferences.bog_tolerance),
+        ]
+        mask = None
+        for column, limit in limits:
+            if limit:
+                allowed = self.at_most(column, float(limit))
+                mask = allowed if mask is None else mask & allowed
+        return mask
+
+    def peaks_matching(self, preferences) -> Optional[np.ndarray]:
+        """
+        routes_matching as a mask over peak rows, for StationAdjacency.candidates.
+        Peaks without a route (tops, unlinked) are excluded.
+        """
+        routes = self.routes_matching(preferences)
+        if routes is None:
+            return None
+        linked = self.peak_positions >= 0
+        mask = np.zeros(len(self.peak_positions), dtype=bool)
+        mask[linked] = routes[self.peak_positions[linked]]
+        return mask
+
+    def routes_near(self, peak_ids) -> np.ndarray:
+        """
+        Mask of the routes of the given peak rows.
+        """
+        positions = self.peak_positions[np.asarray(peak_ids, dtype=np.int64)]
+        mask = np.zeros(self.n_routes, dtype=bool)
+        mask[positions[positions >= 0]] = True
+        return mask
+
+
+class RouteConstraints(NamedTuple):
+    """
+    Hard limits for filtered retrieval: the HikePreferences upper bounds and,
+    optionally, Munros within radius_km of any of the given stations.
+    Hashable, so masks and retrievers can be cached per constraint set.
+    """
+
+    max_time_hours: Optional[float] = None
+    max_distance_km: Optional[float] = None
+    grade: Optional[int] = None
+    bog_tolerance: Optional[int] = None
+    stations: Tuple[str, ...] = ()
+    radius_km: float = DEFAULT_STATION_RADIUS_KM
+
+    @classmethod
+    def from_preferences(
+        cls, preferences, stations=(), radius_km: float = DEFAULT_STATION_RADIUS_KM
+    ) -> Optional["RouteConstraints"]:
+        """
+        The constraints in preferences, or None when nothing would be filtered.
+        """
+        constraints = cls(
+            preferences.max_time_hours or None,
+            preferences.max_distance_km or None,
+            preferences.grade or None,
+            preferences.bog_tolerance or None,
+            tuple(stations),
+            radius_km,
+        )
+        return constraints if constraints[:5] != cls()[:5] else None
+
+
+def _peak_positions() -> np.ndarray:
+    positions = np.full(len(munros_df), -1, dtype=np.int64)
+    for row, name in enumerate(munros_df["name"]):
+        if registry is not None:
+            munro_id = registry.id_for_peak(row)
+            position = (
+                route_position(munro_id=munro_id) if munro_id is not None else None
+            )
+        else:
+            position = route_position(name) if name != "Unnamed" else None
+        if position is not None:
+            positions[row] = position
+    return positions
+
+
+route_filter = RouteFilterIndex(route_attributes, _peak_positions())
+
+
+def peaks_matching(preferences) -> Optional[np.ndarray]:
+    """
+    Peak rows allowed by the hard limits in preferences (None: no limits).
+    """
+    return route_filter.peaks_matching(preferences)
+
+
+@lru_cache(maxsize=256)
+def constrained_routes(constraints: RouteConstraints) -> Optional[np.ndarray]:
+    """
+    Routes allowed by constraints: within every hard limit and, when stations
+    are given, with a peak within the radius of one of them. None: no limits.
+    """
+    mask = route_filter.routes_matching(constraints)
+    if constraints.stations:
+        peak_ids = [
+            candidate.peak_id
+            for station in constraints.stations
+            for candidate in station_adjacency.candidates(
+                station, max_km=constraints.radius_km
+            )
+            if candidate.peak_id >= 0
+        ]
+        nearby = route_filter.routes_near(peak_ids)
+        mask = nearby if mask is None else mask & nearby
+    return mask
@@ -0,0 +1,186 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from tools.munros import munro_routes, registry, route_position
+
+# Weights of the soft-preference terms (hard-constraint violations always rank first)
+W_GRADE = 1.0
+W_BOG = 1.0
+W_KEYWORDS = 2.0
+W_PROXIMITY = 0.5
+
+# Routes whose scores are this close to the best are "tied" for an optional LLM tie-break
+TIE_MARGIN = 0.05
+
+KEYWORD_TEXT_FIELDS = ["title", "summary", "terrain", "description"]
+
+
+class RankedRoutes(NamedTuple):
+    order: np.ndarray  # candidate indexes, best first
+    violation: np.ndarray  # per candidate: summed relative overshoot of hard limits
+    score: np.ndarray  # per candidate: weighted soft-preference similarity, 0–1
+
+
+def _stems(term: str) -> List[str]:
+    # "scrambling" matches "scramble", "views" matches "view"
+    return [w.rstrip("s")[:6] for w in re.findall(r"[a-z]+", term.lower()) if w]
+
+
+class RouteAttributes:
+    """
+    Numeric route attributes from munro_descriptions.json as column arrays,
+    indexed by route position, plus per-term keyword masks built on demand.
+    """
+
+    def __init__(self, routes: Sequence):
+        self.routes = routes
+        self.distance = np.array([r.get("distance") for r in routes], dtype=float)
+        self.time = np.array([r.get("time") for r in routes], dtype=float)
+        self.grade = np.array([r.get("grade") for r in routes], dtype=float)
+        self.bog = np.array([r.get("bog") for r in routes], dtype=float)
+        self._texts: Optional[List[str]] = None
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.distance)
+
+    def keyword_mask(self, term: str) -> np.ndarray:
+        """
+        Boolean array: which route descriptions mention every word of term.
+        """
+        term = term.lower().strip()
+        if term not in self._masks:
+            if self._texts is None:
+                self._texts = [
+                    " ".join(str(r.get(f) or "") for f in KEYWORD_TEXT_FIELDS).lower()
+                    for r in self.routes
+                ]
+            mask = np.ones(len(self), dtype=bool)
+            for stem in _stems(term):
+                pattern = re.compile(r"\b" + re.escape(stem))
+                mask &= np.array([bool(pattern.search(t)) for t in self._texts])
+            self._masks[term] = mask
+        return self._masks[term]
+
+
+route_attributes = RouteAttributes(munro_routes)
+
+
+def candidate_position(candidate: dict) -> Optional[int]:
+    """
+    Route position of a router candidate (None for tops and unknown peaks).
+    With a registry a name only counts when it is a known spelling of a
+    Munro: a top's name can fuzzily match a Munro's route.
+    """
+    if candidate.get("munro_id") is not None:
+        return route_position(munro_id=candidate["munro_id"])
+    name = candidate.get("name")
+    if registry is None:
+        return route_position(name)
+    munro_id = registry.id_for_name(name) if name else None
+    return route_position(munro_id=munro_id) if munro_id is not None else None
+
+
+def candidate_positions(candidates: List[dict]) -> np.ndarray:
+    positions = [candidate_position(m) for m in candidates]
+    return np.array([-1 if p is None else p for p in positions], dtype=np.int64)
+
+
+def score_routes(
+    preferences,
+    positions: np.ndarray,
+    station_km: Optional[np.ndarray] = None,
+    attributes: RouteAttributes = route_attributes,
+) -> RankedRoutes:
+    """
+    Vectorized ranking of candidate routes (by route position) against
+    HikePreferences. Candidates are ordered by hard-constraint violation
+    (max time, max distance, grade and bog tolerance as upper limits), then by
+    soft similarity: grade closeness, dryness, keyword matches of features and
+    soft preferences, and closeness to the station. Unknown routes come last.
+    """
+    n = len(positions)
+    known = positions >= 0
+    rows = np.where(known, positions, 0)
+    distance = attributes.distance[rows]
+    time = attributes.time[rows]
+    grade = attributes.grade[rows]
+    bog = attributes.bog[rows]
+
+    violation = np.zeros(n)
+    if preferences.max_time_hours:
+        limit = float(preferences.max_time_hours)
+        violation += np.maximum(time - limit, 0) / limit
+    if preferences.max_distance_km:
+        limit = float(preferences.max_distance_km)
+        violation += np.maximum(distance - limit, 0) / limit
+    if preferences.grade:
+        violation += np.maximum(grade - preferences.grade, 0) / 4
+    if preferences.bog_tolerance:
+        violation += np.maximum(bog - preferences.bog_tolerance, 0) / 4
+
+    score = np.zeros(n)
+    weight = 0.0
+    if preferences.grade:
+        score += W_GRADE * (1 - np.abs(grade - preferences.grade) / 4)
+        weight += W_GRADE
+    if preferences.bog_tolerance:
+        # The less tolerant the user, the more a dry route is worth
+        score += W_BOG * (1 - (bog - 1) / 4 * (5 - preferences.bog_tolerance) / 4)
+        weight += W_BOG
+    terms = (preferences.features or []) + (preferences.soft_preferences or [])
+    if terms:
+        hits = np.mean([attributes.keyword_mask(t)[rows] for t in terms], axis=0)
+        score += W_KEYWORDS * hits
+        weight += W_KEYWORDS
+    if station_km is not None and n:
+        farthest = max(float(np.max(station_km)), 1e-9)
+        score += W_PROXIMITY * (1 - np.asarray(station_km, dtype=float) / farthest)
+        weight += W_PROXIMITY
+    if weight:
+        score /= weight
+
+    violation[~known] = np.inf
+    score[~known] = 0.0
+    order = np.lexsort((-score, np.round(violation, 6)))
+    return RankedRoutes(order, violation, score)
+
+
+def rank_candidates(preferences, candidates: List[dict]) -> List[dict]:
+    """
+    Router candidates ({munro_id, name, distance_km, ...}) best first; each gets
+    its "score" and "violation" (None when the route is unknown) for display
+    and tie-breaking.
+    """
+    if not candidates:
+        return []
+    ranked = score_routes(
+        preferences,
+        candidate_positions(candidates),
+        np.array([m.get("distance_km") or 0.0 for m in candidates], dtype=float),
+    )
+    results = []
+    for i in ranked.order.tolist():
+        m = dict(candidates[i])
+        m["score"] = round(float(ranked.score[i]), 3)
+        violation = float(ranked.violation[i])
+        m["violation"] = round(violation, 3) if np.isfinite(violation) else None
+        results.append(m)
+    return results
+
+
+def tied_at_top(ranked: List[dict], margin: float = TIE_MARGIN) -> int:
+    """
+    How many leading candidates are indistinguishable locally: no hard-limit
+    violations and a score within margin of the best.
+    """
+    if not ranked or ranked[0]["violation"] != 0:
+        return 0
+    best = ranked[0]["score"]
+    count = 0
+    for m in ranked:
+        if m["violation"] != 0 or best - m["score"] > margin:
+            break
+        count += 1
+    return count
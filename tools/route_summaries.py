@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from tools.llm_cache import cached_invoke
+from tools.llm_clients import chat_model
+from tools.munros import munro_routes
+from tools.paths import repo_path
+from tools.route_ranking import candidate_position
+
+ROUTE_SUMMARIES_PATH = repo_path("data", "route_summaries.json")
+
+FORMAT_VERSION = 1
+# Bump when the prompt changes: every stored summary is then regenerated
+PROMPT_VERSION = 1
+
+# Route fields the stored summary is written from (and versioned by)
+SUMMARY_SOURCE_FIELDS = [
+    "name",
+    "title",
+    "summary",
+    "terrain",
+    "public_transport",
+    "distance",
+    "time",
+    "grade",
+    "bog",
+    "description",
+]
+# Shown for tops and other hills without a route description
+NO_ROUTE_SUMMARY = "No route description is available for this hill."
+# Longer descriptions are cut to keep the batch prompts a sensible size
+MAX_DESCRIPTION_CHARS = 4000
+SAVE_EVERY = 10
+
+
+def description_hash(route) -> str:
+    """
+    Hash of the route text a summary is written from, plus the prompt version.
+    """
+    payload = json.dumps(
+        {
+            "prompt": PROMPT_VERSION,
+            **{field: route.get(field) for field in SUMMARY_SOURCE_FIELDS},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def route_summary_prompt(route) -> str:
+    description = (route.get("description") or "")[:MAX_DESCRIPTION_CHARS]
+    return f"""
+You are an experienced Scottish hiking guide.
+
+Write a Route Summary for the Munro walk below in 3–4 clear, friendly sentences.
+Mention the type of terrain, the difficulty, highlights and views, and anything
+to prepare for. Do not mention train stations or distances from them.
+
+Name: {route.get("name")}
+Title: {route.get("title")}
+Distance: {route.get("distance")} km, about {route.get("time")} hours
+Grade (1–5): {route.get("grade")}, Bog (1–5): {route.get("bog")}
+Terrain: {route.get("terrain")}
+Public transport: {route.get("public_transport")}
+Overview: {route.get("summary")}
+
+Description:
+{description}
+"""
+
+
+class RouteSummaries:
+    """
+    One canonical LLM-written summary per route, keyed by route URL and
+    versioned by description_hash so edited routes are regenerated.
+    """
+
+    def __init__(self, path: str = ROUTE_SUMMARIES_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        if data.get("format") != FORMAT_VERSION:
+            data = {"format": FORMAT_VERSION, "summaries": {}}
+        self.entries: Dict[str, dict] = data["summaries"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, route) -> Optional[str]:
+        """
+        The stored summary for route, or None if missing or out of date.
+        """
+        entry = self.entries.get(route.get("url"))
+        if entry is None or entry["hash"] != description_hash(route):
+            return None
+        return entry["summary"]
+
+    def put(self, route, summary: str, model: str):
+        self.entries[route["url"]] = {
+            "name": route["name"],
+            "hash": description_hash(route),
+            "model": model,
+            "summary": summary,
+        }
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(
+                {"format": FORMAT_VERSION, "summaries": self.entries},
+                f,
+                indent=1,
+                ensure_ascii=False,
+            )
+
+
+def build_route_summaries(
+    path: str = ROUTE_SUMMARIES_PATH, routes=munro_routes
+) -> RouteSummaries:
+    """
+    Offline batch stage: writes a summary for every route whose stored one is
+    missing or stale, saving as it goes so an interrupted run resumes.
+    """
+    summaries = RouteSummaries(path)
+    stale = [r for r in routes if summaries.get(r) is None]
+    print(
+        f"[📝 Route summaries] {len(routes) - len(stale)} current, {len(stale)} to write"
+    )
+
+    llm = chat_model()
+    for i, route in enumerate(stale, 1):
+        summary = cached_invoke("route_summary", llm, route_summary_prompt(route))
+        summaries.put(route, summary.strip(), llm.model_name)
+        if i % SAVE_EVERY == 0:
+            summaries.save()
+            print(f"  {i}/{len(stale)}")
+
+    # Drop routes that no longer exist
+    urls = {r["url"] for r in routes}
+    for url in [u for u in summaries.entries if u not in urls]:
+        del summaries.entries[url]
+    summaries.save()
+    print(f"Saved: {path} ({len(summaries)} summaries)")
+    return summaries
+
+
+_summaries: Optional[RouteSummaries] = None
+
+
+def get_route_summaries() -> RouteSummaries:
+    global _summaries
+    if _summaries is None:
+        _summaries = RouteSummaries()
+    return _summaries
+
+
+def render_section(station: str, munro: dict, route, summary: str) -> str:
+    """
+    One Munro's section, in the format the summary prompt asks the LLM for.
+    """
+    route = route or {}
+
+    def field(name: str) -> str:
+        return munro.get(name) or route.get(name) or "N/A"
+
+    return (
+        f"🏔️ Name: {route.get('name') or munro.get('name')}  \n"
+        f"📍 Distance from Station: {munro.get('distance_km', 'N/A')} km from {station}  \n"
+        f"🚆 Transport Info: {field('public_transport')}  \n"
+        f"🌄 Terrain: {field('terrain')}  \n"
+        f"📎 GPX File: {field('gpx_file')}  \n"
+        f"📝 Route Summary: {summary}"
+    )
+
+
+def compose_sections(recommendations: list) -> Tuple[List[Optional[str]], list]:
+    """
+    One slot per recommended Munro, in recommendation order: its rendered
+    section when it comes with a route summary or has a current stored one
+    (or has no route at all), else None. Returns them with the
+    recommendations, same shape, whose routes still need the LLM, in the
+    order of the None slots.
+    """
+    summaries = get_route_summaries()
+    sections, missing = [], []
+    for item in recommendations:
+        station = item["station_name"]
+        left = []
+        for munro in item["top_munros"]:
+            position = candidate_position(munro)
+            if munro.get("route_summary"):
+                # Already written for this request (single-call freeform answers)
+                route = munro_routes[position] if position is not None else None
+                sections.append(
+                    render_section(station, munro, route, munro["route_summary"])
+                )
+                continue
+            if position is None:
+                sections.append(render_section(station, munro, None, NO_ROUTE_SUMMARY))
+                continue
+            route = munro_routes[position]
+            summary = summaries.get(route)
+            if summary is None:
+                sections.append(None)
+                left.append(munro)
+            else:
+                sections.append(render_section(station, munro, route, summary))
+        if left:
+            missing.append({**item, "top_munros": left})
+    return sections, missing
+
+
+if __name__ == "__main__":
+    build_route_summaries()
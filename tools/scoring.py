@@ -3,10 +3,8 @@ from typing import List
 import requests
 from bs4 import BeautifulSoup
 import time
-from openai import OpenAI
-import os
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from tools.llm_cache import cached
+from tools.llm_clients import openai_client
 
 
 @tool
@@ -61,14 +59,22 @@ Route Description:
 \"\"\"
 """
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}],
+        def complete() -> str:
+            response = openai_client().chat.completions.create(
+                model="gpt-3.5-turbo",
+                temperature=0,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            return response.choices[0].message.content.strip()
+
+        score_text = cached(
+            "score_munro_relevance",
+            "gpt-3.5-turbo",
+            {"temperature": 0},
+            prompt,
+            complete,
         )
 
-        score_text = response.choices[0].message.content.strip()
-
         try:
             score = float(score_text)
             return min(max(score, 0.0), 1.0)
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+from tools.datasets import ROUTES_PATH
+from tools.llm_cache import DEFAULT_TTL_SECONDS
+from tools.llm_clients import base_url, embed_query
+from tools.paths import repo_path
+from tools.preference_rules import extract_preferences
+
+SEMANTIC_CACHE_PATH = repo_path("data", "cache", "semantic_queries.npz")
+SEMANTIC_CACHE_ENABLED = os.getenv("MUNRO_SEMANTIC_CACHE", "1") != "0"
+# The vector index answers are retrieved from (the BM25 index is built from
+# ROUTES_PATH); rebuilding either empties the cache
+RAG_INDEX_DIR = repo_path("munro_rag", "munro_vector_index")
+
+# Cosine similarity above which two questions are taken to be paraphrases
+SIMILARITY_THRESHOLD = float(os.getenv("MUNRO_SEMANTIC_THRESHOLD", "0.95"))
+MAX_ENTRIES = 1000
+
+# Paraphrases must also agree on these ("easy" vs "hard" embed very closely)
+GUARD_FIELDS = [
+    "origin_city",
+    "max_travel_time_minutes",
+    "max_time_hours",
+    "max_distance_km",
+    "grade",
+    "bog_tolerance",
+    "station_keywords",
+]
+
+
+def index_fingerprint(
+    index_dir: str = RAG_INDEX_DIR, routes_path: str = ROUTES_PATH
+) -> str:
+    """
+    Size + mtime fingerprint of the vector index files and of the route
+    records the BM25 index is built from.
+    """
+    paths = [routes_path]
+    if os.path.isdir(index_dir):
+        paths += [
+            os.path.join(index_dir, name) for name in sorted(os.listdir(index_dir))
+        ]
+
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def cache_fingerprint() -> str:
+    """
+    What the cache as a whole is valid for: the vector index, and the
+    endpoint queries are embedded by (another server's vectors aren't
+    comparable with stored ones).
+    """
+    fingerprint = index_fingerprint()
+    return f"{fingerprint}@{base_url()}" if base_url() else fingerprint
+
+
+def guard_key(query: str, constraints: Optional[dict] = None) -> str:
+    """
+    The structured constraints of a query, as far as the rule parser can tell,
+    plus any the caller applied to the answer (e.g. route filters).
+    """
+    fields = extract_preferences(query).fields
+    guard = {f: fields.get(f) for f in GUARD_FIELDS}
+    if constraints is not None:
+        guard["constraints"] = constraints
+    return json.dumps(guard, sort_keys=True, default=str)
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    Answers to earlier questions, found by embedding similarity: a new
+    question within threshold cosine similarity of a stored one (and with the
+    same structured constraints) reuses its answer. Bounded to max_entries by
+    least-recent use; entries expire after ttl_seconds; the whole cache is
+    dropped when the vector index or the endpoint changes.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        path: str = SEMANTIC_CACHE_PATH,
+        threshold: float = SIMILARITY_THRESHOLD,
+        max_entries: int = MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embeddings: Optional[np.ndarray] = None
+        self.entries: List[dict] = []
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        try:
+            with np.load(path) as stored:
+                meta = json.loads(str(stored["meta"]))
+                if meta["fingerprint"] == fingerprint:
+                    self.embeddings = stored["embeddings"]
+                    self.entries = meta["entries"]
+                else:
+                    print(
+                        "[♻️ Semantic cache is stale] The RAG index or endpoint changed"
+                    )
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(
+        self, query: str, embedding, constraints: Optional[dict] = None
+    ) -> Optional[dict]:
+        """
+        The stored payload of the closest matching question, or None.
+        """
+        now = time.time()
+        with self.lock:
+            if not self.entries:
+                self.misses += 1
+                return None
+
+            similarities = self.embeddings @ _unit(embedding)
+            guard = guard_key(query, constraints)
+            for i in np.argsort(-similarities).tolist():
+                if similarities[i] < self.threshold:
+                    break
+                entry = self.entries[i]
+                if entry["guard"] != guard or now - entry["created"] > self.ttl_seconds:
+                    continue
+                entry["last_used"] = now
+                self.hits += 1
+                print(
+                    f"[🧠 Semantic cache hit] {similarities[i]:.3f} similar to "
+                    f"'{entry['query']}'"
+                )
+                return entry["payload"]
+
+            self.misses += 1
+            return None
+
+    def add(
+        self,
+        query: str,
+        embedding,
+        payload: dict,
+        constraints: Optional[dict] = None,
+    ):
+        now = time.time()
+        with self.lock:
+            row = _unit(embedding)[None, :]
+            self.embeddings = (
+                row if self.embeddings is None else np.vstack([self.embeddings, row])
+            )
+            self.entries.append(
+                {
+                    "query": query,
+                    "guard": guard_key(query, constraints),
+                    "payload": payload,
+                    "created": now,
+                    "last_used": now,
+                }
+            )
+            self._evict(now)
+            self.save()
+
+    def _evict(self, now: float):
+        keep = [
+            i
+            for i, entry in enumerate(self.entries)
+            if now - entry["created"] <= self.ttl_seconds
+        ]
+        if len(keep) > self.max_entries:
+            keep.sort(key=lambda i: self.entries[i]["last_used"])
+            keep = sorted(keep[len(keep) - self.max_entries :])
+        if len(keep) < len(self.entries):
+            self.entries = [self.entries[i] for i in keep]
+            self.embeddings = self.embeddings[keep]
+
+    def clear(self):
+        with self.lock:
+            self.embeddings = None
+            self.entries = []
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def save(self):
+        if self.embeddings is None:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        meta = json.dumps(
+            {"fingerprint": self.fingerprint, "entries": self.entries},
+            ensure_ascii=False,
+        )
+        # np.savez appends .npz to names without it
+        with open(self.path, "wb") as f:
+            np.savez(f, embeddings=self.embeddings, meta=np.array(meta))
+
+
+_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    The process-wide semantic cache, reopened when the RAG index or the
+    endpoint changes (None when disabled).
+    """
+    global _cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    fingerprint = cache_fingerprint()
+    if _cache is None or _cache.fingerprint != fingerprint:
+        _cache = SemanticCache(fingerprint)
+    return _cache
+
+
+def semantic_cached(
+    query: str,
+    compute: Callable[[], dict],
+    embed: Callable[[str], list] = embed_query,
+    constraints: Optional[dict] = None,
+) -> dict:
+    """
+    compute()'s result for query, or the stored result of a paraphrase of it
+    computed under the same constraints. Results must be JSON-serializable.
+    """
+    cache = get_semantic_cache()
+    if cache is None:
+        return compute()
+
+    embedding = embed(query)
+    payload = cache.lookup(query, embedding, constraints)
+    if payload is None:
+        payload = compute()
+        cache.add(query, embedding, payload, constraints)
+    return payload
@@ -0,0 +1,289 @@
+import csv
+import os
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import numpy as np
+from tools.paths import repo_path
+from tools.transport import resolve_station
+
+TIMETABLE_DIR = os.getenv("MUNRO_TIMETABLE_DIR", repo_path("data", "timetable"))
+DEFAULT_DEPARTURE = "08:00"
+DEPARTURE_WINDOW_MINUTES = 60  # "departing around T": any train up to an hour later
+MIN_TRANSFER_SECONDS = 120  # default change time when transfers.txt has none
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+
+class ReachableStation(NamedTuple):
+    station_name: str
+    departure: str
+    arrival: str
+    travel_minutes: int
+
+
+def parse_time(value: str) -> int:
+    """
+    GTFS "HH:MM[:SS]" (hours may exceed 24) to seconds after midnight.
+    """
+    parts = [int(p) for p in value.strip().split(":")]
+    while len(parts) < 3:
+        parts.append(0)
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def format_time(seconds: int) -> str:
+    return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}"
+
+
+def _read(path: str) -> List[dict]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def active_services(path: str, service_date: Optional[date]) -> Optional[Set[str]]:
+    """
+    service_ids of calendar.txt running on service_date, or None (every
+    service) when there is no date or no calendar.
+    """
+    calendar_path = os.path.join(path, "calendar.txt")
+    if service_date is None or not os.path.exists(calendar_path):
+        return None
+    day = service_date.strftime("%Y%m%d")
+    weekday = WEEKDAYS[service_date.weekday()]
+    return {
+        row["service_id"]
+        for row in _read(calendar_path)
+        if row.get(weekday) == "1"
+        and row.get("start_date", day) <= day <= row.get("end_date", day)
+    }
+
+
+class Timetable:
+    """
+    A GTFS-style timetable flattened into elementary connections (one train
+    leaving one station and arriving at the next), sorted by departure time,
+    for Connection Scan queries. Stops are collapsed onto station names, so
+    platforms of the same station share one node.
+    """
+
+    def __init__(
+        self,
+        station_names: List[str],
+        dep_station: np.ndarray,
+        arr_station: np.ndarray,
+        dep_time: np.ndarray,
+        arr_time: np.ndarray,
+        trip: np.ndarray,
+        transfer_seconds: np.ndarray,
+    ):
+        order = np.lexsort((arr_time, dep_time))
+        self.station_names = station_names
+        self.station_ids = {name: i for i, name in enumerate(station_names)}
+        self.dep_station = dep_station[order]
+        self.arr_station = arr_station[order]
+        self.dep_time = dep_time[order]
+        self.arr_time = arr_time[order]
+        self.trip = trip[order]
+        self.transfer_seconds = transfer_seconds
+        self.n_trips = int(trip.max()) + 1 if len(trip) else 0
+
+    def __len__(self):
+        return len(self.dep_time)
+
+    @classmethod
+    def from_gtfs(
+        cls, path: str, service_date: Optional[date] = None, resolve_name=None
+    ) -> "Timetable":
+        """
+        Loads stops.txt, trips.txt, stop_times.txt and, if present, calendar.txt
+        (filtered to service_date) and transfers.txt. resolve_name maps a GTFS
+        stop name to a canonical station name.
+        """
+        stops = _read(os.path.join(path, "stops.txt"))
+        stop_station = {}
+        for stop in stops:
+            name = stop["stop_name"]
+            if resolve_name is not None:
+                name = resolve_name(name) or name
+            stop_station[stop["stop_id"]] = name
+        # Platforms inherit their parent station's name
+        for stop in stops:
+            parent = stop.get("parent_station")
+            if parent and parent in stop_station:
+                stop_station[stop["stop_id"]] = stop_station[parent]
+
+        station_names = sorted(set(stop_station.values()))
+        station_ids = {name: i for i, name in enumerate(station_names)}
+
+        active = active_services(path, service_date)
+
+        trip_ids = {}
+        for row in _read(os.path.join(path, "trips.txt")):
+            if active is None or row.get("service_id") in active:
+                trip_ids[row["trip_id"]] = len(trip_ids)
+
+        stop_times: Dict[int, list] = {}
+        for row in _read(os.path.join(path, "stop_times.txt")):
+            trip = trip_ids.get(row["trip_id"])
+            if trip is None:
+                continue
+            stop_times.setdefault(trip, []).append(
+                (
+                    int(row["stop_sequence"]),
+                    station_ids[stop_station[row["stop_id"]]],
+                    parse_time(row["arrival_time"] or row["departure_time"]),
+                    parse_time(row["departure_time"] or row["arrival_time"]),
+                )
+            )
+
+        dep_station, arr_station, dep_time, arr_time, trips = [], [], [], [], []
+        for trip, calls in stop_times.items():
+            calls.sort()
+            for (_, a, _, a_dep), (_, b, b_arr, _) in zip(calls, calls[1:]):
+                dep_station.append(a)
+                arr_station.append(b)
+                dep_time.append(a_dep)
+                arr_time.append(b_arr)
+                trips.append(trip)
+
+        transfer_seconds = np.full(len(station_names), MIN_TRANSFER_SECONDS)
+        transfers_path = os.path.join(path, "transfers.txt")
+        if os.path.exists(transfers_path):
+            for row in _read(transfers_path):
+                if row["from_stop_id"] == row["to_stop_id"] and row.get(
+                    "min_transfer_time"
+                ):
+                    station = station_ids[stop_station[row["from_stop_id"]]]
+                    transfer_seconds[station] = int(row["min_transfer_time"])
+
+        return cls(
+            station_names,
+            np.array(dep_station, dtype=np.int32),
+            np.array(arr_station, dtype=np.int32),
+            np.array(dep_time, dtype=np.int32),
+            np.array(arr_time, dtype=np.int32),
+            np.array(trips, dtype=np.int32),
+            transfer_seconds,
+        )
+
+    def earliest_arrivals(
+        self, origin: int, departure: int, deadline: int
+    ) -> np.ndarray:
+        """
+        Connection Scan: earliest arrival (seconds) at every station when boarding
+        a train that leaves origin exactly at departure, ignoring anything arriving
+        after deadline. Unreachable stations are left at int32 max.
+        """
+        unreachable = np.iinfo(np.int32).max
+        # Plain lists: the scan is a tight Python loop and numpy scalar access is slow
+        arrival = [unreachable] * len(self.station_names)
+        arrival[origin] = departure
+        ready = list(arrival)  # when a new train can be boarded at each station
+        on_trip = bytearray(self.n_trips)
+        transfer = self.transfer_seconds.tolist()
+
+        start = int(np.searchsorted(self.dep_time, departure, side="left"))
+        end = int(np.searchsorted(self.dep_time, deadline, side="right"))
+
+        for a, b, t_dep, t_arr, trip in zip(
+            self.dep_station[start:end].tolist(),
+            self.arr_station[start:end].tolist(),
+            self.dep_time[start:end].tolist(),
+            self.arr_time[start:end].tolist(),
+            self.trip[start:end].tolist(),
+        ):
+            if on_trip[trip] or (
+                ready[a] <= t_dep and (a != origin or t_dep == departure)
+            ):
+                on_trip[trip] = 1
+                if t_arr < arrival[b] and t_arr <= deadline:
+                    arrival[b] = t_arr
+                    ready[b] = t_arr + transfer[b]
+        return np.array(arrival, dtype=np.int64)
+
+    def reachable(
+        self,
+        origin: str,
+        max_minutes: int,
+        departure: str = DEFAULT_DEPARTURE,
+        window_minutes: int = DEPARTURE_WINDOW_MINUTES,
+    ) -> List[ReachableStation]:
+        """
+        All stations reachable from origin within max_minutes of boarding, for
+        any train leaving origin within window_minutes of the departure time.
+        Nearest (in time) first.
+        """
+        origin_id = self.station_ids.get(origin)
+        if origin_id is None:
+            return []
+
+        earliest = parse_time(departure)
+        latest = earliest + window_minutes * 60
+        leaving = self.dep_time[
+            (self.dep_station == origin_id)
+            & (self.dep_time >= earliest)
+            & (self.dep_time <= latest)
+        ]
+
+        best: Dict[int, ReachableStation] = {}
+        for t_dep in np.unique(leaving).tolist():
+            arrivals = self.earliest_arrivals(
+                origin_id, t_dep, t_dep + max_minutes * 60
+            )
+            for station in np.flatnonzero(
+                arrivals <= t_dep + max_minutes * 60
+            ).tolist():
+                if station == origin_id:
+                    continue
+                minutes = int((arrivals[station] - t_dep) // 60)
+                if station not in best or minutes < best[station].travel_minutes:
+                    best[station] = ReachableStation(
+                        self.station_names[station],
+                        format_time(t_dep),
+                        format_time(int(arrivals[station])),
+                        minutes,
+                    )
+
+        return sorted(best.values(), key=lambda r: (r.travel_minutes, r.station_name))
+
+
+def has_timetable(path: str = TIMETABLE_DIR) -> bool:
+    return os.path.exists(os.path.join(path, "stop_times.txt"))
+
+
+def load_timetable(path: str = TIMETABLE_DIR) -> Optional[Timetable]:
+    """
+    Loads (once per process) the local timetable for today's services, or
+    returns None if no timetable has been installed. Reloaded automatically if
+    the timetable files or the service day change.
+    """
+    if not has_timetable(path):
+        return None
+    stamp = tuple(
+        (name, os.stat(os.path.join(path, name)).st_mtime_ns)
+        for name in sorted(os.listdir(path))
+    )
+    return _load_timetable(path, stamp, date.today())
+
+
+@lru_cache(maxsize=1)
+def _load_timetable(path: str, stamp: tuple, service_date: date) -> Timetable:
+    def resolve_name(name):
+        match = resolve_station(name)
+        return match.name if match else None
+
+    timetable = Timetable.from_gtfs(
+        path, service_date=service_date, resolve_name=resolve_name
+    )
+    print(f"[🚆 Timetable loaded] {len(timetable)} connections from {path}")
+    return timetable
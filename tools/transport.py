@@ -1,8 +1,63 @@
+import json
+from typing import List, Optional
 from langchain.tools import tool
 import pandas as pd
+from tools.datasets import STATIONS_PATH, load_compiled
+from tools.name_index import NameIndex, NameMatch
+from tools.paths import repo_path
 
-# Load train stations from OSM
-stations = pd.read_csv("data/train_stations_osm.csv")  # expects 'name', 'lat', 'lon'
+STATION_ALIASES_PATH = repo_path("data", "station_aliases.json")
+
+# Abbreviations and filler words seen in user / LLM station mentions
+STATION_TOKEN_ALIASES = {
+    "ft": "fort",
+    "saint": "st",
+    "mt": "mount",
+    "jn": "junction",
+    "jct": "junction",
+    "stn": "station",
+}
+STATION_STOPWORDS = {"station", "railway", "rail", "train"}
+
+# Load train stations from OSM (memory-mapped compiled datasets when available)
+compiled = load_compiled()
+if compiled is not None:
+    stations = compiled.frame("stations")
+else:
+    stations = pd.read_csv(STATIONS_PATH)  # expects 'name', 'lat', 'lon'
+
+
+with open(STATION_ALIASES_PATH) as f:
+    station_aliases = json.load(f)
+
+# Canonical station ID = first row for each distinct station name
+station_ids = {}
+for i, name in enumerate(stations["name"]):
+    if name != "Unnamed":
+        station_ids.setdefault(name, i)
+
+station_resolver = NameIndex(
+    [(i, name) for name, i in station_ids.items()],
+    aliases=station_aliases,
+    token_aliases=STATION_TOKEN_ALIASES,
+    stopwords=STATION_STOPWORDS,
+)
+
+
+def resolve_station(name: str) -> Optional[NameMatch]:
+    """
+    Resolves a possibly misspelt / abbreviated station mention ("Ft William",
+    "Bridge of Orchy station") to its canonical station ID and name.
+    """
+    return station_resolver.resolve(name)
+
+
+def ambiguous_station(name: str) -> List[NameMatch]:
+    """
+    Stations a mention could equally mean ("Glen" → Gleneagles, Glenfinnan,
+    ...) when resolve_station returns None for it, or an empty list.
+    """
+    return station_resolver.ambiguous(name)
 
 
 @tool
@@ -11,14 +66,15 @@ def station_lookup(location_name: str) -> str:
     Returns a list of known train stations in Scotland that include the given location name.
     Useful when a user says 'Find hikes from Fort William' — this resolves station name matches.
     """
-    matches = stations[stations["name"].str.lower().str.contains(location_name.lower())]
-    if matches.empty:
+    matches = station_resolver.search(location_name)
+    if not matches:
         return f"No train stations found matching '{location_name}'"
 
     result = "\n".join(
         [
             f"- {row['name']} ({row['lat']}, {row['lon']})"
-            for _, row in matches.iterrows()
+            for m in matches
+            for _, row in stations[stations["name"] == m.name].iterrows()
         ]
     )
     return f"Train stations matching '{location_name}':\n{result}"